@@ -0,0 +1,280 @@
+# updated: 2026-10-19 13:10:06
+# created: 2026-10-19 12:49:20
+# filename: access_benchmark.py
+
+#--------------------------------------------------------------------------------------------------------------
+import asyncio
+import argparse
+from pathlib import Path
+from json import dumps, loads
+from time import time, perf_counter
+from random import Random
+from threading import Lock
+from datetime import datetime
+from collections import Counter, defaultdict
+from mqtt_broker_standin import StandInMessage, StandInMongoConfig, StandInMongoGeneral, NullLogger, make_site
+
+#--------------------------------------------------------------------------------------------------------------
+class RecordingBroker (object):
+    """The MqttBroker surface MQTToutQueue publishes through; keeps access responses in publish order."""
+    def __init__ (self) -> None:
+        self.lock = Lock()
+        self.objectId_dict = {}
+        self.partitioned = False
+        self.shard_count = 1
+        self.responses = []
+
+    def mqtt_publish_shard_correlation(self, objectId, reader_serial):
+        pass
+
+    def mqtt_publish_access_response(self, payload):
+        with self.lock:
+            self.responses.append(payload.objectId)
+
+#--------------------------------------------------------------------------------------------------------------
+def make_traffic(users, readers, events, pincode_ratio, seed):
+    """(topic suffix, payload, user) per event; a person's face and card events interleave."""
+    rng = Random(seed)
+    traffic = []
+    for n in range(events):
+        user = rng.randrange(users)
+        reader = rng.randrange(readers)
+        object_id = f"evt-{n:08d}"
+        if rng.random() < pincode_ratio:
+            payload = {"msg_sd_msg_pincode": {
+                "_iD": object_id, "cardNumber": str(1000 + user), "serialSource": f"reader-{reader}", "broadCast": True
+            }}
+            traffic.append((f"reader-{reader}", payload, f"user-{user}"))
+        else:
+            camera_id = f"cam-{rng.choice(('in', 'out'))}-{reader}"
+            payload = {
+                "_iD": object_id, "timestamp": 0, "_watchlistId": "wl-1", "probeFaceCameraName": camera_id,
+                "cameraId": camera_id, "personId": f"person-{user}", "faceId": f"face-{user}", "firstname": "User",
+                "lastname": str(user), "createdBy": "access_benchmark", "mqtt_target": "roc/access", "routed_msg_type": "FaceMatch"
+            }
+            traffic.append(("roc-server-1", payload, f"user-{user}"))
+    return traffic
+
+def event_key(payload):
+    """The identifier an event is sharded on: the FaceMatch faceId or the pincode cardNumber."""
+    if "faceId" in payload:
+        return f"faceId:{payload['faceId']}"
+    return f"cardNumbers:{payload['msg_sd_msg_pincode']['cardNumber']}"
+
+def object_id_of(payload):
+    return payload.get("_iD") or next(iter(payload.values()))["_iD"]
+
+def site_size(traffic):
+    """(users, readers) a trace refers to, from the user-<n> and reader-<n> / cam-*-<n> names it uses."""
+    users = readers = 0
+    for topic_suffix, payload, user in traffic:
+        users = max(users, int(user.rsplit("-", 1)[1]) + 1)
+        reader = topic_suffix if topic_suffix.startswith("reader-") else payload.get("cameraId", "-0")
+        readers = max(readers, int(reader.rsplit("-", 1)[1]) + 1)
+    return users, readers
+
+def load_trace(path, args):
+    """Replays the JSONL trace at path; records a generated one there first when it does not exist."""
+    trace = Path(path)
+    if not trace.exists():
+        with open(trace, "w") as f:
+            for event in make_traffic(args.users, args.readers, args.events, args.pincode_ratio, args.seed):
+                f.write(dumps(event) + "\n")
+    with open(trace, "r") as f:
+        return [tuple(loads(line)) for line in f if line.strip()]
+
+#--------------------------------------------------------------------------------------------------------------
+def build_access_path(traffic, site, access_workers, latency_ms, worker_threads=True):
+    """MQTToutQueue over the stand-ins, with its access handlers wrapped to count per-identifier overlaps."""
+    from mqtt_out_queue import MQTToutQueue
+    from priority_lane_queue import PriorityLaneQueue
+
+    overrides = {
+        "general_settings": {"paho_enable": False},
+        "access_settings": {"facematch_coalesce_seconds": 0, "facematch_max_age_ms": 0, "anti_passback_function": True},
+        "queue_settings": {"access_workers": access_workers, "access_worker_queue_max": len(traffic)}
+    }
+    insMongoGeneral = StandInMongoGeneral(*site, latency_ms=latency_ms)
+    insBroker = RecordingBroker()
+    q = PriorityLaneQueue()
+    insMQTToutQueue = MQTToutQueue (
+        q,
+        NullLogger(),
+        insBroker,
+        StandInMongoConfig(overrides=overrides),
+        insMongoGeneral,
+        None,
+        data_path = "",
+        csv_logging_enable = False,
+        lock_suffix = "_benchmark",
+        worker_threads = worker_threads
+    )
+
+    # per-identifier overlap: two events of one card / face in their handlers at the same time
+    lock = Lock()
+    active = Counter()
+    overlaps = [0]
+    key_of_object = {object_id_of(payload): event_key(payload) for _, payload, _ in traffic}
+
+    def tracked(handler, handled_object_id):
+        def run(*args):
+            key = key_of_object.get(handled_object_id(*args))
+            with lock:
+                active[key] += 1
+                overlaps[0] += active[key] > 1
+            try:
+                handler(*args)
+            finally:
+                with lock:
+                    active[key] -= 1
+        return run
+
+    insMQTToutQueue.handle_face_match = tracked(insMQTToutQueue.handle_face_match, lambda payload_json, *rest: payload_json["_iD"])
+    insMQTToutQueue.handle_pincode = tracked(insMQTToutQueue.handle_pincode, lambda msg_data, objectId, *rest: objectId)
+    return insMQTToutQueue, insBroker, overlaps
+
+def inbound_messages(traffic):
+    for topic_suffix, payload, _ in traffic:
+        if "timestamp" in payload:
+            payload = dict(payload, timestamp=int(time() * 1000))
+        yield StandInMessage(f"benchmark/{topic_suffix}", dumps(payload))
+
+def run_threaded(traffic, site, access_workers, latency_ms):
+    """Feeds traffic through MQTToutQueue.service_out_queue with access_workers threads, as main.py does."""
+    insMQTToutQueue, insBroker, overlaps = build_access_path(traffic, site, access_workers, latency_ms)
+
+    start = perf_counter()
+    for message in inbound_messages(traffic):
+        insMQTToutQueue.q.put(message)
+        insMQTToutQueue.service_out_queue(datetime.now())
+    for worker_queue in insMQTToutQueue.worker_queues:
+        worker_queue.join()
+    elapsed = perf_counter() - start
+
+    return summarize(traffic, insBroker.responses, elapsed, overlaps[0], insMQTToutQueue.worker_shed_count)
+
+def run_asyncio(traffic, site, shards, latency_ms, offload_threads):
+    """Feeds traffic through the main_async.py path: routing and handlers on the offload pool, ordered by asyncio shards."""
+    from main_async import AsyncOffload, AsyncAccessDispatcher
+
+    insMQTToutQueue, insBroker, overlaps = build_access_path(traffic, site, 0, latency_ms, worker_threads=False)
+
+    async def feed():
+        loop = asyncio.get_running_loop()
+        insOffload = AsyncOffload(loop, max_workers=offload_threads)
+        insDispatcher = AsyncAccessDispatcher(
+            loop,
+            NullLogger(),
+            insOffload,
+            shards = shards,
+            max_depth = len(traffic),
+            shed_policy = insMQTToutQueue.worker_shed_policy
+        )
+        insMQTToutQueue.set_dispatcher(insDispatcher.dispatch)
+
+        start = perf_counter()
+        for message in inbound_messages(traffic):
+            insMQTToutQueue.q.put(message)
+            await insOffload.run(insMQTToutQueue.service_out_queue, datetime.now())
+        await asyncio.sleep(0)                  # let the last call_soon_threadsafe enqueue run
+        for shard_queue in insDispatcher.shard_queues:
+            await shard_queue.join()
+        elapsed = perf_counter() - start
+
+        for task in insDispatcher.tasks:
+            task.cancel()
+        insOffload.shutdown()
+        return elapsed, insDispatcher.shed_count
+
+    elapsed, shed = asyncio.run(feed())
+    return summarize(traffic, insBroker.responses, elapsed, overlaps[0], shed)
+
+def summarize(traffic, responses, elapsed, overlaps, shed):
+    """Per-identifier ordering: each card's / face's responses must come out in the order its events went in."""
+    order_in = defaultdict(list)
+    key_of_object = {}
+    for _, payload, _ in traffic:
+        object_id = object_id_of(payload)
+        order_in[event_key(payload)].append(object_id)
+        key_of_object[object_id] = event_key(payload)
+
+    order_out = defaultdict(list)
+    for object_id in responses:
+        order_out[key_of_object[object_id]].append(object_id)
+
+    out_of_order = sum(1 for key, object_ids in order_in.items() if order_out[key] != object_ids)
+    return {
+        "events": len(traffic),
+        "responses": len(responses),
+        "seconds": round(elapsed, 3),
+        "events_per_sec": round(len(responses) / elapsed, 1) if elapsed else 0.0,
+        "out_of_order_keys": out_of_order,
+        "overlaps": overlaps,
+        "shed": shed
+    }
+
+#--------------------------------------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Access-worker throughput and per-identifier ordering under interleaved FaceMatch and pincode traffic")
+    parser.add_argument("--users", type=int, default=50, help="People generating events (default: 50)")
+    parser.add_argument("--readers", type=int, default=8, help="Readers, each with an in and an out camera (default: 8)")
+    parser.add_argument("--events", type=int, default=600, help="Events to feed (default: 600)")
+    parser.add_argument("--pincode_ratio", type=float, default=0.3, help="Fraction of card events (default: 0.3)")
+    parser.add_argument("--latency_ms", type=float, default=1.0, help="Stand-in Mongo latency per query (default: 1)")
+    parser.add_argument("--mode", nargs="+", choices=["thread", "asyncio"], default=["thread", "asyncio"], help="Dispatch paths to run (default: thread asyncio)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4, 8], help="access_workers values for the thread path (default: 0 1 2 4 8)")
+    parser.add_argument("--shards", type=int, nargs="+", default=[64], help="async_access_shards values for the asyncio path (default: 64)")
+    parser.add_argument("--offload_threads", type=int, default=16, help="async_offload_threads for the asyncio path (default: 16)")
+    parser.add_argument("--trace", default=None, help="JSONL traffic trace to replay; recorded first if missing (default: generate)")
+    parser.add_argument("--min_speedup", type=float, default=2.0, help="Required speedup of the most workers over 1 (default: 2.0)")
+    parser.add_argument("--seed", type=int, default=1, help="Traffic seed (default: 1)")
+    args = parser.parse_args()
+
+    if args.trace:
+        traffic = load_trace(args.trace, args)
+    else:
+        traffic = make_traffic(args.users, args.readers, args.events, args.pincode_ratio, args.seed)
+    users, readers = site_size(traffic)
+
+    scenarios = [("thread", n) for n in args.workers if "thread" in args.mode]
+    scenarios += [("asyncio", n) for n in args.shards if "asyncio" in args.mode]
+
+    results = {}
+    print(f"{'mode':<9}{'conc':>6}{'events':>8}{'responses':>11}{'seconds':>10}{'events/s':>11}{'unordered':>11}{'overlaps':>10}{'shed':>6}")
+    for mode, concurrency in scenarios:
+        site = make_site(users, readers)        # fresh zone state per run
+        if mode == "thread":
+            result = run_threaded(traffic, site, concurrency, args.latency_ms)
+        else:
+            result = run_asyncio(traffic, site, concurrency, args.latency_ms, args.offload_threads)
+        results[(mode, concurrency)] = result
+        print(
+            f"{mode:<9}{concurrency:>6}{result['events']:>8}{result['responses']:>11}{result['seconds']:>10}"
+            f"{result['events_per_sec']:>11}{result['out_of_order_keys']:>11}{result['overlaps']:>10}{result['shed']:>6}"
+        )
+
+    ok = all(
+        result["responses"] == result["events"] and not result["out_of_order_keys"] and not result["overlaps"]
+        for result in results.values()
+    )
+    most = max(args.workers)
+    if ("thread", 1) in results and ("thread", most) in results and most > 1:
+        speedup = results[("thread", most)]["events_per_sec"] / max(results[("thread", 1)]["events_per_sec"], 0.001)
+        print(f"speedup {most} workers over 1: {speedup:.2f}x (required {args.min_speedup}x)")
+        ok = ok and speedup >= args.min_speedup
+    print("OK" if ok else "FAILED")
+    raise SystemExit(0 if ok else 1)
+
+#--------------------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    main()
+
+#--------------------------------------------------------------------------------------------------------------
+"""
+Example Usage:
+python3 access_benchmark.py
+python3 access_benchmark.py --events 2000 --users 200 --latency_ms 2 --workers 1 4 16
+python3 access_benchmark.py --trace access_trace.jsonl --mode thread asyncio --workers 8 16 --shards 16 64
+"""
+
+#--------------------------------------------------------------------------------------------------------------
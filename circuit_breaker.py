@@ -0,0 +1,167 @@
+# updated: 2026-10-19 12:35:50
+# created: 2026-10-19 12:35:50
+# filename: circuit_breaker.py
+#--------------------------------------------------------------------------------------------------------------
+from time import monotonic
+from threading import Lock
+from collections import deque, OrderedDict
+from latency_histogram import LatencyHistogram
+#--------------------------------------------------------------------------------------------------------------
+class CircuitBreakerOpen (Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+#--------------------------------------------------------------------------------------------------------------
+class CircuitBreaker (object):
+    """
+    Per-dependency breaker over a sliding window of recent calls. A call fails when it raises or takes
+    longer than slow_call_ms. Once the window holds min_calls and the failure ratio reaches
+    failure_ratio, the breaker opens and callers fail fast for open_seconds; then up to half_open_probes
+    calls are let through, and the breaker closes when they all succeed or reopens on the first failure.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__ (
+            self,
+            name,
+            window = 20,
+            min_calls = 5,
+            failure_ratio = 0.5,
+            slow_call_ms = 1000,
+            open_seconds = 10,
+            half_open_probes = 1
+        ) -> None:
+
+        self.name = name
+        self.min_calls = int(min_calls)
+        self.failure_ratio = float(failure_ratio)
+        self.slow_call_ms = float(slow_call_ms)
+        self.open_seconds = float(open_seconds)
+        self.half_open_probes = int(half_open_probes)
+
+        self.lock = Lock()
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=int(window))     # True = failed
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.probes_passed = 0
+
+        self.insLatencyHistogram = LatencyHistogram()
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.open_count = 0
+        self.transitions = deque(maxlen=100)    # (name, state, reason), popped by CircuitBreakerRegistry.pop_alerts
+#--------------------------------------------------------------------------------------------------------------
+    def allow(self):
+        """True when a call may go to the dependency; counts a rejection otherwise."""
+        with self.lock:
+            if self.state == self.OPEN:
+                if monotonic() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self._transition(self.HALF_OPEN, f"probing after {self.open_seconds:g}s")
+
+            if self.state == self.HALF_OPEN:
+                if self.probes_in_flight >= self.half_open_probes:
+                    self.rejected += 1
+                    return False
+                self.probes_in_flight += 1
+            return True
+
+    def record(self, elapsed_ms, failed=False):
+        failed = failed or elapsed_ms > self.slow_call_ms
+        self.insLatencyHistogram.observe(elapsed_ms)
+
+        with self.lock:
+            self.calls += 1
+            self.failures += failed
+
+            if self.state == self.HALF_OPEN:
+                self.probes_in_flight = max(0, self.probes_in_flight - 1)
+                if failed:
+                    self._open(f"probe failed after {elapsed_ms:.0f}ms")
+                    return
+                self.probes_passed += 1
+                if self.probes_passed >= self.half_open_probes:
+                    self.outcomes.clear()
+                    self._transition(self.CLOSED, "probe succeeded")
+                return
+
+            self.outcomes.append(failed)
+            if self.state == self.CLOSED and len(self.outcomes) >= self.min_calls:
+                ratio = sum(self.outcomes) / len(self.outcomes)
+                if ratio >= self.failure_ratio:
+                    self._open(f"{ratio:.0%} of the last {len(self.outcomes)} calls failed or exceeded {self.slow_call_ms:g}ms")
+
+    def _open(self, reason):
+        self.opened_at = monotonic()
+        self.open_count += 1
+        self._transition(self.OPEN, reason)
+
+    def _transition(self, state, reason):
+        self.state = state
+        self.probes_in_flight = 0
+        self.probes_passed = 0
+        self.transitions.append((self.name, state, reason))
+#--------------------------------------------------------------------------------------------------------------
+    def call(self, fn, *args, **kwargs):
+        """Runs fn through the breaker: raises CircuitBreakerOpen when open, records the outcome otherwise."""
+        if not self.allow():
+            raise CircuitBreakerOpen(f"{self.name} circuit open")
+
+        start = monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record((monotonic() - start) * 1000, failed=True)
+            raise
+        self.record((monotonic() - start) * 1000)
+        return result
+
+    def get_metrics(self):
+        with self.lock:
+            return {
+                "state": self.state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "opened": self.open_count,
+                "latency": self.insLatencyHistogram.get_metrics()
+            }
+#--------------------------------------------------------------------------------------------------------------
+class CircuitBreakerRegistry (object):
+    """Process-wide breakers by dependency name, so metrics and status reporting see all of them."""
+    def __init__ (self) -> None:
+        self.lock = Lock()
+        self.breakers = OrderedDict()
+
+    def get(self, name, **settings):
+        """The breaker for name, created with settings on first use."""
+        with self.lock:
+            if name not in self.breakers:
+                self.breakers[name] = CircuitBreaker(name, **settings)
+            return self.breakers[name]
+
+    def get_states(self):
+        with self.lock:
+            return {name: breaker.state for name, breaker in self.breakers.items()}
+
+    def get_metrics(self):
+        with self.lock:
+            breakers = list(self.breakers.values())
+        return {breaker.name: breaker.get_metrics() for breaker in breakers}
+
+    def pop_alerts(self):
+        """State transitions since the last call: (name, state, reason)."""
+        alerts = []
+        with self.lock:
+            breakers = list(self.breakers.values())
+        for breaker in breakers:
+            with breaker.lock:
+                alerts.extend(breaker.transitions)
+                breaker.transitions.clear()
+        return alerts
+
+insBreakerRegistry = CircuitBreakerRegistry()
+#--------------------------------------------------------------------------------------------------------------
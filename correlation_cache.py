@@ -0,0 +1,88 @@
+# updated: 2026-10-19 12:18:07
+# created: 2026-10-19 12:18:07
+# filename: correlation_cache.py
+#--------------------------------------------------------------------------------------------------------------
+from time import monotonic
+from threading import Lock
+from collections import OrderedDict
+#--------------------------------------------------------------------------------------------------------------
+class CorrelationCache (object):
+    """
+    Bounded key -> value map with expiry, used to pair outbound requests with their acknowledgements.
+    Entries are kept in insertion order, so expiry and size eviction only ever look at the oldest end.
+    """
+    def __init__ (
+            self,
+            ttl = 300,
+            max_entries = 10000
+        ) -> None:
+
+        self.ttl = float(ttl)
+        self.max_entries = int(max_entries)
+
+        self.lock = Lock()
+        self.entries = OrderedDict()        # key -> (value, expires)
+
+        self.added_count = 0
+        self.matched_count = 0
+        self.expired_count = 0
+        self.evicted_count = 0
+#--------------------------------------------------------------------------------------------------------------
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and entry[1] > monotonic()
+
+    def __setitem__(self, key, value):
+        now = monotonic()
+        with self.lock:
+            self._expire(now)
+            if key in self.entries:
+                del self.entries[key]
+            self.entries[key] = (value, now + self.ttl)
+            self.added_count += 1
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evicted_count += 1
+
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return default
+            if entry[1] <= monotonic():
+                self.expired_count += 1
+                return default
+            self.matched_count += 1
+            return entry[0]
+#--------------------------------------------------------------------------------------------------------------
+    def _expire(self, now):
+        expired = 0
+        while self.entries:
+            key, (_, expires) = next(iter(self.entries.items()))
+            if expires > now:
+                break
+            self.entries.popitem(last=False)
+            expired += 1
+        self.expired_count += expired
+        return expired
+
+    def expire(self):
+        with self.lock:
+            return self._expire(monotonic())
+#--------------------------------------------------------------------------------------------------------------
+    def get_metrics(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "added": self.added_count,
+                "matched": self.matched_count,
+                "expired": self.expired_count,
+                "evicted": self.evicted_count
+            }
+
+#--------------------------------------------------------------------------------------------------------------
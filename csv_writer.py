@@ -1,10 +1,11 @@
-# updated: 2025-04-27 19:16:58
+# updated: 2026-10-19 12:20:52
 # created: 2025-04-27 16:52:00
 # filename: csv_writer.py
 #--------------------------------------------------------------------------------------------------------------
 import os
 import csv
 from typing import Union
+from threading import Lock
 from dataclasses import dataclass, fields
 #--------------------------------------------------------------------------------------------------------------
 @dataclass
@@ -38,6 +39,7 @@ class CSVwriter(object):
 
         self.insLogger = insLogger
         self.filename = filename
+        self.lock = Lock()      # rows may be written from several access workers
 
         # Initialize header based on type (TransactionHeader or TemperatureHeader)
         if header == "transactionHeader":
@@ -62,7 +64,7 @@ class CSVwriter(object):
         )
 
         try:
-            with open(self.filename, mode='a', newline='') as file:
+            with self.lock, open(self.filename, mode='a', newline='') as file:
                 writer = csv.writer(file)
                 writer.writerow(transaction.__dict__.values())  # Extract values from dataclass
 
@@ -82,7 +84,7 @@ class CSVwriter(object):
         )
 
         try:
-            with open(self.filename, mode='a', newline='') as file:
+            with self.lock, open(self.filename, mode='a', newline='') as file:
                 writer = csv.writer(file)
                 writer.writerow(temperature.__dict__.values())  # Extract values from dataclass
 
@@ -0,0 +1,62 @@
+# updated: 2026-10-19 12:18:28
+# created: 2026-10-19 12:18:28
+# filename: event_coalescer.py
+#--------------------------------------------------------------------------------------------------------------
+from time import monotonic
+from threading import Lock
+#--------------------------------------------------------------------------------------------------------------
+class EventCoalescer (object):
+    """
+    Lets the first event for a key through and absorbs repeats of that key for window seconds.
+    A window of 0 disables coalescing.
+    """
+    def __init__ (
+            self,
+            window = 3.0
+        ) -> None:
+
+        self.window = float(window)
+
+        self.lock = Lock()
+        self.windows = {}           # key -> [opened monotonic, suppressed in this window]
+        self.last_prune = monotonic()
+
+        self.processed_count = 0
+        self.suppressed_count = 0
+#--------------------------------------------------------------------------------------------------------------
+    def admit(self, key):
+        """Returns True when the event should be processed, False when it falls inside an open window."""
+        now = monotonic()
+        with self.lock:
+            if now - self.last_prune >= self.window:
+                self._prune(now)
+
+            current = self.windows.get(key)
+            if self.window > 0 and current is not None and now - current[0] < self.window:
+                current[1] += 1
+                self.suppressed_count += 1
+                return False
+
+            self.windows[key] = [now, 0]
+            self.processed_count += 1
+            return True
+
+    def _prune(self, now):
+        self.windows = {k: v for k, v in self.windows.items() if now - v[0] < self.window}
+        self.last_prune = now
+#--------------------------------------------------------------------------------------------------------------
+    def get_suppressed(self, key):
+        with self.lock:
+            current = self.windows.get(key)
+            return current[1] if current else 0
+
+    def get_metrics(self):
+        with self.lock:
+            return {
+                "window": self.window,
+                "open_windows": len(self.windows),
+                "processed": self.processed_count,
+                "suppressed": self.suppressed_count
+            }
+
+#--------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,49 @@
+# updated: 2026-10-19 12:16:30
+# created: 2026-10-19 12:16:30
+# filename: latency_histogram.py
+#--------------------------------------------------------------------------------------------------------------
+from bisect import bisect_left
+from threading import Lock
+#--------------------------------------------------------------------------------------------------------------
+class LatencyHistogram (object):
+    """Fixed-bucket histogram of millisecond values (delivery latency, event age, queue wait)."""
+
+    DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__ (
+            self,
+            buckets_ms = None
+        ) -> None:
+
+        self.buckets_ms = tuple(sorted(buckets_ms or self.DEFAULT_BUCKETS_MS))
+        self.lock = Lock()
+        self.reset()
+#--------------------------------------------------------------------------------------------------------------
+    def reset(self):
+        with self.lock:
+            self.counts = [0] * (len(self.buckets_ms) + 1)
+            self.count = 0
+            self.total_ms = 0.0
+            self.max_ms = 0.0
+
+    def observe(self, value_ms):
+        index = bisect_left(self.buckets_ms, value_ms)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ms += value_ms
+            if value_ms > self.max_ms:
+                self.max_ms = value_ms
+#--------------------------------------------------------------------------------------------------------------
+    def get_metrics(self):
+        with self.lock:
+            buckets = {f"<={limit}": self.counts[i] for i, limit in enumerate(self.buckets_ms)}
+            buckets[f">{self.buckets_ms[-1]}"] = self.counts[-1]
+            return {
+                "count": self.count,
+                "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+                "max_ms": round(self.max_ms, 2),
+                "buckets": buckets
+            }
+
+#--------------------------------------------------------------------------------------------------------------
@@ -1,10 +1,14 @@
-# updated: 2025-05-06 18:09:31
+# updated: 2026-10-19 12:26:54
 # created: 2024-07-21 13:51:09
 # filename: machine_info.py
 #--------------------------------------------------------------------------------------------------------------
+from re import search
+from glob import glob
 from os import path
-from time import sleep
+from time import sleep, time
 from random import getrandbits
+from collections import deque
+from threading import Thread, Event, Lock
 from uuid import UUID, getnode, uuid4
 from subprocess import check_output, CalledProcessError
 from socket import socket, gethostname, AF_INET, SOCK_DGRAM
@@ -28,6 +32,13 @@ class MachineInfo (object):
         self.program_updated = program_updated
         self.number_format = number_format
         self.own_serial_number_msg = self.get_own_serial_number_msg ()
+
+        # sensor sampler (see start_sensor_sampler): latest readings without blocking the caller
+        self.sensor_lock = Lock()
+        self.sensor_history = deque(maxlen=60)      # (epoch, temperature)
+        self.sensor_stop_event = Event()
+        self.sensor_thread = None
+        self.sensor_raspberry_pi = False
 #--------------------------------------------------------------
     def get_mac_address(self):
         try:
@@ -92,8 +103,14 @@ class MachineInfo (object):
             return None
 #--------------------------------------------------------------
     def get_cpu_temperature(self):
+        # sysfs first; vcgencmd only on images without the thermal driver
+        temperature = self.read_thermal_zone("/sys/class/thermal/thermal_zone0/temp")
+        if temperature is not None:
+            self.insLogger.log_info(msg=f"[MachineInfo] CPU Temperature retrieved: {temperature}°C")
+            return temperature
+
         try:
-            output = check_output("vcgencmd measure_temp", shell=True).decode()
+            output = check_output(["vcgencmd", "measure_temp"]).decode()
             match = search(r"temp=([\d\.]+)'C", output)
             if match:
                 temperature = float(match.group(1))
@@ -112,6 +129,71 @@ class MachineInfo (object):
             self.insLogger.log_error(msg=f"[MachineInfo ERROR] Unexpected error: {str(e)}")
             return None
 
+#--------------------------------------------------------------------------------------------------------------
+    def read_thermal_zone(self, file_name):
+        try:
+            with open(file_name, "r") as f:
+                return round(float(f.read().strip()) / 1000, 2)     # millidegree to degree
+        except (OSError, ValueError):
+            return None
+
+    def read_cpu_temperature(self, raspberry_pi=False):
+        # quiet read used by the sampler: Pi thermal zone, else psutil (hwmon), else every thermal zone
+        if raspberry_pi:
+            return self.read_thermal_zone("/sys/class/thermal/thermal_zone0/temp")
+
+        try:
+            import psutil
+            core_temps = [entry.current for entries in psutil.sensors_temperatures().values() for entry in entries]
+        except Exception:
+            core_temps = []
+
+        if not core_temps:
+            core_temps = [t for t in map(self.read_thermal_zone, glob("/sys/class/thermal/thermal_zone*/temp")) if t is not None]
+
+        return round(sum(core_temps) / len(core_temps), 2) if core_temps else None
+#--------------------------------------------------------------------------------------------------------------
+    def start_sensor_sampler(self, raspberry_pi=False, interval=10, history=60):
+        if self.sensor_thread is not None:
+            return
+
+        self.sensor_raspberry_pi = raspberry_pi
+        self.sensor_history = deque(maxlen=history)
+        self.sample_sensors()
+
+        self.sensor_thread = Thread(
+            target = self.sensor_sampler,
+            args = (interval,),
+            name = "machine-info-sensors",
+            daemon = True
+        )
+        self.sensor_thread.start()
+        self.insLogger.log_info(msg=f"[MachineInfo--start_sensor_sampler] Sampling CPU temperature every {interval}s, history: {history}")
+
+    def stop_sensor_sampler(self):
+        self.sensor_stop_event.set()
+
+    def sensor_sampler(self, interval):
+        while not self.sensor_stop_event.wait(interval):
+            self.sample_sensors()
+
+    def sample_sensors(self):
+        temperature = self.read_cpu_temperature(self.sensor_raspberry_pi)
+        if temperature is None:
+            return
+        with self.sensor_lock:
+            self.sensor_history.append((time(), temperature))
+
+    def get_latest_cpu_temperature(self):
+        # non-blocking for timers and MQTT callbacks; reads directly only if the sampler never ran
+        with self.sensor_lock:
+            if self.sensor_history:
+                return self.sensor_history[-1][1]
+        return self.read_cpu_temperature(self.sensor_raspberry_pi)
+
+    def get_cpu_temperature_history(self):
+        with self.sensor_lock:
+            return list(self.sensor_history)
 #--------------------------------------------------------------------------------------------------------------
     def get_cpu_temperature_pi(self):
         try:
@@ -212,7 +294,8 @@ class MachineInfo (object):
 #--------------------------------------------------------------
     def get_raspberry_pi_model(self):
         try:
-            cpuinfo = check_output("cat /proc/cpuinfo", shell=True).decode()
+            with open("/proc/cpuinfo", "r") as f:
+                cpuinfo = f.read()
 
             for line in cpuinfo.split('\n'):
                 if "Model" in line:
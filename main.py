@@ -1,10 +1,9 @@
-# updated: 2025-06-25 18:05:33
+# updated: 2026-10-19 13:09:13
 # created: 2024-06-13 14:30:00
 # filename: main.py
 
 #--------------------------------------------------------------------------------------------------------------
-from time import sleep
-from queue import Queue
+from os.path import splitext
 from datetime import datetime
 from logger import CustomLogger
 from csv_writer import CSVwriter
@@ -14,29 +13,43 @@ from machine_info import MachineInfo
 from config_parser import Config_Init
 from config_update import ConfigUpdate
 from mqtt_out_queue import MQTToutQueue
+from priority_lane_queue import PriorityLaneQueue
 from mongo_query_config import MongoQueryConfig
 from mongo_query_general import MongoQueryGeneral       # on the fly db-queries and db-actions
+from circuit_breaker import insBreakerRegistry          # per-dependency breaker state and metrics
 
 #--------------------------------------------------------------------------------------------------------------
 class Main (object):
+    network_loop = "thread"     # main_async.py drives the MQTT client from asyncio instead
+
     def __init__ (
             self,
-            dtt = datetime.now ()
+            dtt = datetime.now (),
+            shard_index = 0,
+            shard_count = 1,
+            metrics_queue = None
         )-> None:
 
+        # supervisor.py runs one Main per shard; a single process is shard 0 of 1
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.metrics_queue = metrics_queue
+        shard_suffix = "" if shard_count == 1 else f"-{shard_index}"
+
         program_version = f"ROC-Access-Server V1.1.16"
-        program_updated = "2025-06-25 18:05:33"
+        program_updated = "2026-10-19 13:09:13"
 
         insConfigInit = Config_Init()
         ini_general_variables_dict = insConfigInit.get_variables_dict (category="general")  # from config.ini file
         ini_config_variables_dict = insConfigInit.get_variables_dict (category="config")    # from config.ini file
 
         logger_enable = ini_general_variables_dict["logger_enable"]
+        log_root, log_ext = splitext(ini_config_variables_dict["systemlog_file"])
         if logger_enable:
             custom_logger = CustomLogger(
                 backup_count = 5,
                 max_bytes = 10485760,
-                logfile = ini_config_variables_dict["systemlog_file"],                     # from config.ini file
+                logfile = f"{log_root}{shard_suffix}{log_ext}",                           # from config.ini file
                 logger_level = ini_config_variables_dict["logger_level"],                  # from config.ini file
                 util_prt = ini_general_variables_dict["util_prt"],
                 util_prt0 = ini_general_variables_dict["util_prt0"]
@@ -72,22 +85,42 @@ class Main (object):
             ini_mongo_variables_dict=insConfigInit.get_variables_dict(category="mongo") # from config.ini file
         )
 
+        self.insMongoConfig = insMongoConfig
         general_settings_dict = insMongoConfig.query_config_general_settings() # derived from mongo database config
         self.gen_datim_format = general_settings_dict.get("datim_format")
 
+        insMachineInfo.start_sensor_sampler (
+            raspberry_pi = general_settings_dict.get("raspberry_pi"),
+            interval = general_settings_dict.get("sensor_sample_interval", 10),
+            history = general_settings_dict.get("sensor_history_size", 60)
+        )
+
 
         insMongoGeneral = MongoQueryGeneral(
             insLogger=custom_logger,
-            ini_mongo_variables_dict = insConfigInit.get_variables_dict(category="mongo")
+            ini_mongo_variables_dict = insConfigInit.get_variables_dict(category="mongo"),
+            breaker_settings_dict = insMongoConfig.query_config_breaker_settings()     # derived from mongo database config
         )
 
-        q = Queue ()
+        queue_settings_dict = insMongoConfig.query_config_queue_settings() or {}    # derived from mongo database config
+        q = PriorityLaneQueue (
+            lane_dict = queue_settings_dict.get("lane_dict"),
+            default_lane = queue_settings_dict.get("default_lane", "control"),
+            fairness_budget = queue_settings_dict.get("fairness_budget", 10),
+            lane_max_dict = queue_settings_dict.get("lane_max_dict"),
+            lane_policy_dict = queue_settings_dict.get("lane_policy_dict"),
+            high_water_ratio = queue_settings_dict.get("high_water_ratio", 0.8)
+        )
 
         insMQTTbroker = MqttBroker (
             q,
             insLogger,
             insMongoConfig,
             insMachineInfo,
+            data_path = ini_config_variables_dict["data_path"],             # from config.ini file
+            network_loop = self.network_loop,
+            shard_index = shard_index,
+            shard_count = shard_count,
             util_prt = ini_general_variables_dict["util_prt"],
             util_prt0 = ini_general_variables_dict["util_prt0"]
         )
@@ -104,6 +137,8 @@ class Main (object):
             filename = ini_config_variables_dict["csv_transaction_file"],   # derived from config.ini file (config_parser.py)
             own_serial_number = insMachineInfo.get_own_serial_number(),
             csv_logging_enable = csv_logging_enable,
+            lock_suffix = shard_suffix,
+            worker_threads = self.network_loop == "thread",
             util_prt = ini_general_variables_dict["util_prt"],
             util_prt0 = ini_general_variables_dict["util_prt0"]
         )
@@ -116,14 +151,20 @@ class Main (object):
             insMongoConfig,
             insMachineInfo,
             insCSVtemperature,
+            report_enable = shard_index == 0,
             util_prt = ini_general_variables_dict["util_prt"],
             util_prt0 = ini_general_variables_dict["util_prt0"]
         )
+        self.insTimers = insTimers
+        insTimers.insScheduler.every(60, insMQTToutQueue.insScheduleEngine.refresh, name="refresh_input_schedules")
+        if metrics_queue is not None:
+            insTimers.insScheduler.every(10, self.report_metrics)     # shards report to the supervisor
 
-        ConfigUpdate (
-            insMachineInfo,
-            filename = ini_config_variables_dict["config_file"]     # from config.ini file
-        )
+        if shard_index == 0:
+            ConfigUpdate (
+                insMachineInfo,
+                filename = ini_config_variables_dict["config_file"]     # from config.ini file
+            )
 
         self.main_loop (
             dtt, 
@@ -134,14 +175,12 @@ class Main (object):
             util_prt0 = ini_general_variables_dict["util_prt0"]
         )
 #--------------------------------------------------------------------------------------------------------------
-    def main_loop (
-            self, 
-            dtt, 
+    def log_startup_info (
+            self,
+            dtt,
             insLogger,
-            insTimers,
             insMachineInfo,
-            util_prt = False,
-            util_prt0 = False
+            util_prt = False
         ):
 
         dtts = dtt.strftime (self.gen_datim_format)
@@ -164,28 +203,40 @@ class Main (object):
             print (f"program_updated: {insMachineInfo.program_updated}")
 
         # Always log key startup info
-        insLogger.log_info(msg=f"[Main--main_loop] System Startup: client_id: {client_id}")
-        insLogger.log_info(msg=f"[Main--main_loop] System Startup: hostname: {hostname}")
-        insLogger.log_info(msg=f"[Main--main_loop] System Startup: ip_address: {ip_address}")
-        insLogger.log_info(msg=f"[Main--main_loop] System Startup: mac_address: {mac_address}")
-        insLogger.log_info(msg=f"[Main--main_loop] System Startup: own_serial_number: {own_serial_number}")
-        insLogger.log_info(msg=f"[Main--main_loop] System Startup: unique_client_id: {unique_client_id}")
-        insLogger.log_info(msg=f"[Main--main_loop] System Startup: program_version: {insMachineInfo.program_version}")
-        insLogger.log_info(msg=f"[Main--main_loop] System Startup: program_updated: {insMachineInfo.program_updated}")
+        insLogger.log_info(msg=f"[Main--log_startup_info] System Startup: client_id: {client_id}")
+        insLogger.log_info(msg=f"[Main--log_startup_info] System Startup: hostname: {hostname}")
+        insLogger.log_info(msg=f"[Main--log_startup_info] System Startup: ip_address: {ip_address}")
+        insLogger.log_info(msg=f"[Main--log_startup_info] System Startup: mac_address: {mac_address}")
+        insLogger.log_info(msg=f"[Main--log_startup_info] System Startup: own_serial_number: {own_serial_number}")
+        insLogger.log_info(msg=f"[Main--log_startup_info] System Startup: unique_client_id: {unique_client_id}")
+        insLogger.log_info(msg=f"[Main--log_startup_info] System Startup: program_version: {insMachineInfo.program_version}")
+        insLogger.log_info(msg=f"[Main--log_startup_info] System Startup: program_updated: {insMachineInfo.program_updated}")
+#--------------------------------------------------------------------------------------------------------------
+    def main_loop (
+            self, 
+            dtt, 
+            insLogger,
+            insTimers,
+            insMachineInfo,
+            util_prt = False,
+            util_prt0 = False
+        ):
+
+        self.log_startup_info (dtt, insLogger, insMachineInfo, util_prt)
 
         try:
             while True:
                 dtt = datetime.now()
                 insTimers.service_timer_ticks(dtt)
                 self.insMQTToutQueue.service_out_queue(dtt)
-                sleep(0.0001)
+                # sleep until a message arrives or the next scheduled task is due
+                self.insMQTTbroker.q.wait(timeout=insTimers.next_delay())
 
         except KeyboardInterrupt:
             # Graceful shutdown message
             insLogger.log_info("Keyboard Ctrl-C detected. Disconnecting MQTT...")
 
-            self.insMQTTbroker.client.disconnect()
-            self.insMQTTbroker.client.loop_stop()
+            self.insMQTTbroker.stop()
 
         # Final exit message with timestamp
         dtts = dtt.strftime(self.gen_datim_format)
@@ -193,6 +244,26 @@ class Main (object):
             msg = f"[Main--main_loop] Keyboard Program Stopped at: {dtts}"
         )
 
+#--------------------------------------------------------------------------------------------------------------
+    def get_metrics (self):
+        return {
+            "shard": self.shard_index,
+            "connection": self.insMQTTbroker.get_connection_metrics(),
+            "delivery": self.insMQTTbroker.get_delivery_metrics(),
+            "queue": self.insMQTTbroker.q.get_metrics(),
+            "offline_buffer": self.insMQTTbroker.get_offline_buffer_metrics(),
+            "face_match": self.insMQTToutQueue.get_face_match_metrics(),
+            "access_workers": self.insMQTToutQueue.get_worker_metrics(),
+            "scheduler": self.insTimers.insScheduler.get_metrics(),
+            "breakers": insBreakerRegistry.get_metrics()
+        }
+
+    def report_metrics (self):
+        try:
+            self.metrics_queue.put_nowait(self.get_metrics())
+        except Exception:
+            pass
+
 #--------------------------------------------------------------------------------------------------------------
 if __name__ == "__main__":
 
@@ -0,0 +1,290 @@
+# updated: 2026-10-19 13:10:06
+# created: 2026-10-19 12:22:19
+# filename: main_async.py
+
+#--------------------------------------------------------------------------------------------------------------
+import asyncio
+from zlib import crc32
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from main import Main
+#--------------------------------------------------------------------------------------------------------------
+class AsyncOffload (object):
+    """
+    Runs blocking calls (pymongo lookups, REST requests, sensor reads) on a bounded thread pool and
+    awaits them. MongoQueryGeneral and roc_rest_api are synchronous, so this is a thread-offload mode:
+    max_workers (async_offload_threads) is the real limit on concurrent lookups, not the shard count.
+    """
+    def __init__ (
+            self,
+            loop,
+            max_workers = 16
+        ) -> None:
+
+        self.loop = loop
+        self.max_workers = int(max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="async-offload")
+
+    async def run(self, fn, *args):
+        return await self.loop.run_in_executor(self.executor, fn, *args)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+#--------------------------------------------------------------------------------------------------------------
+class AsyncMqttLoop (object):
+    """
+    Drives the MqttBroker paho client from the asyncio event loop through paho's socket callbacks,
+    replacing loop_start() and the connection_manager thread.
+    """
+    def __init__ (
+            self,
+            loop,
+            insLogger,
+            insMQTTbroker
+        ) -> None:
+
+        self.loop = loop
+        self.insLogger = insLogger
+        self.insMQTTbroker = insMQTTbroker
+        self.inbound_event = asyncio.Event()
+
+        client = insMQTTbroker.client
+        client.on_socket_open = self.on_socket_open
+        client.on_socket_close = self.on_socket_close
+        client.on_socket_register_write = self.on_socket_register_write
+        client.on_socket_unregister_write = self.on_socket_unregister_write
+#--------------------------------------------------------------------------------------------------------------
+    # paho may call these from any thread that publishes, so they are marshalled onto the loop
+    def on_socket_open(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.loop.add_reader, sock, self.on_readable, client)
+
+    def on_socket_close(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.loop.remove_reader, sock)
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.loop.add_writer, sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.loop.remove_writer, sock)
+
+    def on_readable(self, client):
+        client.loop_read()                  # on_message runs here and fills the inbound queue
+        if not self.insMQTTbroker.q.empty():
+            self.inbound_event.set()
+#--------------------------------------------------------------------------------------------------------------
+    async def attempt_connection(self, insOffload):
+        broker = self.insMQTTbroker
+        broker.connection_state = "connecting"
+        broker.connect_attempts += 1
+        broker.connack_event.clear()
+        broker.connection_lost_event.clear()
+        broker.client.connected_flag = False
+        broker.client.bad_connection_flag = False
+
+        try:
+            # DNS and the TCP handshake block, so they run off the loop
+            await insOffload.run(broker.client.connect, broker.mqtt_broker, broker.mqtt_port, broker.mqtt_keepalive)
+        except Exception as e:
+            broker.connect_failures += 1
+            self.insLogger.log_error(msg=f"[AsyncMqttLoop--attempt_connection ERROR] Connection failed: {e}")
+            return False
+
+        deadline = self.loop.time() + broker.mqtt_connect_timeout
+        while not broker.connack_event.is_set() and self.loop.time() < deadline:
+            await asyncio.sleep(0.05)
+
+        if broker.client.connected_flag:
+            self.insLogger.log_info(msg=f"[AsyncMqttLoop--attempt_connection] Connected using client_id: {broker.unique_client_id}")
+            return True
+
+        broker.connect_failures += 1
+        try:
+            broker.client.disconnect()
+        except Exception:
+            pass
+        return False
+
+    async def run(self, insOffload):
+        broker = self.insMQTTbroker
+        while not broker.stop_event.is_set():
+            if not await self.attempt_connection(insOffload):
+                delay = broker.get_backoff_delay()
+                broker.connection_state = "backoff"
+                self.insLogger.log_warning(
+                    msg=f"[AsyncMqttLoop--run] Broker {broker.mqtt_broker} unreachable, retry {broker.backoff_attempt} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            # keepalive pings and retries; reads and writes are event driven
+            while not broker.connection_lost_event.is_set():
+                broker.client.loop_misc()
+                await asyncio.sleep(1)
+
+            broker.connection_lost_event.clear()
+            if not broker.stop_event.is_set():
+                broker.connection_state = "disconnected"
+                self.insLogger.log_warning(msg=f"[AsyncMqttLoop--run] Connection to {broker.mqtt_broker} lost, reconnecting")
+
+        broker.connection_state = "stopped"
+#--------------------------------------------------------------------------------------------------------------
+class AsyncAccessDispatcher (object):
+    """
+    Replaces MQTToutQueue.dispatch: events are sharded by card / face / PIN onto asyncio queues and
+    each shard awaits its handler on the offload pool, so lookups for different people overlap while
+    each identifier's events stay in order. Shard queues are bounded like the threaded worker queues.
+    The handlers still run on offload threads; at most async_offload_threads of them are in flight.
+    """
+    def __init__ (
+            self,
+            loop,
+            insLogger,
+            insOffload,
+            shards = 64,
+            max_depth = 100,
+            shed_policy = "reject_new"
+        ) -> None:
+
+        self.loop = loop
+        self.insLogger = insLogger
+        self.insOffload = insOffload
+        self.shards = int(shards)
+        self.max_depth = int(max_depth)
+        self.shed_policy = shed_policy
+        self.shed_count = 0
+        self.shard_queues = [asyncio.Queue(maxsize=self.max_depth) for _ in range(self.shards)]
+        self.tasks = [self.loop.create_task(self.shard_worker(index)) for index in range(self.shards)]
+
+    def dispatch(self, shard_key, handler, *args):
+        index = crc32(str(shard_key).encode("utf-8")) % self.shards
+        self.loop.call_soon_threadsafe(self.enqueue, index, (handler, args))
+
+    def enqueue(self, index, item):
+        shard_queue = self.shard_queues[index]
+        try:
+            shard_queue.put_nowait(item)
+            return
+        except asyncio.QueueFull:
+            self.shed_count += 1
+
+        if self.shed_policy == "drop_oldest":
+            shard_queue.get_nowait()
+            shard_queue.task_done()
+            shard_queue.put_nowait(item)
+
+        self.insLogger.log_warning(
+            msg=f"[AsyncAccessDispatcher--enqueue] Shard {index} queue full ({self.max_depth}), {self.shed_policy}: shed {self.shed_count}"
+        )
+
+    async def shard_worker(self, index):
+        shard_queue = self.shard_queues[index]
+        while True:
+            handler, args = await shard_queue.get()
+            try:
+                await self.insOffload.run(handler, *args)
+            except Exception as e:
+                self.insLogger.log_error(msg=f"[AsyncAccessDispatcher--shard_worker ERROR] Shard {index}: {e}")
+            finally:
+                shard_queue.task_done()
+
+    def get_metrics(self):
+        return {
+            "shards": self.shards,
+            "policy": self.shed_policy,
+            "max": self.max_depth,
+            "shed": self.shed_count,
+            "depth": sum(q.qsize() for q in self.shard_queues)
+        }
+#--------------------------------------------------------------------------------------------------------------
+class MainAsync (Main):
+    """
+    Same objects as Main, with the MQTT network loop, inbound routing and timers scheduled on asyncio.
+    Blocking Mongo / HTTP / sensor calls are not async: they run on the AsyncOffload thread pool, which
+    takes the place of the access worker threads and the paho loop thread.
+    """
+    network_loop = "asyncio"
+    insDispatcher = None
+
+    def get_metrics (self):
+        metrics = super().get_metrics()
+        if self.insDispatcher is not None:
+            metrics["access_workers"] = self.insDispatcher.get_metrics()
+        return metrics
+
+    def main_loop (
+            self,
+            dtt,
+            insLogger,
+            insTimers,
+            insMachineInfo,
+            util_prt = False,
+            util_prt0 = False
+        ):
+
+        self.log_startup_info (dtt, insLogger, insMachineInfo, util_prt)
+
+        try:
+            asyncio.run(self.run_async(insLogger, insTimers))
+
+        except KeyboardInterrupt:
+            insLogger.log_info("Keyboard Ctrl-C detected. Disconnecting MQTT...")
+            self.insMQTTbroker.stop()
+
+        dtts = datetime.now().strftime(self.gen_datim_format)
+        insLogger.log_info(
+            msg = f"[MainAsync--main_loop] Keyboard Program Stopped at: {dtts}"
+        )
+#--------------------------------------------------------------------------------------------------------------
+    async def run_async(self, insLogger, insTimers):
+        loop = asyncio.get_running_loop()
+        queue_settings_dict = self.insMongoConfig.query_config_queue_settings() or {}
+
+        insOffload = AsyncOffload(loop, max_workers=queue_settings_dict.get("async_offload_threads", 16))
+        insMqttLoop = AsyncMqttLoop(loop, insLogger, self.insMQTTbroker)
+        insDispatcher = AsyncAccessDispatcher(
+            loop,
+            insLogger,
+            insOffload,
+            shards = queue_settings_dict.get("async_access_shards", 64),
+            max_depth = self.insMQTToutQueue.worker_queue_max,
+            shed_policy = self.insMQTToutQueue.worker_shed_policy
+        )
+        self.insMQTToutQueue.set_dispatcher(insDispatcher.dispatch)
+        self.insDispatcher = insDispatcher
+        insLogger.log_info(
+            msg = f"[MainAsync--run_async] Thread-offload mode: {insDispatcher.shards} access shard(s) on {insOffload.max_workers} offload thread(s)"
+        )
+
+        async def service_inbound():
+            # routing, stale shedding and coalescing; access handlers are dispatched to the shards
+            while True:
+                await insMqttLoop.inbound_event.wait()
+                insMqttLoop.inbound_event.clear()
+                while not self.insMQTTbroker.q.empty():
+                    await insOffload.run(self.insMQTToutQueue.service_out_queue, datetime.now())
+
+        async def service_timers():
+            # the ServiceTimers scheduler, woken for its next deadline instead of polled; the ticks
+            # themselves publish and read sensors, so they run on the offload pool, not the loop
+            while True:
+                await insOffload.run(insTimers.service_timer_ticks, datetime.now())
+                await asyncio.sleep(insTimers.next_delay())
+
+        tasks = [
+            insMqttLoop.run(insOffload),
+            service_inbound(),
+            service_timers()
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            insOffload.shutdown()
+
+#--------------------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+
+    MainAsync (
+        dtt = datetime.now ()
+    )
+
+#--------------------------------------------------------------------------------------------------------------
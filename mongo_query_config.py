@@ -1,4 +1,4 @@
-# updated: 2025-05-08 16:13:38
+# updated: 2026-10-19 12:35:50
 # created: 2025-05-05 03:36:05
 # filename: mongo_query_config.py
 #--------------------------------------------------------------------------------------------------------------
@@ -102,6 +102,65 @@ class MongoQueryConfig:
             self.insLogger.log_error(msg=f"[MongoQueryConfig--query_config_mqtt_settings ERROR] {e}")
             return None
 
+#--------------------------------------------------------------------------------------------------------------
+    def query_config_queue_settings(self):
+        try:
+            cfg_doc = self.db["config"].find_one({})
+            if not cfg_doc:
+                self.insLogger.log_error(msg="[MongoQueryConfig--query_config_queue_settings] No config document found")
+                return None
+
+            queue = cfg_doc.get("queue_settings")
+            if not queue:
+                self.insLogger.log_warning(msg="[MongoQueryConfig--query_config_queue_settings] 'queue_settings' block missing, using defaults")
+                return None
+
+            self.insLogger.log_info(msg="[MongoQueryConfig--query_config_queue_settings] queue_settings loaded – keys: " + ", ".join(queue.keys()))
+            return queue
+
+        except Exception as e:
+            self.insLogger.log_error(msg=f"[MongoQueryConfig--query_config_queue_settings ERROR] {e}")
+            return None
+
+#--------------------------------------------------------------------------------------------------------------
+    def query_config_breaker_settings(self):
+        try:
+            cfg_doc = self.db["config"].find_one({}, {"breaker_settings": 1})
+            if not cfg_doc:
+                self.insLogger.log_error(msg="[MongoQueryConfig--query_config_breaker_settings] No config document found")
+                return None
+
+            breaker = cfg_doc.get("breaker_settings")
+            if not breaker:
+                self.insLogger.log_warning(msg="[MongoQueryConfig--query_config_breaker_settings] 'breaker_settings' block missing, using defaults")
+                return None
+
+            self.insLogger.log_info(msg="[MongoQueryConfig--query_config_breaker_settings] breaker_settings loaded – keys: " + ", ".join(breaker.keys()))
+            return breaker
+
+        except Exception as e:
+            self.insLogger.log_error(msg=f"[MongoQueryConfig--query_config_breaker_settings ERROR] {e}")
+            return None
+
+#--------------------------------------------------------------------------------------------------------------
+    def query_config_input_schedules(self):
+        try:
+            cfg_doc = self.db["config"].find_one({}, {"input_schedules": 1})
+            if not cfg_doc:
+                self.insLogger.log_error(msg="[MongoQueryConfig--query_config_input_schedules] No config document found")
+                return None
+
+            schedules = cfg_doc.get("input_schedules")
+            if not schedules:
+                self.insLogger.log_debug(msg="[MongoQueryConfig--query_config_input_schedules] 'input_schedules' block missing")
+                return None
+
+            return schedules
+
+        except Exception as e:
+            self.insLogger.log_error(msg=f"[MongoQueryConfig--query_config_input_schedules ERROR] {e}")
+            return None
+
 #--------------------------------------------------------------------------------------------------------------
     def query_get_reader_serial_numbers_dict(self, status: bool):
         try:
@@ -233,6 +292,9 @@ if __name__ == "__main__":
     parser.add_argument("--general_settings", action="store_true", help="Fetch general_settings block")
     parser.add_argument("--access_settings", action="store_true", help="Fetch access_settings block")
     parser.add_argument("--mqtt_settings", action="store_true", help="Fetch mqtt_settings block")
+    parser.add_argument("--queue_settings", action="store_true", help="Fetch queue_settings block")
+    parser.add_argument("--breaker_settings", action="store_true", help="Fetch breaker_settings block")
+    parser.add_argument("--input_schedules", action="store_true", help="Fetch input_schedules block")
     parser.add_argument("--reader_serial_numbers", action="store_true", help="Query reader serial numbers from cameras")
     parser.add_argument("--servers_serial_numbers", action="store_true", help="Query ROC server serial numbers")
     parser.add_argument("--qr_code_servers_serial_numbers", action="store_true", help="Query QR Code server serial numbers")
@@ -262,6 +324,12 @@ if __name__ == "__main__":
         print(mq.query_config_access_settings())
     elif args.mqtt_settings:
         print(mq.query_config_mqtt_settings())
+    elif args.queue_settings:
+        print(mq.query_config_queue_settings())
+    elif args.breaker_settings:
+        print(mq.query_config_breaker_settings())
+    elif args.input_schedules:
+        print(mq.query_config_input_schedules())
     elif args.reader_serial_numbers:
         print(mq.query_get_reader_serial_numbers_dict(status=True))
     elif args.servers_serial_numbers:
@@ -284,6 +352,15 @@ python3 mongo_query_config.py --access_settings
 # Query mqtt_settings
 python3 mongo_query_config.py --mqtt_settings 
 
+# Query queue_settings
+python3 mongo_query_config.py --queue_settings
+
+# Query breaker_settings
+python3 mongo_query_config.py --breaker_settings
+
+# Query input_schedules
+python3 mongo_query_config.py --input_schedules
+
 # Query reader_serial_numbers
 python3 mongo_query_config.py --reader_serial_numbers
 
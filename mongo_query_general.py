@@ -1,19 +1,33 @@
-# updated: 2025-05-06 16:13:20
+# updated: 2026-10-19 13:04:14
 # created: 2025-05-05 13:45:18
 # filename: mongo_query_general.py
 #--------------------------------------------------------------------------------------------------------------
 from pymongo import MongoClient, errors
 from bson.objectid import ObjectId
 from argparse import ArgumentParser
+from threading import Lock
+from collections import OrderedDict
+from circuit_breaker import insBreakerRegistry
 #--------------------------------------------------------------------------------------------------------------
 class MongoQueryGeneral:
     def __init__(
         self,
         insLogger = None,
-        ini_mongo_variables_dict = None
+        ini_mongo_variables_dict = None,
+        breaker_settings_dict = None
     ):
         self.insLogger = insLogger
 
+        # fast-fail: bounded driver timeouts plus a circuit breaker over every query;
+        # policy "deny" answers like a miss while the breaker is open, "cache" serves the last known result
+        breaker_settings_dict = dict(breaker_settings_dict or {})
+        self.breaker_policy = breaker_settings_dict.pop("policy", "deny")
+        timeout_ms = int(breaker_settings_dict.pop("timeout_ms", 2000))
+        self.fallback_max_entries = int(breaker_settings_dict.pop("cache_entries", 10000))
+        self.fallback_lock = Lock()
+        self.fallback_cache = OrderedDict()     # (collection, filter) -> last document found (or None)
+        self.insBreaker = insBreakerRegistry.get("mongo", **breaker_settings_dict)
+
         """
         ChatGPT:  Do not remove the following print statements, to be removed after testing is complete.
         print (f"mongo_hostname: {ini_mongo_variables_dict['mongo_hostname']}")
@@ -36,7 +50,10 @@ class MongoQueryGeneral:
                 port = int(port),
                 username = ini_mongo_variables_dict["mongo_db_username"],
                 password = ini_mongo_variables_dict["mongo_db_password"],
-                authSource = ini_mongo_variables_dict["mongo_auth_db"]
+                authSource = ini_mongo_variables_dict["mongo_auth_db"],
+                serverSelectionTimeoutMS = timeout_ms,
+                connectTimeoutMS = timeout_ms,
+                socketTimeoutMS = timeout_ms
             )
 
             self.client.admin.command("ping")
@@ -60,11 +77,43 @@ class MongoQueryGeneral:
             self.insLogger.log_error(msg=f"[MongoQueryGeneral--ensure_indexes ERROR] Failed to create indexes: {e}")
 
 #--------------------------------------------------------------------------------------------------------------
-    def query_user_by_faceId(self, faceId: str):
-        users_collection = self.db["users"]
+    def _find_one(self, collection_name, query):
+        """find_one through the mongo breaker; raises CircuitBreakerOpen or the driver error unless the cache policy has an answer."""
+        key = (collection_name, tuple(sorted(query.items())))
+        try:
+            doc = self.insBreaker.call(self.db[collection_name].find_one, query)
+        except Exception as e:
+            if self.breaker_policy == "cache":
+                with self.fallback_lock:
+                    if key in self.fallback_cache:
+                        self.insLogger.log_warning(msg=f"[MongoQueryGeneral--_find_one] {e}; serving cached {collection_name} result for {query}")
+                        return self.fallback_cache[key]
+            raise
+
+        if self.breaker_policy == "cache":
+            with self.fallback_lock:
+                self.fallback_cache[key] = doc
+                self.fallback_cache.move_to_end(key)
+                while len(self.fallback_cache) > self.fallback_max_entries:
+                    self.fallback_cache.popitem(last=False)
+        return doc
+
+    def _refresh_cached_user(self, cardNumber, update_fields):
+        """Cache policy: after a users write, cached documents of that card carry the written fields, so a fallback never serves pre-write state."""
+        if self.breaker_policy != "cache":
+            return
+        with self.fallback_lock:
+            stale_keys = [
+                key for key, doc in self.fallback_cache.items()
+                if key[0] == "users" and doc and cardNumber in (doc.get("cardNumbers") or [])
+            ]
+            for key in stale_keys:
+                self.fallback_cache[key] = {**self.fallback_cache[key], **update_fields}
 
+#--------------------------------------------------------------------------------------------------------------
+    def query_user_by_faceId(self, faceId: str):
         try:
-            user_doc = users_collection.find_one({
+            user_doc = self._find_one("users", {
                 "faceId": faceId,
                 "enable": True
             })
@@ -89,10 +138,8 @@ class MongoQueryGeneral:
 
 #--------------------------------------------------------------------------------------------------------------
     def query_user_by_card_number(self, cardNumber: str):
-        users_collection = self.db["users"]
-
         try:
-            user_doc = users_collection.find_one({
+            user_doc = self._find_one("users", {
                 "cardNumbers": cardNumber,
                 "enable": True
             })
@@ -117,10 +164,8 @@ class MongoQueryGeneral:
 
 #--------------------------------------------------------------------------------------------------------------
     def query_access_zone_info_by_card_number(self, cardNumber):
-        users_collection = self.db["users"]
-
         try:
-            user_doc = users_collection.find_one({"cardNumbers": cardNumber})
+            user_doc = self._find_one("users", {"cardNumbers": cardNumber})
 
             if user_doc:
                 access_info = (
@@ -154,10 +199,8 @@ class MongoQueryGeneral:
 
 #--------------------------------------------------------------------------------------------------------------
     def query_access_zone_info_by_cameraId(self, cameraId):
-        cameras_collection = self.db["cameras"]
-
         try:
-            camera_doc = cameras_collection.find_one({"cameraId": cameraId})
+            camera_doc = self._find_one("cameras", {"cameraId": cameraId})
 
             if camera_doc:
                 access_info = {
@@ -191,10 +234,8 @@ class MongoQueryGeneral:
 
 #--------------------------------------------------------------------------------------------------------------
     def query_watchlistIds_by_cameraId(self, cameraId: str):
-        cameras_collection = self.db["cameras"]
-
         try:
-            camera_doc = cameras_collection.find_one({
+            camera_doc = self._find_one("cameras", {
                 "cameraId": cameraId,
                 "enable": True
             })
@@ -221,10 +262,8 @@ class MongoQueryGeneral:
 
 #--------------------------------------------------------------------------------------------------------------
     def query_reader_serial_by_cameraId(self, cameraId: str):
-        cameras_collection = self.db["cameras"]
-
         try:
-            camera_doc = cameras_collection.find_one({
+            camera_doc = self._find_one("cameras", {
                 "cameraId": cameraId,
                 "enable": True
             })
@@ -249,11 +288,9 @@ class MongoQueryGeneral:
 
 #--------------------------------------------------------------------------------------------------------------
     def query_verifIdent_by_cameraId(self, cameraId: str):
-        cameras_collection = self.db["cameras"]
-
         try:
             # Only return info from enabled cameras
-            camera_doc = cameras_collection.find_one({
+            camera_doc = self._find_one("cameras", {
                 "cameraId": cameraId,
                 "enable": True
             })
@@ -279,10 +316,8 @@ class MongoQueryGeneral:
 
 #--------------------------------------------------------------------------------------------------------------
     def query_user_by_pinNumber(self, pinNumber: str):
-        users_collection = self.db["users"]
-
         try:
-            user_doc = users_collection.find_one({
+            user_doc = self._find_one("users", {
                 "pinNumber": pinNumber,
                 "enable": True
             })
@@ -308,7 +343,7 @@ class MongoQueryGeneral:
 #--------------------------------------------------------------------------------------------------------------
     def get_user_document_by_faceId(self, faceId: str):
         try:
-            user_doc = self.db["users"].find_one({
+            user_doc = self._find_one("users", {
                 "faceId": faceId,
                 "enable": True
             })
@@ -344,7 +379,7 @@ class MongoQueryGeneral:
 #--------------------------------------------------------------------------------------------------------------
     def get_user_document_by_card_number(self, cardNumber: str):
         try:
-            user_doc = self.db["users"].find_one({
+            user_doc = self._find_one("users", {
                 "cardNumbers": cardNumber,
                 "enable": True
             })
@@ -367,6 +402,34 @@ class MongoQueryGeneral:
         user_doc = self.get_user_document_by_card_number(cardNumber)
         return user_doc.get("verifIdent") if user_doc else None
 
+#--------------------------------------------------------------------------------------------------------------
+    def update_user_by_card_number(self, cardNumber: str, update_fields: dict):
+        """$set update_fields on the user holding cardNumber, through the mongo breaker; False when not found or failed."""
+        try:
+            result = self.insBreaker.call(
+                self.db["users"].update_one,
+                {"cardNumbers": cardNumber},
+                {"$set": update_fields}
+            )
+            self._refresh_cached_user(cardNumber, update_fields)
+
+            if result.matched_count:
+                self.insLogger.log_info(
+                    msg=f"[MongoQueryGeneral--update_user_by_card_number] Updated user (card: {cardNumber}): {update_fields}"
+                )
+                return True
+
+            self.insLogger.log_error(
+                msg=f"[MongoQueryGeneral--update_user_by_card_number NOT FOUND] No user found with card number: {cardNumber}"
+            )
+            return False
+
+        except Exception as e:
+            self.insLogger.log_error(
+                msg=f"[MongoQueryGeneral--update_user_by_card_number MONGO ERROR] Failed to update user with card {cardNumber}: {e}"
+            )
+            return False
+
 #--------------------------------------------------------------------------------------------------------------
     def update_access_zone_info_by_card_number(
             self, 
@@ -376,7 +439,7 @@ class MongoQueryGeneral:
         users_collection = self.db["users"]
 
         try:
-            user_doc = users_collection.find_one({"cardNumbers": cardNumber})
+            user_doc = self._find_one("users", {"cardNumbers": cardNumber})
 
             if not user_doc:
                 self.insLogger.log_error(f"[MongoQueryGeneral--update_access_zone_info_by_card_number NOT FOUND] No user found with card number: {cardNumber}")
@@ -394,10 +457,12 @@ class MongoQueryGeneral:
                 "free_movement": False
             }
 
-            result = users_collection.update_one(
+            result = self.insBreaker.call(
+                users_collection.update_one,
                 {"_id": user_doc["_id"]},
                 {"$set": update_fields}
             )
+            self._refresh_cached_user(cardNumber, update_fields)
 
             if result.modified_count > 0:
                 self.insLogger.log_info(
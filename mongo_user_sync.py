@@ -1,20 +1,138 @@
-# updated: 2025-06-25 18:00:16
+# updated: 2026-10-19 12:54:20
 # created: 2025-06-25 17:09:56
 # filename: mongo_user_sync.py
 
 #--------------------------------------------------------------------------------------------------------------
 import argparse
 import os
-from pymongo import MongoClient
+from itertools import count
+from pymongo import MongoClient, UpdateOne, DeleteMany
+from pymongo.errors import BulkWriteError
 from bson import ObjectId
 from logger import CustomLogger  # Replace with your actual logger path
 
 #--------------------------------------------------------------------------------------------------------------
 LOG_PATH = "logs/updater.log"
+STATE_FIELDS = ("current_access_zone", "free_movement")    # runtime state, never overwritten by a sync
+PLACEHOLDER_BADGE = "x"                                     # ROC "Badge ID" placeholder: the user gets a generated cardNumber
 
-# Delete existing log file if it exists
-if os.path.exists(LOG_PATH):
-    os.remove(LOG_PATH)
+#--------------------------------------------------------------------------------------------------------------
+def get_id_number_value(id_numbers, key):
+    for item in id_numbers:
+        if item.get("type") == key:
+            return item.get("value")
+    return None
+
+def transform_document(src_doc, card_counter=None):
+    """
+    Maps a ROC watchlisted face to a users document. "x" badges are numbered from card_counter when one is
+    given (option1, into an emptied collection), otherwise left as [PLACEHOLDER_BADGE] for fill_placeholder_badges.
+    """
+    id_numbers = src_doc.get("idNumbers", [])
+
+    def parse_list(value):
+        if value is None or str(value).strip().lower() == "x":
+            return [7, 8, 9, 10]
+        if isinstance(value, str):
+            try:
+                return [int(v.strip()) for v in value.split(",") if v.strip().isdigit()]
+            except:
+                return [7, 8, 9, 10]
+        return value if isinstance(value, list) else [7, 8, 9, 10]
+
+
+    def parse_verif(value):
+        return str(value).lower() == "true"
+
+    def parse_card(value):
+        if value is None:
+            return []
+        return [value] if value else []
+
+    def parse_groups(value):
+        return {"group1": value} if value else {}
+
+    # Badge ID logic with "x" replacement
+    card_value = get_id_number_value(id_numbers, "Badge ID")
+    if isinstance(card_value, str) and card_value.strip().lower() == PLACEHOLDER_BADGE:
+        card_value = str(next(card_counter)) if card_counter is not None else PLACEHOLDER_BADGE
+
+    return {
+        "_id": src_doc["_id"],
+        "enable": src_doc.get("enabled", True),
+        "firstName": src_doc.get("firstname", "").strip(),
+        "lastName": src_doc.get("lastname", "").strip(),
+        "faceId": src_doc.get("internalId"),
+        "customerId": src_doc.get("identityData", {}).get("customerId"),
+        "employeeId": get_id_number_value(id_numbers, "Employee ID"),
+        "cardNumbers": parse_card(card_value),
+        "pinNumber": get_id_number_value(id_numbers, "PIN Number"),
+        "accessZones": parse_list(get_id_number_value(id_numbers, "Access Zones")),
+        "verifIdent": parse_verif(get_id_number_value(id_numbers, "Verif Ident")),
+        "userGroups": parse_groups(get_id_number_value(id_numbers, "Access Groups")),
+        "current_access_zone": 0,
+        "free_movement": True
+    }
+
+class CardNumberAllocator:
+    """
+    cardNumbers for the "x" badges of users being inserted: counts on from the highest numeric cardNumber
+    in users (read once, on the first allocation) and above any explicit badge number of the same run.
+    """
+    def __init__(self, target_col):
+        self.target_col = target_col
+        self.next_number = None
+        self.reserved_max = 0
+
+    def reserve(self, card_number):
+        if str(card_number).isdigit():
+            self.reserved_max = max(self.reserved_max, int(card_number))
+
+    def allocate(self):
+        if self.next_number is None:
+            highest = 0
+            for doc in self.target_col.find({"cardNumbers.0": {"$exists": True}}, {"cardNumbers": 1}):
+                for card_number in doc.get("cardNumbers") or []:
+                    if str(card_number).isdigit():
+                        highest = max(highest, int(card_number))
+            self.next_number = highest + 1
+        self.next_number = max(self.next_number, self.reserved_max + 1)
+        card_number = self.next_number
+        self.next_number += 1
+        return str(card_number)
+
+def fill_placeholder_badges(tgt_docs, stored, insAllocator):
+    """
+    Resolves [PLACEHOLDER_BADGE] cardNumbers in place: a user already in users keeps the cardNumbers stored
+    there, a new one gets the next allocated number. stored maps _id -> users document (cardNumbers at least).
+    """
+    for tgt_doc in tgt_docs:
+        for card_number in tgt_doc["cardNumbers"]:
+            insAllocator.reserve(card_number)
+
+    for tgt_doc in tgt_docs:
+        if tgt_doc["cardNumbers"] != [PLACEHOLDER_BADGE]:
+            continue
+        stored_cards = (stored.get(tgt_doc["_id"]) or {}).get("cardNumbers")
+        tgt_doc["cardNumbers"] = stored_cards if stored_cards else [insAllocator.allocate()]
+
+def to_object_id(value):
+    return ObjectId(value) if ObjectId.is_valid(value) else value
+
+def to_upsert(tgt_doc):
+    """UpdateOne that refreshes the user's fields but only seeds STATE_FIELDS on insert."""
+    fields = dict(tgt_doc)
+    _id = fields.pop("_id")
+    state = {key: fields.pop(key) for key in STATE_FIELDS}
+    return UpdateOne({"_id": _id}, {"$set": fields, "$setOnInsert": state}, upsert=True)
+
+def diff_user(tgt_doc_new, tgt_doc_old):
+    """Fields of tgt_doc_new that differ from the stored user, as {field: (old, new)}; STATE_FIELDS are kept."""
+    return {
+        key: (tgt_doc_old.get(key), new_val)
+        for key, new_val in tgt_doc_new.items()
+        if key != "_id" and key not in STATE_FIELDS and tgt_doc_old.get(key) != new_val
+    }
 
 #--------------------------------------------------------------------------------------------------------------
 class MongoUserSync:
@@ -31,108 +149,137 @@ class MongoUserSync:
         self.target_col = self.client["accessDB2"]["users"]
 
     def get_id_number_value(self, id_numbers, key):
-        for item in id_numbers:
-            if item.get("type") == key:
-                return item.get("value")
-        return None
+        return get_id_number_value(id_numbers, key)
 
     def transform_document(self, src_doc):
-        if not hasattr(self, 'card_counter'):
-            self.card_counter = 1
-
-        id_numbers = src_doc.get("idNumbers", [])
-
-        def parse_list(value):
-            if value is None or str(value).strip().lower() == "x":
-                return [7, 8, 9, 10]
-            if isinstance(value, str):
-                try:
-                    return [int(v.strip()) for v in value.split(",") if v.strip().isdigit()]
-                except:
-                    return [7, 8, 9, 10]
-            return value if isinstance(value, list) else [7, 8, 9, 10]
-
-
-        def parse_verif(value):
-            return str(value).lower() == "true"
-
-        def parse_card(value):
-            if value is None:
-                return []
-            return [value] if value else []
-
-        def parse_groups(value):
-            return {"group1": value} if value else {}
-
-        # Badge ID logic with "x" replacement
-        card_value = self.get_id_number_value(id_numbers, "Badge ID")
-        if isinstance(card_value, str) and card_value.strip().lower() == "x":
-            card_value = str(self.card_counter)
-            self.card_counter += 1
-
-        return {
-            "_id": src_doc["_id"],
-            "enable": src_doc.get("enabled", True),
-            "firstName": src_doc.get("firstname", "").strip(),
-            "lastName": src_doc.get("lastname", "").strip(),
-            "faceId": src_doc.get("internalId"),
-            "customerId": src_doc.get("identityData", {}).get("customerId"),
-            "employeeId": self.get_id_number_value(id_numbers, "Employee ID"),
-            "cardNumbers": parse_card(card_value),
-            "pinNumber": self.get_id_number_value(id_numbers, "PIN Number"),
-            "accessZones": parse_list(self.get_id_number_value(id_numbers, "Access Zones")),
-            "verifIdent": parse_verif(self.get_id_number_value(id_numbers, "Verif Ident")),
-            "userGroups": parse_groups(self.get_id_number_value(id_numbers, "Access Groups")),
-            "current_access_zone": 0,
-            "free_movement": True
-        }
+        return transform_document(src_doc)
 
 #--------------------------------------------------------------------------------------------------------------
     def option1_recreate_users(self):
         self.target_col.delete_many({})
-        count = 0
+        card_counter = count(1)         # users is empty: "x" badges are numbered from 1
+        inserted = 0
         for src_doc in self.source_col.find():
-            tgt_doc = self.transform_document(src_doc)
+            tgt_doc = transform_document(src_doc, card_counter)
             try:
                 self.target_col.insert_one(tgt_doc)
             except Exception as e:
                 self.insLogger.log_error(msg=f"[MongoUserSync--option1_recreate_users] Failed to insert _id={tgt_doc.get('_id')}, error={str(e)}")
                 continue
-            count += 1
-        self.insLogger.log_info(msg=f"[MongoUserSync--option1_recreate_users] Inserted {count} transformed users into accessDB2.users")
+            inserted += 1
+        self.insLogger.log_info(msg=f"[MongoUserSync--option1_recreate_users] Inserted {inserted} transformed users into accessDB2.users")
 
 #--------------------------------------------------------------------------------------------------------------
-    def option2_update_changed_users(self):
+    def option2_update_changed_users(self, batch_size=1000, dry_run=False):
+        """
+        Streams the source in batches, prefetches the matching users with one $in query per batch, diffs
+        them in memory and applies one unordered bulk_write per batch: $set of the changed fields, and an
+        upsert for source faces missing from users. With dry_run nothing is written and the diff is returned.
+        """
         method = "option2_update_changed_users"
-        update_count = 0
-        for src_doc in self.source_col.find():
-            tgt_doc_new = self.transform_document(src_doc)
-            tgt_doc_old = self.target_col.find_one({"_id": tgt_doc_new["_id"]})
-            if tgt_doc_old:
-                update_fields = {}
-                for key, new_val in tgt_doc_new.items():
-                    old_val = tgt_doc_old.get(key)
-                    if old_val != new_val:
-                        update_fields[key] = new_val
-
-                if update_fields:
-                    _id = tgt_doc_new['_id']
-                    internal_id = tgt_doc_new.get('faceId')
-                    self.insLogger.log_info(
-                        msg=f"[MongoUserSync--{method}] Would update _id={_id}, internalId={internal_id}"
-                    )
-                    self.target_col.update_one({"_id": tgt_doc_new["_id"]}, {"$set": update_fields})
-                    update_count += 1
-                    self.insLogger.log_info(msg=f"[MongoUserSync--option2_update_changed_users] Updated _id: {tgt_doc_new['_id']}, fields: {list(update_fields.keys())}")
-
-        self.insLogger.log_info(msg=f"[MongoUserSync--option2_update_changed_users] Total updated documents: {update_count}")
+        report = {"scanned": 0, "inserted": 0, "updated": 0, "unchanged": 0, "write_errors": 0}
+        diff = {}
+        insAllocator = CardNumberAllocator(self.target_col)
+
+        batch = []
+        for src_doc in self.source_col.find(batch_size=batch_size):
+            batch.append(self.transform_document(src_doc))
+            if len(batch) >= batch_size:
+                self.sync_user_batch(batch, report, diff if dry_run else None, insAllocator)
+                batch = []
+        self.sync_user_batch(batch, report, diff if dry_run else None, insAllocator)
+
+        self.insLogger.log_info(msg=f"[MongoUserSync--{method}] {'Dry run' if dry_run else 'Sync'} complete: {report}")
+        if dry_run:
+            report["diff"] = diff
+        return report
+
+    def sync_user_batch(self, batch, report, diff=None, insAllocator=None):
+        """Diffs one batch against users; writes it unless diff is given, in which case the changes are collected there."""
+        method = "option2_update_changed_users"
+        if not batch:
+            return
+
+        stored = {doc["_id"]: doc for doc in self.target_col.find({"_id": {"$in": [doc["_id"] for doc in batch]}})}
+        fill_placeholder_badges(batch, stored, insAllocator or CardNumberAllocator(self.target_col))
+        operations = []
+        for tgt_doc_new in batch:
+            report["scanned"] += 1
+            _id = tgt_doc_new["_id"]
+            tgt_doc_old = stored.get(_id)
+
+            if tgt_doc_old is None:
+                report["inserted"] += 1
+                operations.append(to_upsert(tgt_doc_new))
+                changes = {key: (None, value) for key, value in tgt_doc_new.items() if key != "_id"}
+                self.insLogger.log_info(msg=f"[MongoUserSync--{method}] Insert _id={_id}, internalId={tgt_doc_new.get('faceId')}")
+            else:
+                changes = diff_user(tgt_doc_new, tgt_doc_old)
+                if not changes:
+                    report["unchanged"] += 1
+                    continue
+                report["updated"] += 1
+                operations.append(UpdateOne({"_id": _id}, {"$set": {key: new_val for key, (old_val, new_val) in changes.items()}}))
+                self.insLogger.log_info(msg=f"[MongoUserSync--{method}] Update _id={_id}, fields: {list(changes.keys())}")
+
+            if diff is not None:
+                diff[str(_id)] = changes
+
+        if diff is not None or not operations:
+            return
+        try:
+            self.target_col.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # unordered: everything but the failed operations was applied
+            write_errors = e.details.get("writeErrors", [])
+            report["write_errors"] += len(write_errors)
+            self.insLogger.log_error(
+                msg=f"[MongoUserSync--{method} ERROR] {len(write_errors)} write error(s), first: {write_errors[0].get('errmsg') if write_errors else None}"
+            )
+
+#--------------------------------------------------------------------------------------------------------------
+    def apply_watchlist_delta(self, delta):
+        """Applies a ROCRestAPI.compute_watchlist_delta result to users: upserts added/updated faces, deletes removed ones."""
+        tgt_docs = [
+            self.transform_document({**face, "_id": to_object_id(face_id)})
+            for action in ("added", "updated")
+            for face_id, face in delta[action].items()
+        ]
+        placeholder_ids = [tgt_doc["_id"] for tgt_doc in tgt_docs if tgt_doc["cardNumbers"] == [PLACEHOLDER_BADGE]]
+        stored = {}
+        if placeholder_ids:
+            stored = {doc["_id"]: doc for doc in self.target_col.find({"_id": {"$in": placeholder_ids}}, {"cardNumbers": 1})}
+        fill_placeholder_badges(tgt_docs, stored, CardNumberAllocator(self.target_col))
+
+        operations = [to_upsert(tgt_doc) for tgt_doc in tgt_docs]
+
+        if delta["deleted"]:
+            operations.append(DeleteMany({"_id": {"$in": [to_object_id(face_id) for face_id in delta["deleted"]]}}))
+
+        if not operations:
+            self.insLogger.log_info(msg="[MongoUserSync--apply_watchlist_delta] No changes to apply")
+            return None
+
+        result = self.target_col.bulk_write(operations, ordered=False)
+        self.insLogger.log_info(
+            msg=(f"[MongoUserSync--apply_watchlist_delta] upserted: {result.upserted_count}, modified: {result.modified_count}, "
+                f"deleted: {result.deleted_count}")
+        )
+        return result
 
 #--------------------------------------------------------------------------------------------------------------
 def main():
     parser = argparse.ArgumentParser(description="Sync watchlistedfaces to users collection")
-    parser.add_argument("--option", choices=["option1", "option2"], required=True, help="Choose sync option")
+    parser.add_argument("--option", choices=["option1", "option2", "delta"], required=True, help="Choose sync option")
+    parser.add_argument("--server", help="ROC server from config/.credentials.json (required for delta)")
+    parser.add_argument("--batch_size", type=int, default=1000, help="Users diffed and written per bulk_write in option2 (default: 1000)")
+    parser.add_argument("--dry_run", action="store_true", help="option2: report the inserts/updates without writing")
     args = parser.parse_args()
 
+    # Delete existing log file if it exists
+    if os.path.exists(LOG_PATH):
+        os.remove(LOG_PATH)
+
     custom_logger = CustomLogger(
         backup_count=5,
         max_bytes=10485760,
@@ -151,7 +298,21 @@ def main():
     if args.option == "option1":
         syncer.option1_recreate_users()
     elif args.option == "option2":
-        syncer.option2_update_changed_users()
+        report = syncer.option2_update_changed_users(batch_size=args.batch_size, dry_run=args.dry_run)
+        if args.dry_run:
+            for _id, changes in report["diff"].items():
+                print(_id, {key: f"{old_val!r} -> {new_val!r}" for key, (old_val, new_val) in changes.items()})
+        print({key: value for key, value in report.items() if key != "diff"})
+    elif args.option == "delta":
+        if not args.server:
+            custom_logger.log_error(msg="Missing --server argument for delta")
+            return
+        from roc_rest_api import ROCRestAPI
+        insClient = ROCRestAPI(insLogger=custom_logger, rocServer=args.server)
+        # users has its own manifest; the CSV export is roc_rest_api.py --action sync_watchlist_delta
+        delta, manifest = insClient.compute_watchlist_delta(consumer="users")
+        syncer.apply_watchlist_delta(delta)
+        insClient.save_manifest(manifest, consumer="users")
 
 #--------------------------------------------------------------------------------------------------------------
 if __name__ == "__main__":
@@ -163,6 +324,8 @@ Example Usage:
 source ./venv/bin/activate
 python3 mongo_user_sync.py --option option1
 python3 mongo_user_sync.py --option option2
+python3 mongo_user_sync.py --option option2 --dry_run
+python3 mongo_user_sync.py --option delta --server rocdemo1
 """
 
 #--------------------------------------------------------------------------------------------------------------
\ No newline at end of file
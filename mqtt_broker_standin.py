@@ -0,0 +1,567 @@
+# updated: 2026-10-19 13:07:21
+# created: 2026-10-19 12:45:17
+# filename: mqtt_broker_standin.py
+
+#--------------------------------------------------------------------------------------------------------------
+import argparse
+from json import load, loads, dumps
+from time import monotonic, sleep
+from itertools import count
+from threading import Lock
+from datetime import datetime
+from collections import Counter, defaultdict
+#--------------------------------------------------------------------------------------------------------------
+def topic_matches(topic_filter, topic):
+    """MQTT topic filter match with + and # wildcards."""
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for index, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if index >= len(topic_levels) or (level != "+" and level != topic_levels[index]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+#--------------------------------------------------------------------------------------------------------------
+class StandInMessage (object):
+    """The paho MQTTMessage attributes the access server reads."""
+    def __init__ (self, topic, payload, qos=0, mid=0) -> None:
+        self.topic = topic
+        self.payload = payload if isinstance(payload, bytes) else str(payload).encode("utf-8")
+        self.qos = qos
+        self.mid = mid
+        self.retain = False
+        self.timestamp = monotonic()        # paho: local receive time
+
+class StandInPublishResult (object):
+    def __init__ (self, rc, mid) -> None:
+        self.rc = rc
+        self.mid = mid
+#--------------------------------------------------------------------------------------------------------------
+class StandInBroker (object):
+    """
+    In-process MQTT broker for functional checks: plain subscriptions deliver to every matching client,
+    $share/<group>/<filter> subscriptions deliver each message to one member of the group, round-robin
+    over all the group's messages (whatever filter they match) starting at share_offset, as an MQTT v5
+    broker does. Delivery is synchronous on the publishing thread.
+    """
+    def __init__ (self, share_offset=0) -> None:
+        self.lock = Lock()
+        self.subscriptions = []         # (client, topic filter)
+        self.share_groups = {}          # (group, topic filter) -> [clients]
+        self.share_next = Counter()     # group -> messages handed out
+        self.share_offset = share_offset
+        self.mids = count(1)
+        self.published = 0
+
+    def client(self, client_id):
+        return StandInClient(self, client_id)
+
+    def subscribe(self, client, topic):
+        with self.lock:
+            if topic.startswith("$share/"):
+                _, group, topic_filter = topic.split("/", 2)
+                members = self.share_groups.setdefault((group, topic_filter), [])
+                if client not in members:
+                    members.append(client)
+            elif (client, topic) not in self.subscriptions:
+                self.subscriptions.append((client, topic))
+            return next(self.mids)
+
+    def publish(self, topic, payload, qos=0):
+        with self.lock:
+            self.published += 1
+            receivers = []
+            for client, topic_filter in self.subscriptions:
+                if topic_matches(topic_filter, topic) and client not in receivers:
+                    receivers.append(client)
+            for (group, topic_filter), members in self.share_groups.items():
+                if members and topic_matches(topic_filter, topic):
+                    member = members[(self.share_offset + self.share_next[group]) % len(members)]
+                    self.share_next[group] += 1
+                    receivers.append(member)
+            mid = next(self.mids)
+
+        for client in receivers:
+            client.deliver(StandInMessage(topic, payload, qos, mid))
+        return mid
+#--------------------------------------------------------------------------------------------------------------
+class StandInClient (object):
+    """Replaces MqttBroker.client: the paho calls MqttBroker makes, routed through a StandInBroker."""
+    def __init__ (self, insBroker, client_id) -> None:
+        self.insBroker = insBroker
+        self.client_id = client_id
+        self.connected_flag = True
+        self.disconnect_flag = False
+        self.bad_connection_flag = False
+        self.on_message = None
+        self.on_publish = None
+        self.received = 0
+        self.received_topics = Counter()
+
+    def subscribe(self, topic, qos=0):
+        return 0, self.insBroker.subscribe(self, topic)
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        mid = self.insBroker.publish(topic, payload, qos)
+        if self.on_publish is not None:
+            self.on_publish(self, None, mid)
+        return StandInPublishResult(0, mid)
+
+    def deliver(self, message):
+        self.received += 1
+        self.received_topics[message.topic] += 1
+        if self.on_message is not None:
+            self.on_message(self, None, message)
+
+    def disconnect(self):
+        self.connected_flag = False
+
+    def loop_stop(self):
+        pass
+#--------------------------------------------------------------------------------------------------------------
+class StandInMongoConfig (object):
+    """MongoQueryConfig answers from config/config.json, with the serial numbers a check needs."""
+    def __init__ (
+            self,
+            config_path = "config/config.json",
+            overrides = None,
+            readers = None,
+            servers = None,
+            qr_code_servers = None
+        ) -> None:
+
+        with open(config_path, "r") as f:
+            self.config = load(f)
+        for block, values in (overrides or {}).items():
+            self.config.setdefault(block, {}).update(values)
+
+        self.readers = readers or {}
+        self.servers = servers or {}
+        self.qr_code_servers = qr_code_servers or {}
+
+    def query_config_general_settings(self):
+        return self.config.get("general_settings")
+
+    def query_config_access_settings(self):
+        return self.config.get("access_settings")
+
+    def query_config_mqtt_settings(self):
+        return self.config.get("mqtt_settings")
+
+    def query_config_queue_settings(self):
+        return self.config.get("queue_settings")
+
+    def query_config_breaker_settings(self):
+        return self.config.get("breaker_settings")
+
+    def query_config_input_schedules(self):
+        return self.config.get("input_schedules")
+
+    def query_get_reader_serial_numbers_dict(self, status=True):
+        return dict(self.readers)
+
+    def query_get_servers_serial_numbers_dict(self, status=True):
+        return dict(self.servers)
+
+    def query_get_qr_code_servers_serial_numbers_dict(self, status=True):
+        return dict(self.qr_code_servers)
+
+    def query_config_mqtt_subscribe_test_clients(self, status=True):
+        return {}
+
+class StandInMachineInfo (object):
+    """MachineInfo identity for one simulated access-server instance."""
+    def __init__ (self, serial_number, program_version="stand-in") -> None:
+        self.serial_number = serial_number
+        self.program_version = program_version
+        self.program_updated = ""
+
+    def get_unique_client_id(self):
+        return f"client-{self.serial_number}"
+
+    def get_own_serial_number(self):
+        return self.serial_number
+
+    def get_ip_address(self):
+        return "localhost", "127.0.0.1"
+
+    def get_cpu_information(self):
+        return "stand-in"
+
+    def get_raspberry_pi_model(self):
+        return "stand-in"
+
+    def get_latest_cpu_temperature(self):
+        return None
+#--------------------------------------------------------------------------------------------------------------
+class StandInMongoGeneral (object):
+    """
+    MongoQueryGeneral answers for the access path from in-memory users and cameras, each query
+    sleeping latency_ms like a round trip to MongoDB. Zone state is read and written per card.
+    """
+    def __init__ (self, users, cameras, latency_ms=1.0) -> None:
+        self.latency = latency_ms / 1000
+        self.lock = Lock()
+        self.users = users                      # _id -> user document
+        self.cameras = cameras                  # cameraId -> camera document
+        self.by_field = {"faceId": {}, "cardNumbers": {}, "pinNumber": {}}
+        for user_doc in users.values():
+            self.by_field["faceId"][user_doc["faceId"]] = user_doc
+            self.by_field["pinNumber"][user_doc["pinNumber"]] = user_doc
+            for card_number in user_doc["cardNumbers"]:
+                self.by_field["cardNumbers"][card_number] = user_doc
+        self.queries = 0
+
+    def _find(self, field, value):
+        sleep(self.latency)
+        with self.lock:
+            self.queries += 1
+            return self.by_field[field].get(value)
+
+    def query_watchlistIds_by_cameraId(self, cameraId):
+        sleep(self.latency)
+        return [("Staff", "wl-1")]
+
+    def query_reader_serial_by_cameraId(self, cameraId):
+        sleep(self.latency)
+        return self.cameras[cameraId]["readerSerial"]
+
+    def query_access_zone_info_by_cameraId(self, cameraId):
+        sleep(self.latency)
+        return dict(self.cameras[cameraId])
+
+    def query_verifIdent_by_cameraId(self, cameraId):
+        return False
+
+    def full_name(self, user_doc):
+        return f"{user_doc['firstName']} {user_doc['lastName']}" if user_doc else None
+
+    def query_user_by_faceId(self, faceId):
+        return self.full_name(self._find("faceId", faceId))
+
+    def query_cards_by_faceId(self, faceId):
+        user_doc = self._find("faceId", faceId)
+        return user_doc["cardNumbers"] if user_doc else None
+
+    def query_pin_by_faceId(self, faceId):
+        user_doc = self._find("faceId", faceId)
+        return user_doc["pinNumber"] if user_doc else None
+
+    def query_user_by_card_number(self, cardNumber):
+        return self.full_name(self._find("cardNumbers", cardNumber))
+
+    def query_user_by_pinNumber(self, pinNumber):
+        return self.full_name(self._find("pinNumber", pinNumber))
+
+    def query_verifIdent_by_card_number(self, cardNumber):
+        user_doc = self._find("cardNumbers", cardNumber)
+        return user_doc.get("verifIdent") if user_doc else None
+
+    def query_access_zone_info_by_card_number(self, cardNumber):
+        user_doc = self._find("cardNumbers", cardNumber) or {}
+        return (
+            {"accessZones": list(user_doc.get("accessZones", []))},
+            {"current_access_zone": user_doc.get("current_access_zone")},
+            {"free_movement": user_doc.get("free_movement")}
+        )
+
+    def update_user_by_card_number(self, cardNumber, update_fields):
+        user_doc = self._find("cardNumbers", cardNumber)
+        if user_doc:
+            user_doc.update(update_fields)
+        return bool(user_doc)
+
+    def update_access_zone_info_by_card_number(self, cardNumber, currentAccessZone):
+        user_doc = self._find("cardNumbers", cardNumber)
+        if not user_doc or currentAccessZone not in user_doc["accessZones"]:
+            return False
+        user_doc.update({"current_access_zone": currentAccessZone, "free_movement": False})
+        return True
+
+def make_site(users, readers):
+    user_docs = {
+        f"user-{n}": {
+            "_id": f"user-{n}", "faceId": f"face-{n}", "cardNumbers": [str(1000 + n)], "pinNumber": str(5000 + n),
+            "firstName": "User", "lastName": str(n), "accessZones": [9, 10], "current_access_zone": 9,
+            "free_movement": False, "verifIdent": False, "enable": True
+        }
+        for n in range(users)
+    }
+    cameras = {}
+    for n in range(readers):
+        cameras[f"cam-in-{n}"] = {"fromZone": 9, "toZone": 10, "updateZone": True, "readerSerial": f"reader-{n}"}
+        cameras[f"cam-out-{n}"] = {"fromZone": 10, "toZone": 9, "updateZone": True, "readerSerial": f"reader-{n}"}
+    return user_docs, cameras
+#--------------------------------------------------------------------------------------------------------------
+class NullLogger (object):
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+#--------------------------------------------------------------------------------------------------------------
+def face_match_payload(object_id, face_id, camera_id="cam-1"):
+    return dumps({
+        "_iD": object_id, "timestamp": 0, "_watchlistId": "wl-1", "probeFaceCameraName": camera_id,
+        "cameraId": camera_id, "personId": face_id, "faceId": face_id, "firstname": "First", "lastname": "Last",
+        "createdBy": "stand-in", "mqtt_target": "roc/access", "routed_msg_type": "FaceMatch"
+    })
+
+class StandInReader (object):
+    """A reader controller: acknowledges every FaceMatch access response addressed to it with msg_sd_log_transation."""
+    def __init__ (self, insBroker, topic, serial_number) -> None:
+        self.topic = topic
+        self.serial_number = serial_number
+        self.acked = 0
+        self.client = insBroker.client(serial_number)
+        self.client.on_message = self.on_message
+        self.client.subscribe(f"{topic}/+")
+
+    def on_message(self, client, userdata, message):
+        response = loads(message.payload).get("msg_str_user_record_response")
+        if not response or response.get("serialDestination") != self.serial_number or not response.get("faceId"):
+            return
+        self.acked += 1
+        ack = {"msg_sd_log_transation": {
+            "_iD": response["_iD"], "serialSource": self.serial_number, "broadCast": True, "transactionType": "FACE_Access",
+            "idNumber": response["faceId"], "fullName": response.get("fullName"), "dateTime": response.get("dateTime")
+        }}
+        self.client.publish(f"{self.topic}/{self.serial_number}", dumps(ack))
+
+class StandInCSV (object):
+    """CSVwriter for transactions, kept in memory."""
+    def __init__ (self) -> None:
+        self.rows = []
+
+    def write_transaction_to_csv_file(self, transaction_data):
+        self.rows.append(transaction_data)
+#--------------------------------------------------------------------------------------------------------------
+def make_group(insBroker, instances=1, shards=1, overrides=None, servers=None, readers=None):
+    """
+    MqttBroker shards of an access-server group wired to insBroker and subscribed like after on_connect:
+    instances access servers (a shared subscription when more than one), each running shards supervisor.py shards.
+    """
+    from mqtt_client import MqttBroker
+    from priority_lane_queue import PriorityLaneQueue
+
+    serial_numbers = [f"access-{index}" for index in range(instances)]
+    overrides = dict(overrides or {})
+    overrides["mqtt_settings"] = dict(
+        {"version": "v5", "offline_reporting": False, "shared_subscription_enable": instances > 1, "shared_instances": serial_numbers},
+        **overrides.get("mqtt_settings", {})
+    )
+
+    members = []
+    for serial_number in serial_numbers:
+        for shard_index in range(shards):
+            insMQTTbroker = MqttBroker (
+                PriorityLaneQueue(),
+                NullLogger(),
+                StandInMongoConfig(overrides=overrides, servers=servers, readers=readers),
+                StandInMachineInfo(serial_number),
+                network_loop = "asyncio",           # no connection manager; the stand-in client replaces paho
+                shard_index = shard_index,
+                shard_count = shards
+            )
+            insMQTTbroker.client = insBroker.client(insMQTTbroker.unique_client_id)
+            insMQTTbroker.client.on_message = insMQTTbroker.on_message
+            insMQTTbroker.client.on_publish = insMQTTbroker.on_publish
+            insMQTTbroker.subscribe_bulk()
+            members.append(insMQTTbroker)
+    return members
+
+def run_group(instances, shards, users, messages, share_offset=0):
+    """
+    FaceMatch events on the ROC server topic and pincodes on the reader topics, run end to end through an
+    access-server group: routing, the access handlers, the readers' acks and their transaction logging.
+    """
+    from mqtt_out_queue import MQTToutQueue
+
+    readers = 4
+    insBroker = StandInBroker(share_offset=share_offset)
+    overrides = {
+        "general_settings": {"paho_enable": False},
+        "access_settings": {"facematch_coalesce_seconds": 0, "facematch_max_age_ms": 0},
+        "queue_settings": {"access_workers": 0}
+    }
+    members = make_group(
+        insBroker,
+        instances,
+        shards,
+        overrides = overrides,
+        servers = {"roc-1": "roc-server-1"},
+        readers = {f"reader-{n}": f"reader-{n}" for n in range(readers)}
+    )
+    topic = members[0].mqtt_topic
+    stand_in_readers = [StandInReader(insBroker, topic, f"reader-{n}") for n in range(readers)]
+    insMongoGeneral = StandInMongoGeneral(*make_site(users, readers), latency_ms=0)
+
+    key_of_object = {}
+    handled = defaultdict(list)         # face / card -> [(member, objectId)] in handling order
+
+    def tracked(handler, member_index, object_id_of):
+        def run(*args):
+            object_id = object_id_of(*args)
+            handled[key_of_object[object_id]].append((member_index, object_id))
+            handler(*args)
+        return run
+
+    out_queues = []
+    for member_index, member in enumerate(members):
+        insMQTToutQueue = MQTToutQueue (
+            member.q,
+            NullLogger(),
+            member,
+            member.insMongoConfig,
+            insMongoGeneral,
+            None,
+            data_path = "",
+            own_serial_number = member.own_serial_number,
+            csv_logging_enable = False,
+            lock_suffix = f"-{member_index}"
+        )
+        insMQTToutQueue.insCSVtransaction = StandInCSV()
+        insMQTToutQueue.handle_face_match = tracked(insMQTToutQueue.handle_face_match, member_index, lambda payload_json, *rest: payload_json["_iD"])
+        insMQTToutQueue.handle_pincode = tracked(insMQTToutQueue.handle_pincode, member_index, lambda msg_data, objectId, *rest: objectId)
+        out_queues.append(insMQTToutQueue)
+
+    def drain():
+        busy = True
+        while busy:
+            busy = False
+            for insMQTToutQueue in out_queues:
+                if not insMQTToutQueue.q.empty():
+                    insMQTToutQueue.service_out_queue(datetime.now())
+                    busy = True
+
+    face_matches = 0
+    for n in range(messages):
+        user, reader, object_id = n * 7 % users, n % readers, f"obj-{n}"
+        if n % 3:
+            key_of_object[object_id] = f"face-{user}"
+            insBroker.publish(f"{topic}/roc-server-1", face_match_payload(object_id, f"face-{user}", f"cam-in-{reader}"))
+            face_matches += 1
+        else:
+            key_of_object[object_id] = f"card-{user}"
+            pincode = {"msg_sd_msg_pincode": {"_iD": object_id, "cardNumber": str(1000 + user), "serialSource": f"reader-{reader}", "broadCast": True}}
+            insBroker.publish(f"{topic}/reader-{reader}", dumps(pincode))
+        drain()
+
+    logged = [
+        sum(1 for row in insMQTToutQueue.insCSVtransaction.rows if row.transactionType == "FACE_Access")
+        for insMQTToutQueue in out_queues
+    ]
+    unordered = sum(
+        1 for key, events in handled.items()
+        if [object_id for _, object_id in events] != [o for o, k in key_of_object.items() if k == key]
+    )
+    result = {
+        "group": f"{instances}x{shards}",
+        "published": messages,
+        "handled": sum(len(events) for events in handled.values()),
+        "ingress": [member.client.received_topics[f"{topic}/roc-server-1"] for member in members],
+        "forwarded": sum(member.shard_forwarded_count for member in members),
+        "split_keys": sum(1 for events in handled.values() if len({member for member, _ in events}) > 1),
+        "unordered_keys": unordered,
+        "acked": sum(reader.acked for reader in stand_in_readers),
+        "logged": sum(logged),
+        "uncorrelated_acks": sum(insMQTToutQueue.uncorrelated_ack_count for insMQTToutQueue in out_queues)
+    }
+    result["ok"] = (
+        result["handled"] == messages and
+        all(result["ingress"]) and
+        result["split_keys"] == 0 and
+        result["unordered_keys"] == 0 and
+        result["acked"] == face_matches and
+        result["logged"] == face_matches and
+        result["uncorrelated_acks"] == 0
+    )
+    return result
+#--------------------------------------------------------------------------------------------------------------
+def check_shared_subscription(instances, users, messages, tolerance):
+    """
+    Shared subscription across access-server instances, with the broker's round-robin started at every
+    offset: each event handled once by the instance owning its face / card, every ack correlated and its
+    transaction logged, and the ROC server traffic split evenly over the instances.
+    """
+    runs = [run_group(instances, 1, users, messages, share_offset) for share_offset in range(instances)]
+    even_share = sum(runs[0]["ingress"]) / instances
+    result = {
+        "instances": instances,
+        "offsets": len(runs),
+        "ingress": runs[0]["ingress"],
+        "max_deviation": round(max(abs(c - even_share) for run in runs for c in run["ingress"]) / even_share, 3)
+    }
+    for key in ("handled", "forwarded", "split_keys", "unordered_keys", "acked", "logged", "uncorrelated_acks"):
+        result[key] = sum(run[key] for run in runs)
+    result["ok"] = all(run["ok"] for run in runs) and result["max_deviation"] <= tolerance
+    return result
+
+def check_uncorrelated_ack():
+    """msg_sd_log_transation without a local FaceMatch correlation is rejected, not logged as a transaction."""
+    from mqtt_out_queue import MQTToutQueue
+
+    insBroker = StandInBroker()
+    insMQTTbroker = make_group(insBroker, readers={"cam-1": "reader-1"})[0]
+
+    insMQTToutQueue = MQTToutQueue (
+        insMQTTbroker.q,
+        NullLogger(),
+        insMQTTbroker,
+        insMQTTbroker.insMongoConfig,
+        None,
+        None,
+        data_path = "",
+        csv_logging_enable = False
+    )
+    insMQTToutQueue.insCSVtransaction = StandInCSV()
+
+    def ack(object_id):
+        return {"msg_sd_log_transation": {"_iD": object_id, "serialSource": "reader-1", "broadCast": True, "transactionType": "FACE_Access"}}
+
+    insMQTTbroker.objectId_dict["obj-known"] = "reader-1"
+    insMQTToutQueue.parse_json_data(None, ack("obj-known"), "reader-1")
+    insMQTToutQueue.parse_json_data(None, ack("obj-unknown"), "reader-1")
+
+    result = {"logged": len(insMQTToutQueue.insCSVtransaction.rows), "uncorrelated": insMQTToutQueue.uncorrelated_ack_count}
+    result["ok"] = result == {"logged": 1, "uncorrelated": 1}
+    return result
+
+def check_shard_partitioning(shards, users, messages):
+    """
+    supervisor.py shards: FaceMatch events (ROC server topic, shared by all shards) and pincodes (reader topics,
+    taken by the reader's shard) are each handled once, all events of one face / card on the same shard, in
+    order; acks from the readers find their FaceMatch correlation on the reader's shard.
+    """
+    return run_group(1, shards, users, messages)
+
+#--------------------------------------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Shared-subscription and sharding checks against an in-process MQTT broker stand-in")
+    parser.add_argument("--instances", type=int, default=3, help="Access-server instances in the share group (default: 3)")
+    parser.add_argument("--messages", type=int, default=3000, help="FaceMatch and pincode messages to publish (default: 3000)")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Allowed deviation from an even share (default: 0.05)")
+    parser.add_argument("--shards", type=int, default=4, help="supervisor.py shards per instance (default: 4)")
+    parser.add_argument("--users", type=int, default=50, help="People generating events (default: 50)")
+    args = parser.parse_args()
+
+    checks = {
+        "shared_subscription": check_shared_subscription(args.instances, args.users, args.messages, args.tolerance),
+        "uncorrelated_ack": check_uncorrelated_ack(),
+        "shard_partitioning": check_shard_partitioning(args.shards, args.users, args.messages),
+        "group": run_group(args.instances, args.shards, args.users, args.messages)
+    }
+    for name, result in checks.items():
+        print(f"{name:<22}{'OK' if result['ok'] else 'FAILED':<8}{result}")
+    raise SystemExit(0 if all(result["ok"] for result in checks.values()) else 1)
+
+#--------------------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    main()
+
+#--------------------------------------------------------------------------------------------------------------
+"""
+Example Usage:
+python3 mqtt_broker_standin.py
+python3 mqtt_broker_standin.py --instances 5 --messages 10000
+python3 mqtt_broker_standin.py --shards 8 --users 200
+"""
+
+#--------------------------------------------------------------------------------------------------------------
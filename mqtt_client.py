@@ -1,4 +1,4 @@
-# updated: 2025-05-10 17:54:06
+# updated: 2026-10-19 13:09:13
 # created: 2024-06-13 19:00:00
 # filename: mqtt_client.py
 #--------------------------------------------------------------------------------------------------
@@ -7,13 +7,20 @@
 # https://www.eclipse.org/paho/index.php?page=clients/python/docs/index.php 
 # http://www.steves-internet-guide.com/client-connections-python-mqtt/ 
 #--------------------------------------------------------------------------------------------------
-from time import sleep
+from time import monotonic
+from zlib import crc32
+from random import uniform
+from threading import Thread, Event, Lock
 from json import dumps, loads
 from uuid import uuid4
 from datetime import datetime
 import paho.mqtt.client as mqtt
 from dataclasses import dataclass
 from ssl import PROTOCOL_TLS, CERT_REQUIRED
+from latency_histogram import LatencyHistogram
+from correlation_cache import CorrelationCache
+from mqtt_offline_buffer import MqttOfflineBuffer
+from circuit_breaker import insBreakerRegistry
 #--------------------------------------------------------------------------------------------------
 @dataclass
 class AccessPayload:
@@ -34,12 +41,20 @@ class MqttBroker (object):
             insLogger,
             insMongoConfig,
             insMachineInfo,
+            data_path = "",
+            network_loop = "thread",
+            shard_index = 0,
+            shard_count = 1,
             util_prt = False,
             util_prt0 = False
         ) -> None:
 
         self.q = q
         self.insLogger = insLogger
+        self.network_loop = network_loop       # "thread": paho loop_start(); "asyncio": driven by main_async.py
+        self.local_shard_index = shard_index    # supervisor.py shard on this host
+        self.shard_index = shard_index          # in the group: owns readers with crc32(serial) % shard_count == shard_index
+        self.shard_count = shard_count
         self.insMongoConfig = insMongoConfig
         self.insMachineInfo = insMachineInfo
 
@@ -64,19 +79,93 @@ class MqttBroker (object):
         self.mqtt_server_certificate = mqtt_settings_dict.get("server_certificate")
         self.mqtt_client_certificate = mqtt_settings_dict.get("client_certificate")
         self.mqtt_status_reporting_enable = mqtt_settings_dict.get("status_reporting_enable")
+        self.mqtt_connect_timeout = mqtt_settings_dict.get("connect_timeout", 10)
+        self.mqtt_reconnect_min_delay = mqtt_settings_dict.get("reconnect_min_delay", 1)
+        self.mqtt_reconnect_max_delay = mqtt_settings_dict.get("reconnect_max_delay", 60)
+        self.mqtt_reconnect_jitter = mqtt_settings_dict.get("reconnect_jitter", 0.5)
+        self.mqtt_qos_dict = mqtt_settings_dict.get("qos_dict", {})
+        self.mqtt_max_inflight_messages = mqtt_settings_dict.get("max_inflight_messages", 20)
+        self.mqtt_max_queued_messages = mqtt_settings_dict.get("max_queued_messages", 1000)
+        self.mqtt_inflight_timeout = mqtt_settings_dict.get("inflight_timeout", 30)
+        self.mqtt_subscribe_qos = mqtt_settings_dict.get("subscribe_qos", 0)
+        self.mqtt_shared_subscription_enable = mqtt_settings_dict.get("shared_subscription_enable", False)
+        self.mqtt_shared_group = mqtt_settings_dict.get("shared_group", "roc-access-servers")
+        self.mqtt_shared_instances = list(mqtt_settings_dict.get("shared_instances") or [])
 
         # mqtt_finalize_labels
         self.mqtt_port = 8883 if self.mqtt_encryption else 1883
         self.unique_client_id = insMachineInfo.get_unique_client_id ()
+        if self.shard_count > 1:
+            self.unique_client_id = f"{self.unique_client_id}-s{self.shard_index}"
         self.own_serial_number = insMachineInfo.get_own_serial_number()
         self.mqtt_publish_topic = f"{self.mqtt_topic}/{self.own_serial_number}"
 
+        # shared subscription: the access servers in shared_instances (serial numbers, same order on every
+        # instance) form one group of len(shared_instances) * shard_count shards, this process being one of them
+        if self.mqtt_shared_subscription_enable:
+            if self.own_serial_number in self.mqtt_shared_instances:
+                instance_index = self.mqtt_shared_instances.index(self.own_serial_number)
+                self.shard_index = instance_index * shard_count + shard_index
+                self.shard_count = len(self.mqtt_shared_instances) * shard_count
+            else:
+                self.mqtt_shared_subscription_enable = False
+                insLogger.log_error(
+                    msg=f"[MqttBroker __init__] Shared subscription disabled: own serial {self.own_serial_number} is not in shared_instances {self.mqtt_shared_instances}"
+                )
+
+        # inbound traffic is split across processes, so acks may arrive without a local FaceMatch
+        self.partitioned = self.shard_count > 1
+
+        # supervisor.py shards: access events move to the shard owning their face / card on
+        # {topic}/shard/<shard index>/<source serial>, so the last topic level is still the source serial
+        self.shard_forward_prefix = f"{self.mqtt_topic}/shard"
+        self.shard_forwarded_count = 0
+
         general_settings_dict = insMongoConfig.query_config_general_settings() # derived from mongo database (general_settings)
         self.raspberry_pi = general_settings_dict.get("raspberry_pi")
         self.sys_name = insMachineInfo.get_raspberry_pi_model () if self.raspberry_pi else insMachineInfo.get_cpu_information ()
         self.hostname, self.ip_address = self.insMachineInfo.get_ip_address()
         self.program_version = insMachineInfo.program_version
-        self.objectId_dict = {}
+        # FaceMatch objectId -> reader serial number, matched by msg_sd_log_transation
+        self.objectId_dict = CorrelationCache(
+            ttl = mqtt_settings_dict.get("correlation_ttl", 300),
+            max_entries = mqtt_settings_dict.get("correlation_max_entries", 10000)
+        )
+
+        # connection management (see connection_manager)
+        self.stop_event = Event()
+        self.connack_event = Event()
+        self.connection_lost_event = Event()
+        self.connection_thread = None
+        self.connection_state = "disconnected"
+        self.backoff_attempt = 0
+        self.connect_attempts = 0
+        self.connect_failures = 0
+        self.reconnect_count = 0
+        self.last_connected = None
+        self.last_disconnected = None
+
+        # delivery tracking: mid -> (message_cmd, objectId, qos, sent monotonic); latency kept for QoS > 0
+        self.inflight_lock = Lock()
+        self.inflight_dict = {}
+        self.early_acks = set()
+        self.delivery_histogram_dict = {}
+        self.delivered_count = 0
+        self.undelivered_count = 0
+
+        # mqtt_offline_reporting: messages created while disconnected are buffered on disk
+        if self.mqtt_offline_reporting:
+            self.insOfflineBuffer = MqttOfflineBuffer(
+                insLogger,
+                filename = f"{data_path}{mqtt_settings_dict.get('offline_buffer_file', 'mqtt_offline_buffer.jsonl')}{'' if shard_count == 1 else f'.{shard_index}'}",
+                max_messages = mqtt_settings_dict.get("offline_buffer_max_messages", 5000),
+                drain_rate = mqtt_settings_dict.get("offline_drain_rate", 20),
+                ttl_dict = mqtt_settings_dict.get("offline_ttl_dict", {}),
+                aggregate_list = mqtt_settings_dict.get("offline_aggregate_list", []),
+                compact_bytes = mqtt_settings_dict.get("offline_compact_bytes", 1048576)
+            )
+        else:
+            self.insOfflineBuffer = None
 
         # mqtt_general
         if self.util_prt0:
@@ -93,6 +182,11 @@ class MqttBroker (object):
             print (f"mqtt_datim_format: {self.mqtt_datim_format}")
             print (f"mqtt_publish_topic: {self.mqtt_publish_topic}")
             print (f"mqtt_status_reporting_enable: {self.mqtt_status_reporting_enable}")
+            print (f"mqtt_offline_reporting: {self.mqtt_offline_reporting}")
+            print (f"mqtt_shared_subscription_enable: {self.mqtt_shared_subscription_enable}")
+            print (f"mqtt_shared_group: {self.mqtt_shared_group}")
+            print (f"mqtt_shared_instances: {self.mqtt_shared_instances}")
+            print (f"shard: {self.shard_index}/{self.shard_count}")
             
         # mqtt_credentials
         if self.util_prt0:
@@ -105,7 +199,10 @@ class MqttBroker (object):
             print (f"mqtt_client_certificate: {self.mqtt_client_certificate}")
             print (f"mqtt_server_certificate: {self.mqtt_server_certificate}")
             
-        self.connect ()
+        if self.network_loop == "thread":
+            self.connect ()
+        else:
+            self.create_client ()
 #--------------------------------------------------------------------------------------------------
     # def clear_controller_output_ports(self, dtt, serial_number):
     #     if serial_number == self.insJSONconfig.main_controller_serial_number and not self.main_controller_init:
@@ -132,6 +229,7 @@ class MqttBroker (object):
             server_serial_numbers_dict = self.insMongoConfig.query_get_servers_serial_numbers_dict(status=True)
             qr_code_servers_serial_numbers_dict = self.insMongoConfig.query_get_qr_code_servers_serial_numbers_dict(status=True)
             test_clients_serial_numbers_dict = self.insMongoConfig.query_config_mqtt_subscribe_test_clients(status=True)
+            self.reader_serial_numbers = set(reader_serial_numbers_dict.values())
             
             combined_items = list(reader_serial_numbers_dict.items()) + \
                             list(server_serial_numbers_dict.items()) + \
@@ -157,13 +255,31 @@ class MqttBroker (object):
         self.subscriptions = {}
         combined_unique_dict = get_combined_dict()
 
-        for server_name, serial_number in combined_unique_dict.items():
-            if serial_number == self.own_serial_number:
-                continue
+        # shared subscription: the broker hands each ROC / QR server message to one member of the group
+        topic_prefix = ""
+        if self.shard_count > 1:
+            topic_prefix = f"$share/{self.mqtt_shared_group}/"
+            if self.mqtt_version != 'v5':
+                self.insLogger.log_warning(
+                    msg=f"[MqttBroker--subscribe_bulk] Shared subscriptions are an MQTT v5 feature, mqtt_version is '{self.mqtt_version}'; the broker may deliver every message to every instance"
+                )
 
-            subscribe_topic = f"{self.mqtt_topic}/{serial_number}"
+        for server_name, serial_number in combined_unique_dict.items():
+            if serial_number == self.own_serial_number or serial_number in self.mqtt_shared_instances:
+                continue    # our own and the other group members' publications
+
+            subscribe_topic = f"{topic_prefix}{self.mqtt_topic}/{serial_number}"
+            if self.shard_count > 1 and serial_number in self.reader_serial_numbers:
+                # readers are hash-partitioned: only the owning shard subscribes, without $share, so a
+                # reader's pincodes and acks reach one shard, the one its FaceMatch correlations are sent to
+                if self.get_shard_owner(serial_number) != self.shard_index:
+                    continue
+                subscribe_topic = f"{self.mqtt_topic}/{serial_number}"
+            # ROC / QR servers: every shard takes a share and forwards each access event to its owner shard,
+            # so ingestion grows with the shards; one face's events that entered on two shards reach the
+            # owner in arrival order, which holds while they are further apart than one forward hop
             try:
-                result_code, mid = mqtt_subscribe(topic=subscribe_topic.strip())
+                result_code, mid = mqtt_subscribe(topic=subscribe_topic.strip(), qos=self.mqtt_subscribe_qos)
                 self.subscriptions[mid] = {
                     'topic': subscribe_topic,
                     'server_name': server_name
@@ -176,91 +292,230 @@ class MqttBroker (object):
                     msg=f"[MqttBroker--subscribe_bulk ERROR] Failed to subscribe to '{subscribe_topic}' for server '{server_name}': {e}"
                 )
 
+        if self.shard_count > 1:
+            forward_topic = f"{self.shard_forward_prefix}/{self.shard_index}/+"
+            try:
+                result_code, mid = mqtt_subscribe(topic=forward_topic, qos=self.get_publish_qos("msg_shard_forward"))
+                self.subscriptions[mid] = {
+                    'topic': forward_topic,
+                    'server_name': f"shard-{self.shard_index}"
+                }
+            except Exception as e:
+                self.insLogger.log_error(
+                    msg=f"[MqttBroker--subscribe_bulk ERROR] Failed to subscribe to '{forward_topic}': {e}"
+                )
+
         if self.subscriptions:
             self.insLogger.log_info(
                 msg=f"[MqttBroker--subscribe_bulk] All subscriptions initialized: {self.subscriptions}"
             )
 
+#--------------------------------------------------------------------------------------------------
+    def get_shard_owner(self, key):
+        return crc32(str(key).encode("utf-8")) % self.shard_count
+
+    def is_shard_forward(self, topic):
+        return topic.startswith(f"{self.shard_forward_prefix}/")
+
+    def forward_to_shard(self, shard_index, source_serial, payload):
+        # the raw inbound payload, unchanged; False when it could not be sent (the caller handles it locally)
+        if not self.client.connected_flag:
+            return False
+        forward_topic = f"{self.shard_forward_prefix}/{shard_index}/{source_serial}"
+        payload_str = payload.decode("utf-8") if isinstance(payload, bytes) else payload
+        if not self.publish_json(forward_topic, payload_str, "msg_shard_forward"):
+            return False
+        self.shard_forwarded_count += 1
+        return True
+
+    def mqtt_publish_shard_correlation(self, objectId, reader_serial):
+        # a FaceMatch handled off the reader's shard: the reader's shard needs the objectId to accept the ack
+        owner = self.get_shard_owner(reader_serial)
+        if self.shard_count <= 1 or owner == self.shard_index:
+            return
+        self.create_and_publish(
+            message_cmd = "msg_sd_shard_correlation",
+            objectId = objectId,
+            publish_topic = f"{self.shard_forward_prefix}/{owner}/{reader_serial}",
+            broad_cast = True
+        )
+
+#--------------------------------------------------------------------------------------------------
+    def create_client(self):
+        # Set Connecting Client ID
+        if self.mqtt_version == 'v3':
+            self.client = mqtt.Client(
+                client_id=self.unique_client_id,
+                transport=self.mqtt_transport,
+                protocol=mqtt.MQTTv311,
+                clean_session=True,
+                reconnect_on_failure=False
+            )
+        elif self.mqtt_version == 'v5':
+            self.client = mqtt.Client(
+                client_id=self.unique_client_id,
+                transport=self.mqtt_transport,
+                protocol=mqtt.MQTTv5,
+                reconnect_on_failure=False
+            )
+        else:
+            self.client = mqtt.Client(self.unique_client_id, reconnect_on_failure=False)
+
+        if self.mqtt_authentication:
+            self.client.username_pw_set(
+                self.mqtt_username,
+                self.mqtt_password
+            )
+
+        if self.mqtt_encryption:
+            self.client.tls_set(
+                ca_certs=self.mqtt_server_certificate,
+                certfile=self.mqtt_client_certificate,
+                keyfile=self.mqtt_client_key,
+                cert_reqs=CERT_REQUIRED,
+                tls_version=PROTOCOL_TLS,
+                ciphers=None
+            )
+
+        self.client.max_inflight_messages_set(self.mqtt_max_inflight_messages)
+        self.client.max_queued_messages_set(self.mqtt_max_queued_messages)
+
+        self.client.connected_flag = False
+        self.client.disconnect_flag = False
+        self.client.bad_connection_flag = False
+
+        self.client.on_log = self.on_log
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_publish = self.on_publish
+        self.client.on_message = self.on_message
+        self.client.on_subscribe = self.on_subscribe
+        self.client.on_unsubscribe = self.on_unsubscribe
+
 #--------------------------------------------------------------------------------------------------
     def connect(self):
+        # Non-blocking: the connection manager thread connects, retries with backoff and
+        # reconnects after a lost link, so Main can start while the broker is unreachable.
         try:
-            # Set Connecting Client ID
-            if self.mqtt_version == 'v3':
-                self.client = mqtt.Client(
-                    client_id=self.unique_client_id,
-                    transport=self.mqtt_transport,
-                    protocol=mqtt.MQTTv311,
-                    clean_session=True
-                )
-            elif self.mqtt_version == 'v5':
-                self.client = mqtt.Client(
-                    client_id=self.unique_client_id,
-                    transport=self.mqtt_transport,
-                    protocol=mqtt.MQTTv5
-                )
-            else:
-                self.client = mqtt.Client(self.unique_client_id)
+            self.create_client()
 
-            if self.mqtt_authentication:
-                self.client.username_pw_set(
-                    self.mqtt_username,
-                    self.mqtt_password
-                )
+            self.connection_thread = Thread(
+                target = self.connection_manager,
+                name = "mqtt-connection-manager",
+                daemon = True
+            )
+            self.connection_thread.start()
 
-            if self.mqtt_encryption:
-                self.client.tls_set(
-                    ca_certs=self.mqtt_server_certificate,
-                    certfile=self.mqtt_client_certificate,
-                    keyfile=self.mqtt_client_key,
-                    cert_reqs=CERT_REQUIRED,
-                    tls_version=PROTOCOL_TLS,
-                    ciphers=None
+            self.insLogger.log_info(
+                msg=f"[MqttBroker--connect] Connection manager started for {self.mqtt_broker}:{self.mqtt_port}, client_id: {self.unique_client_id}"
+            )
+
+        except Exception as e:
+            self.connection_state = "failed"
+            error_message = f"[MqttBroker--connect ERROR] Connection failed: {e}"
+            self.insLogger.log_error(msg=error_message)
+
+#--------------------------------------------------------------------------------------------------
+    def connection_manager(self):
+        while not self.stop_event.is_set():
+            if not self.attempt_connection():
+                delay = self.get_backoff_delay()
+                self.connection_state = "backoff"
+                self.insLogger.log_warning(
+                    msg=f"[MqttBroker--connection_manager] Broker {self.mqtt_broker} unreachable, retry {self.backoff_attempt} in {delay:.1f}s"
                 )
+                self.stop_event.wait(delay)
+                continue
+
+            # Connected: paho's network thread services the link until it drops.
+            self.connection_lost_event.wait()
+            self.connection_lost_event.clear()
+            self.client.loop_stop()
 
-            self.client.connected_flag = False
-            self.client.disconnect_flag = False
-            self.client.bad_connection_flag = False
+            if not self.stop_event.is_set():
+                self.connection_state = "disconnected"
+                self.insLogger.log_warning(
+                    msg=f"[MqttBroker--connection_manager] Connection to {self.mqtt_broker} lost, reconnecting"
+                )
 
-            self.client.on_log = self.on_log
-            self.client.on_connect = self.on_connect
-            self.client.on_disconnect = self.on_disconnect
-            self.client.on_publish = self.on_publish
-            self.client.on_message = self.on_message
-            self.client.on_subscribe = self.on_subscribe
-            self.client.on_unsubscribe = self.on_unsubscribe
+        self.connection_state = "stopped"
 
-            self.client.loop_start()
-            timer_count = 0
+#--------------------------------------------------------------------------------------------------
+    def attempt_connection(self):
+        self.connection_state = "connecting"
+        self.connect_attempts += 1
+        self.connack_event.clear()
+        self.connection_lost_event.clear()
+        self.client.connected_flag = False
+        self.client.bad_connection_flag = False
+        start = monotonic()
 
+        try:
             self.client.connect(
                 self.mqtt_broker,
                 self.mqtt_port,
                 self.mqtt_keepalive
             )
+        except Exception as e:
+            self.connect_failures += 1
+            self.insLogger.log_error(msg=f"[MqttBroker--attempt_connection ERROR] Connection failed: {e}")
+            return False
 
-            while not self.client.connected_flag and not self.client.bad_connection_flag:
-                timer_count += 1
-                dots = "." * timer_count
-                if self.util_prt0:
-                    print(dots, end='', flush=True)
-                sleep(0.2)
+        self.client.loop_start()
+        self.connack_event.wait(self.mqtt_connect_timeout)
 
-            connect_message = f"[MqttBroker--connect] Connected_flag detected in {200 * timer_count}-ms"
-            client_id_message = f"[MqttBroker--connect] Connected using client_id: {self.unique_client_id}"
+        if self.client.connected_flag:
+            connect_message = f"[MqttBroker--attempt_connection] Connected_flag detected in {int((monotonic() - start) * 1000)}-ms"
+            client_id_message = f"[MqttBroker--attempt_connection] Connected using client_id: {self.unique_client_id}"
 
             if self.util_prt0:
                 print(f" {connect_message}")
 
             self.insLogger.log_info(msg=connect_message)
             self.insLogger.log_info(msg=client_id_message)
+            return True
 
-        except Exception as e:
+        self.connect_failures += 1
+        self.client.loop_stop()
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+        return False
+
+#--------------------------------------------------------------------------------------------------
+    def get_backoff_delay(self):
+        # Capped exponential backoff with equal jitter: [delay/2 .. delay]
+        delay = min(self.mqtt_reconnect_max_delay, self.mqtt_reconnect_min_delay * (2 ** self.backoff_attempt))
+        self.backoff_attempt += 1
+        return uniform(delay * (1 - self.mqtt_reconnect_jitter), delay)
+
+#--------------------------------------------------------------------------------------------------
+    def get_connection_metrics(self):
+        return {
+            "state": self.connection_state,
+            "connectAttempts": self.connect_attempts,
+            "connectFailures": self.connect_failures,
+            "reconnectCount": self.reconnect_count,
+            "lastConnected": self.last_connected,
+            "lastDisconnected": self.last_disconnected
+        }
+
+#--------------------------------------------------------------------------------------------------
+    def stop(self):
+        self.stop_event.set()
+        self.connection_lost_event.set()
+        try:
+            self.client.disconnect()
             self.client.loop_stop()
-            error_message = f"[MqttBroker--connect ERROR] Connection failed: {e}"
-            self.insLogger.log_error(msg=error_message)
+        except Exception as e:
+            self.insLogger.log_error(msg=f"[MqttBroker--stop ERROR] {e}")
+
+        if self.connection_thread is not None:
+            self.connection_thread.join(timeout=5)
 
 #--------------------------------------------------------------------------------------------------
-    def on_connect(self, client, userdata, flags, rc):
+    def on_connect(self, client, userdata, flags, rc, properties=None):
         try:
             self.insLogger.log_info("[MqttBroker--on_connect] Connection event triggered")
 
@@ -269,31 +524,37 @@ class MqttBroker (object):
                 self.client.disconnect_flag = False
                 dtt = datetime.now()
 
+                if self.last_connected is not None:
+                    self.reconnect_count += 1
+                self.last_connected = dtt.strftime(self.mqtt_datim_format)
+                self.connection_state = "connected"
+                self.backoff_attempt = 0
+                self.connack_event.set()
+
                 self.insLogger.log_info(
-                    msg=f"[MqttBroker--on_connect] {self.unique_client_id} successfully connected to {self.mqtt_broker}"
+                    msg=f"[MqttBroker--on_connect] {self.unique_client_id} successfully connected to {self.mqtt_broker}, metrics: {self.get_connection_metrics()}"
                 )
 
                 self.subscribe_bulk()
+                if self.local_shard_index != 0:
+                    return      # broadcasts and status reporting belong to the instance's shard 0
+
                 self.mqtt_publish_sysinfo_request()
                 self.mqtt_publish_config_file_request(broad_cast=True)
 
                 if self.mqtt_status_reporting_enable:
-                    self.mqtt_publish_status(response="online", reason="restarted")
+                    self.mqtt_publish_status(response="online", reason="restarted" if self.reconnect_count == 0 else "reconnected")
                     self.mqtt_publish_status_request()
 
-                    temp_value = (
-                        self.insMachineInfo.get_cpu_temperature_pi()
-                        if self.raspberry_pi
-                        else self.insMachineInfo.get_cpu_temperature_average()
-                    )
+                    temp_value = self.insMachineInfo.get_latest_cpu_temperature()     # no sensor I/O on the paho thread
 
                     self.mqtt_publish_cpu_temp_sensor(
                         sensor_name=self.sys_name,
                         sensor_value=temp_value
                     )
             else:
-                self.client.loop_stop()
                 self.client.bad_connection_flag = True
+                self.connack_event.set()
                 self.insLogger.log_error(
                     msg=f"[MqttBroker--on_connect] Failed to connect to {self.mqtt_broker}, return code: {rc}"
                 )
@@ -304,20 +565,30 @@ class MqttBroker (object):
             )
 
 #--------------------------------------------------------------------------------------------------
-    def on_disconnect(self, client, userdata, rc):
-        self.insLogger.log_info("[MqttBroker--on_disconnect] MQTT client disconnected")
+    def on_disconnect(self, client, userdata, rc, properties=None):
+        self.insLogger.log_info(f"[MqttBroker--on_disconnect] MQTT client disconnected, rc: {rc}")
         self.client.connected_flag = False
         self.client.disconnect_flag = True
+        self.last_disconnected = datetime.now().strftime(self.mqtt_datim_format)
+        self.connection_lost_event.set()
 
     def on_message(self, client, userdata, message):
-        self.q.put(message)
+        if self.q.put(message) is False:
+            self.insLogger.log_warning(msg = f"[MqttBroker--on_message] Inbound queue full, rejected message from topic: {message.topic}")
+            return
         payload_str = message.payload.decode('utf-8')
         payload_json = loads(payload_str)
         self.insLogger.log_info(msg = f"[MqttBroker--on_message] Topic: {message.topic}")
         self.insLogger.log_debug(msg = f"[MqttBroker--on_message] Message: {payload_json}")
         
-    def on_publish(self, client, userdata, result):
-        self.insLogger.log_info("[MqttBroker--on_publish] Publish operation completed")
+    def on_publish(self, client, userdata, mid):
+        with self.inflight_lock:
+            inflight = self.inflight_dict.pop(mid, None)
+            if inflight is None:
+                # acknowledged before publish_json recorded the mid
+                self.early_acks.add(mid)
+                return
+            self.record_delivery(mid, *inflight)
 
     def on_unsubscribe(self, client, userdata, mid):
         self.insLogger.log_info("[MqttBroker--on_unsubscribe] Unsubscribe event triggered")
@@ -327,7 +598,7 @@ class MqttBroker (object):
         self.insLogger.log_debug(f"[MqttBroker--on_log] {buf}")
         self.insLogger.log_debug(f"[MqttBroker--on_log] Broker in use: {self.mqtt_broker}")
 
-    def on_subscribe(self, client, userdata, mid, granted_qos):
+    def on_subscribe(self, client, userdata, mid, granted_qos, properties=None):
         subscription_info = self.subscriptions.get(mid, {'topic': 'Unknown', 'server_name': 'Unknown'})
         topic = subscription_info['topic']
         server_name = subscription_info['server_name']
@@ -378,12 +649,19 @@ class MqttBroker (object):
                 msg = f"[MqttBroker--create_and_publish] topic={publish_topic}, payload={json_message}"
             )
 
-            if self.client.connected_flag:
-                self.client.publish(topic=publish_topic, payload=json_message)
+            if self.client.connected_flag and self.publish_json(publish_topic, json_message, message_cmd, objectId):
                 self.insLogger.log_info(
                     msg = f"[MqttBroker--create_and_publish] Successful: objectId: {objectId}, "
                           f"publish_topic: {publish_topic}, message_cmd: {message_cmd}."
                 )
+            elif self.insOfflineBuffer is not None:
+                self.insOfflineBuffer.store(
+                    topic = publish_topic,
+                    payload = json_message,
+                    message_cmd = message_cmd,
+                    objectId = objectId,
+                    qos = self.get_publish_qos(message_cmd)
+                )
             else:
                 self.insLogger.log_warning(
                     msg = f"[MqttBroker--create_and_publish] Client not connected — publish skipped"
@@ -394,15 +672,133 @@ class MqttBroker (object):
                 msg = f"[MqttBroker--create_and_publish ERROR] Failed to publish message: {str(e)}"
             )
 
+#--------------------------------------------------------------------------------------------------
+    def get_publish_qos(self, message_cmd):
+        return self.mqtt_qos_dict.get(message_cmd, self.mqtt_qos_dict.get("default", 0))
+
+#--------------------------------------------------------------------------------------------------
+    def publish_json(self, publish_topic, json_message, message_cmd=None, objectId=None):
+        qos = self.get_publish_qos(message_cmd)
+
+        # client.publish must not run under inflight_lock: paho holds its own message mutex while
+        # calling on_publish, so the mid is matched afterwards (early_acks covers a fast ack).
+        result = self.client.publish(topic=publish_topic, payload=json_message, qos=qos)
+        if result.rc != mqtt.MQTT_ERR_SUCCESS:
+            self.insLogger.log_warning(
+                msg = f"[MqttBroker--publish_json] Publish to {publish_topic} failed, rc: {result.rc}"
+            )
+            return False
+
+        with self.inflight_lock:
+            if result.mid in self.early_acks:
+                self.early_acks.discard(result.mid)
+                self.record_delivery(result.mid, message_cmd, objectId, qos, monotonic())
+            else:
+                self.inflight_dict[result.mid] = (message_cmd, objectId, qos, monotonic())
+
+        return True
+
+#--------------------------------------------------------------------------------------------------
+    def record_delivery(self, mid, message_cmd, objectId, qos, sent):
+        if qos == 0:
+            return      # QoS 0: on_publish only means "written to the socket"
+
+        latency_ms = (monotonic() - sent) * 1000
+        histogram = self.delivery_histogram_dict.get(message_cmd)
+        if histogram is None:
+            histogram = self.delivery_histogram_dict[message_cmd] = LatencyHistogram()
+        histogram.observe(latency_ms)
+        self.delivered_count += 1
+
+        self.insLogger.log_info(
+            msg = f"[MqttBroker--record_delivery] Delivered mid: {mid}, objectId: {objectId}, message_cmd: {message_cmd}, latency: {latency_ms:.1f}-ms"
+        )
+
+#--------------------------------------------------------------------------------------------------
+    def service_delivery_tracking(self):
+        # scheduled once per second: give up on publishes and FaceMatch correlations that were never acknowledged
+        now = monotonic()
+
+        with self.inflight_lock:
+            expired = [
+                mid for mid, (_, _, _, sent) in self.inflight_dict.items()
+                if now - sent > self.mqtt_inflight_timeout
+            ]
+            for mid in expired:
+                message_cmd, objectId, qos, _ = self.inflight_dict.pop(mid)
+                if qos > 0:
+                    self.undelivered_count += 1
+                    self.insLogger.log_warning(
+                        msg = f"[MqttBroker--service_delivery_tracking] No acknowledgement for mid: {mid}, objectId: {objectId}, message_cmd: {message_cmd}"
+                    )
+
+        expired = self.objectId_dict.expire()
+        if expired:
+            self.insLogger.log_info(
+                msg = f"[MqttBroker--service_delivery_tracking] Expired {expired} unacknowledged objectId(s), correlation: {self.objectId_dict.get_metrics()}"
+            )
+
+#--------------------------------------------------------------------------------------------------
+    def get_delivery_metrics(self):
+        with self.inflight_lock:
+            return {
+                "inflight": len(self.inflight_dict),
+                "delivered": self.delivered_count,
+                "undelivered": self.undelivered_count,
+                "latency": {cmd: h.get_metrics() for cmd, h in self.delivery_histogram_dict.items()},
+                "correlation": self.objectId_dict.get_metrics(),
+                "shardForwarded": self.shard_forwarded_count
+            }
+
+#--------------------------------------------------------------------------------------------------
+    def service_queue_alerts(self):
+        # inbound queue high-water transitions are reported to ROC as msg_sd_status
+        for state, lane, depth, maxsize, shed in self.q.pop_alerts():
+            reason = f"inbound {lane} queue depth {depth}/{maxsize}, shed: {shed}"
+            if state == "overloaded":
+                self.insLogger.log_warning(msg = f"[MqttBroker--service_queue_alerts] {reason}")
+            else:
+                self.insLogger.log_info(msg = f"[MqttBroker--service_queue_alerts] {reason}")
+            self.mqtt_publish_status(response=state, reason=reason)
+
+        # dependency circuit breakers (mongo, roc:<server>) opening / probing / closing
+        for name, state, reason in insBreakerRegistry.pop_alerts():
+            reason = f"breaker {name} {state}: {reason}"
+            if state == "open":
+                self.insLogger.log_warning(msg = f"[MqttBroker--service_queue_alerts] {reason}")
+            else:
+                self.insLogger.log_info(msg = f"[MqttBroker--service_queue_alerts] {reason}")
+            self.mqtt_publish_status(response=f"breaker_{state}", reason=reason)
+
+#--------------------------------------------------------------------------------------------------
+    def service_offline_buffer(self):
+        if self.insOfflineBuffer is None or not len(self.insOfflineBuffer):
+            return
+        if not self.client.connected_flag:
+            return
+
+        self.insOfflineBuffer.drain(
+            lambda entry: self.publish_json(entry["topic"], entry["payload"], entry["message_cmd"], entry["objectId"])
+        )
+
+    def get_offline_buffer_metrics(self):
+        if self.insOfflineBuffer is None:
+            return {}
+        return self.insOfflineBuffer.get_metrics()
+
 #--------------------------------------------------------------------------------------------------
     def mqtt_publish_status (self, response, reason):
         if self.mqtt_status_reporting_enable:
+            additional_params = {
+                "response": response,
+                "reason": reason
+            }
+            breaker_states = insBreakerRegistry.get_states()
+            if breaker_states:
+                additional_params["breakers"] = breaker_states
             self.create_and_publish (
                 message_cmd = "msg_sd_status", 
-                additional_params = {
-                    "response": response,
-                    "reason": reason
-                }
+                additional_params = additional_params
             )
 #-------------------------------------------------------------------------------------------------
     def mqtt_publish_cpu_temp_sensor (self, sensor_name, sensor_value):
@@ -0,0 +1,266 @@
+# updated: 2026-10-19 13:09:13
+# created: 2026-10-19 12:14:16
+# filename: mqtt_offline_buffer.py
+#--------------------------------------------------------------------------------------------------------------
+import os
+from time import time
+from threading import Lock
+from collections import deque
+from json import dumps, loads, JSONDecodeError
+#--------------------------------------------------------------------------------------------------------------
+class MqttOfflineBuffer (object):
+    """
+    Disk-backed outbound queue for messages created while the broker is unreachable.
+    Every entry carries an expiry derived from its message_cmd (offline_ttl_dict), and
+    message types listed in aggregate_list keep only their latest entry per topic.
+
+    The file is an append-only log: draining only moves a read offset, persisted in
+    <filename>.offset, and the consumed head is compacted away once it reaches
+    compact_bytes and half the log, or truncated when the buffer runs empty.
+    """
+    DEFAULT_TTL = 600
+
+    def __init__ (
+            self,
+            insLogger,
+            filename = "mqtt_offline_buffer.jsonl",
+            max_messages = 5000,
+            drain_rate = 20,
+            ttl_dict = None,
+            aggregate_list = None,
+            compact_bytes = 1048576
+        ) -> None:
+
+        self.insLogger = insLogger
+        self.filename = filename
+        self.offset_filename = f"{filename}.offset"
+        self.max_messages = int(max_messages)
+        self.drain_rate = float(drain_rate)
+        self.ttl_dict = ttl_dict or {}
+        self.aggregate_set = set(aggregate_list or [])
+        self.compact_bytes = int(compact_bytes)
+
+        self.lock = Lock()
+        self.entries = deque()          # (start byte in the log, entry), in log order
+        self.log_size = 0
+        self.read_offset = 0            # start of the oldest unconsumed entry
+        self.tokens = self.drain_rate
+        self.last_drain = time()
+
+        self.stored_count = 0
+        self.drained_count = 0
+        self.expired_count = 0
+        self.dropped_count = 0
+        self.aggregated_count = 0
+        self.compacted_count = 0
+
+        self._load()
+#--------------------------------------------------------------------------------------------------------------
+    def _load(self):
+        if not os.path.isfile(self.filename):
+            return
+
+        now = time()
+        try:
+            read_offset = 0
+            if os.path.isfile(self.offset_filename):
+                with open(self.offset_filename, "r") as f:
+                    read_offset = int(f.read().strip() or 0)
+            if read_offset > os.path.getsize(self.filename):
+                read_offset = 0         # the log was truncated after the offset was written
+
+            with open(self.filename, "rb") as f:
+                f.seek(read_offset)
+                for line in f:
+                    try:
+                        entry = loads(line)
+                    except (JSONDecodeError, UnicodeDecodeError):
+                        continue
+                    if entry.get("expires", 0) <= now:
+                        self.expired_count += 1
+                    elif entry["message_cmd"] in self.aggregate_set:
+                        self._remove_aggregated(entry)
+                        self.entries.append((0, entry))
+                    else:
+                        self.entries.append((0, entry))
+
+            while len(self.entries) > self.max_messages:
+                self.entries.popleft()
+                self.dropped_count += 1
+
+            self._compact()
+            self.insLogger.log_info(
+                msg=f"[MqttOfflineBuffer--_load] Restored {len(self.entries)} buffered message(s) from {self.filename}, expired: {self.expired_count}"
+            )
+
+        except Exception as e:
+            self.insLogger.log_error(msg=f"[MqttOfflineBuffer--_load ERROR] Failed to read {self.filename}: {e}")
+
+    def _compact(self):
+        # the offset is reset first: a crash before the log is replaced resends consumed messages, never skips live ones
+        self.read_offset = 0
+        self._write_offset()
+        tmp_file = f"{self.filename}.tmp"
+        entries = deque()
+        position = 0
+        with open(tmp_file, "wb") as f:
+            for _, entry in self.entries:
+                line = (dumps(entry) + "\n").encode("utf-8")
+                f.write(line)
+                entries.append((position, entry))
+                position += len(line)
+        os.replace(tmp_file, self.filename)
+        self.entries = entries
+        self.log_size = position
+        self.compacted_count += 1
+
+    def _truncate(self):
+        # empty buffer: truncating before the offset is written is safe, an offset past the end reads as 0
+        with open(self.filename, "wb"):
+            pass
+        self.log_size = 0
+        self.read_offset = 0
+        self._write_offset()
+
+    def _write_offset(self):
+        tmp_file = f"{self.offset_filename}.tmp"
+        with open(tmp_file, "w") as f:
+            f.write(str(self.read_offset))
+        os.replace(tmp_file, self.offset_filename)
+
+    def _advance(self):
+        # after entries left the head: persist the new read offset, compacting or truncating when due
+        if not self.entries:
+            self._truncate()
+            return
+        self.read_offset = self.entries[0][0]
+        if self.read_offset >= self.compact_bytes and self.read_offset * 2 >= self.log_size:
+            self._compact()
+        else:
+            self._write_offset()
+
+    def _append(self, entry):
+        line = (dumps(entry) + "\n").encode("utf-8")
+        with open(self.filename, "ab") as f:
+            f.write(line)
+        self.entries.append((self.log_size, entry))
+        self.log_size += len(line)
+
+    def _remove_aggregated(self, entry):
+        # the same topic's older entry of an aggregated message_cmd is superseded; it stays in the log until compaction
+        before = len(self.entries)
+        self.entries = deque(
+            (start, e) for start, e in self.entries
+            if not (e["message_cmd"] == entry["message_cmd"] and e["topic"] == entry["topic"])
+        )
+        self.aggregated_count += before - len(self.entries)
+        return before != len(self.entries)
+#--------------------------------------------------------------------------------------------------------------
+    def get_ttl(self, message_cmd):
+        return self.ttl_dict.get(message_cmd, self.ttl_dict.get("default", self.DEFAULT_TTL))
+
+    def __len__(self):
+        return len(self.entries)
+
+#--------------------------------------------------------------------------------------------------------------
+    def store(self, topic, payload, message_cmd, objectId, qos=0):
+        now = time()
+        entry = {
+            "topic": topic,
+            "payload": payload,
+            "message_cmd": message_cmd,
+            "objectId": objectId,
+            "qos": qos,
+            "stored": now,
+            "expires": now + self.get_ttl(message_cmd)
+        }
+
+        try:
+            with self.lock:
+                head_removed = False
+
+                if message_cmd in self.aggregate_set:
+                    head_start = self.entries[0][0] if self.entries else None
+                    if self._remove_aggregated(entry):
+                        head_removed = not self.entries or self.entries[0][0] != head_start
+
+                while len(self.entries) >= self.max_messages:
+                    self.entries.popleft()
+                    self.dropped_count += 1
+                    head_removed = True
+
+                self._append(entry)
+                self.stored_count += 1
+
+                if head_removed:
+                    self._advance()
+
+            self.insLogger.log_info(
+                msg=f"[MqttOfflineBuffer--store] Buffered objectId: {objectId}, message_cmd: {message_cmd}, buffered: {len(self.entries)}"
+            )
+
+        except Exception as e:
+            self.insLogger.log_error(msg=f"[MqttOfflineBuffer--store ERROR] Failed to buffer message {objectId}: {e}")
+
+#--------------------------------------------------------------------------------------------------------------
+    def drain(self, publish_fn):
+        """
+        Publishes buffered messages through publish_fn(entry) -> bool, limited to drain_rate
+        messages per second. Expired entries are discarded. Returns the number published.
+        """
+        if not self.entries:
+            return 0
+
+        published = 0
+        changed = False
+        with self.lock:
+            now = time()
+            self.tokens = min(self.drain_rate, self.tokens + (now - self.last_drain) * self.drain_rate)
+            self.last_drain = now
+
+            while self.entries and self.tokens >= 1:
+                entry = self.entries[0][1]
+                if entry["expires"] <= now:
+                    self.entries.popleft()
+                    self.expired_count += 1
+                    changed = True
+                    self.insLogger.log_info(
+                        msg=f"[MqttOfflineBuffer--drain] Expired objectId: {entry['objectId']}, message_cmd: {entry['message_cmd']}"
+                    )
+                    continue
+
+                if not publish_fn(entry):
+                    break
+
+                self.entries.popleft()
+                self.tokens -= 1
+                self.drained_count += 1
+                published += 1
+                changed = True
+
+            try:
+                if changed:
+                    self._advance()
+            except Exception as e:
+                self.insLogger.log_error(msg=f"[MqttOfflineBuffer--drain ERROR] Failed to update {self.offset_filename}: {e}")
+
+        if published:
+            self.insLogger.log_info(
+                msg=f"[MqttOfflineBuffer--drain] Published {published} buffered message(s), remaining: {len(self.entries)}"
+            )
+        return published
+
+#--------------------------------------------------------------------------------------------------------------
+    def get_metrics(self):
+        return {
+            "depth": len(self.entries),
+            "stored": self.stored_count,
+            "drained": self.drained_count,
+            "expired": self.expired_count,
+            "dropped": self.dropped_count,
+            "aggregated": self.aggregated_count,
+            "log_bytes": self.log_size,
+            "compactions": self.compacted_count
+        }
+
+#--------------------------------------------------------------------------------------------------------------
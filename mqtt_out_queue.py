@@ -1,10 +1,17 @@
-# updated: 2025-05-16 13:37:22
+# updated: 2026-10-19 13:10:06
 # created: 2024-07-21 19:24:15
 # filename: mqtt_out_queue.py
 #-----------------------------------------------------------------------------------------------------------------------------
 from uuid import uuid4
+from zlib import crc32
+from queue import Queue, Full, Empty
+from threading import Thread
+from time import time, monotonic
 from filelock import FileLock
 from datetime import datetime
+from event_coalescer import EventCoalescer
+from schedule_engine import ScheduleEngine
+from latency_histogram import LatencyHistogram
 from mqtt_client import AccessPayload                                       # from a @dataclass 
 from json import dump, dumps, loads, JSONDecodeError
 from csv_writer import CSVwriter, TemperatureHeader, TransactionHeader     # from a @dataclass
@@ -32,6 +39,8 @@ class MQTToutQueue (object):
             filename = "transaction_log.csv",
             own_serial_number = None,
             csv_logging_enable = True,
+            lock_suffix = "",
+            worker_threads = True,
             util_prt = False,
             util_prt0 = False
         ):
@@ -42,8 +51,8 @@ class MQTToutQueue (object):
         self.insMongoGeneral = insMongoGeneral
         self.insCSVtemperature = insCSVtemperature
 
-        self.file_lock_mqtt = FileLock('mqtt.lock')
-        self.file_lock_queue = FileLock('queue.lock')
+        self.file_lock_mqtt = FileLock(f'mqtt{lock_suffix}.lock')       # per shard under supervisor.py
+        self.file_lock_queue = FileLock(f'queue{lock_suffix}.lock')
 
         self.own_serial_number = own_serial_number
         self.util_prt = util_prt
@@ -72,6 +81,50 @@ class MQTToutQueue (object):
         self.anti_passback_function = access_settings_dict.get("anti_passback_function", False)
         self.watchlist_verif_dict   = access_settings_dict.get("watchlist_verif_dict", {})
 
+        # FaceMatch bursts: one event per (faceId, cameraId) per coalesce window
+        self.insFaceMatchCoalescer = EventCoalescer(
+            window = access_settings_dict.get("facematch_coalesce_seconds", 3)
+        )
+
+        # FaceMatch latency budget: events older than facematch_max_age_ms are dropped or marked
+        self.facematch_max_age_ms = access_settings_dict.get("facematch_max_age_ms", 5000)
+        self.facematch_stale_action = access_settings_dict.get("facematch_stale_action", "drop")
+        self.facematch_max_clock_skew_ms = access_settings_dict.get("facematch_max_clock_skew_ms", 2000)
+        self.clock_skew_count = 0
+        self.clock_skew_logged = 0.0
+        self.insFaceMatchAgeHistogram = LatencyHistogram()
+        self.stale_dropped_count = 0
+        self.stale_marked_count = 0
+        self.uncorrelated_ack_count = 0     # msg_sd_log_transation without a FaceMatch correlation
+
+        # input schedules compiled once; Main refreshes them when the config changes
+        self.insScheduleEngine = ScheduleEngine(insLogger, insMongoConfig)
+        self.insScheduleEngine.refresh()
+
+        # access workers: FaceMatch and pincode events sharded by card / face / PIN, one thread per shard.
+        # Worker queues are bounded and shed like the access lane they drain (coalescing already happened upstream)
+        queue_settings_dict = insMongoConfig.query_config_queue_settings() or {}   # derived from mongo database (queue_settings)
+        self.access_workers = int(queue_settings_dict.get("access_workers", 0)) if worker_threads else 0   # main_async.py shards on asyncio, handlers on its offload pool
+        self.sharded_dispatch = self.access_workers > 0
+        self.worker_queue_max = int(queue_settings_dict.get("access_worker_queue_max", 100))
+        access_lane_policy = (queue_settings_dict.get("lane_policy_dict") or {}).get("access", "drop_oldest")
+        self.worker_shed_policy = "reject_new" if access_lane_policy == "reject_new" else "drop_oldest"
+        self.worker_shed_count = 0
+
+        self.stale_after_dispatch_count = 0
+
+        self.worker_queues = []
+        self.worker_processed = []
+        for index in range(self.access_workers):
+            self.worker_queues.append(Queue(maxsize=self.worker_queue_max))
+            self.worker_processed.append(0)
+            Thread(
+                target = self.access_worker,
+                args = (index,),
+                name = f"access-worker-{index}",
+                daemon = True
+            ).start()
+
         self.insLogger.log_info (
             msg = f"[MQTToutQueue __init__] -- self.watchlist_verif_dict: {self.watchlist_verif_dict}")
 
@@ -83,6 +136,12 @@ class MQTToutQueue (object):
             print (f"access_zone_function: {self.access_zone_function}")
             print (f"watchlist_verif_dict: {self.watchlist_verif_dict}")
             print (f"anti_passback_function: {self.anti_passback_function}")  
+            print (f"facematch_coalesce_seconds: {self.insFaceMatchCoalescer.window}")
+            print (f"access_workers: {self.access_workers}")
+            print (f"access_worker_queue_max: {self.worker_queue_max} ({self.worker_shed_policy})")
+            print (f"facematch_max_age_ms: {self.facematch_max_age_ms}")
+            print (f"facematch_stale_action: {self.facematch_stale_action}")
+            print (f"facematch_max_clock_skew_ms: {self.facematch_max_clock_skew_ms}")
 #-----------------------------------------------------------------------------------------------------------------------------   
     def check_controller_serial_numbers (self, serial_number: str):
         return serial_number in self.unique_controller_serial_numbers_keys_tuple
@@ -204,7 +263,7 @@ class MQTToutQueue (object):
                 result["reason"] = "[MQTToutQueue--evaluate_zone_access] Access denied: accessZones contains invalid zone 0"
                 self.insLogger.log_error(msg=result["reason"])
                 accessZones = [z for z in accessZones if z != 0]
-                self.insMongoGeneral.db["users"].update_one({"cardNumbers": cardNumber}, {"$set": {"accessZones": accessZones}})
+                self.insMongoGeneral.update_user_by_card_number(cardNumber, {"accessZones": accessZones})
                 self.insLogger.log_info(
                     msg="[MQTToutQueue--evaluate_zone_access] Step 3: Removed zone 0 from user's accessZones"
                 )
@@ -224,9 +283,9 @@ class MQTToutQueue (object):
                                 msg=f"[MQTToutQueue--evaluate_zone_access] Step 4: User zone updated to {toZone}"
                             )
                     else:
-                        self.insMongoGeneral.db["users"].update_one(
-                            {"cardNumbers": cardNumber},
-                            {"$set": {"current_access_zone": self.perimeter_zone, "free_movement": False}}
+                        self.insMongoGeneral.update_user_by_card_number(
+                            cardNumber,
+                            {"current_access_zone": self.perimeter_zone, "free_movement": False}
                         )
                         result["zone_action"] = "set_to_perimeter"
                         self.insLogger.log_info(
@@ -266,10 +325,7 @@ class MQTToutQueue (object):
                                 msg="[MQTToutQueue--evaluate_zone_access] Step 7: Anti-passback mismatch but freeMovement allows"
                             )
                             result["used_free_pass"] = True
-                            self.insMongoGeneral.db["users"].update_one(
-                                {"cardNumbers": cardNumber},
-                                {"$set": {"free_movement": False}}
-                            )
+                            self.insMongoGeneral.update_user_by_card_number(cardNumber, {"free_movement": False})
                             self.insLogger.log_info(msg="[MQTToutQueue--evaluate_zone_access] Step 7: free_movement reset to False")
                         else:
                             result["reason"] = "[MQTToutQueue--evaluate_zone_access] Access denied: anti-passback violation"
@@ -334,6 +390,10 @@ class MQTToutQueue (object):
                     msg=f"[MQTToutQueue--service_out_queue] Decoded payload: {payload_str}"
                 )
 
+                # supervisor.py shards: access events are handled on the shard owning their face / card
+                if self.route_to_owner_shard(message, payload_json, topic_serial_number):
+                    return
+
                 # If it's not a routed message, treat it as a regular JSON structure (msg_sd_...)
                 if "routed_msg_type" not in payload_json:
                     self.parse_json_data(dtt, payload_json, topic_serial_number)
@@ -353,8 +413,21 @@ class MQTToutQueue (object):
                     )
                     return
 
-                # All checks passed, handle the FaceMatch message
-                self.handle_face_match(payload_json, dtt, topic_serial_number, dtts, message)
+                # Shed events that exceeded the latency budget while queued
+                if self.shed_stale_face_match(payload_json, topic_serial_number, dtts, message):
+                    return
+
+                # Absorb repeats of the same person at the same camera
+                coalesce_key = (str(payload_json.get("faceId", "")).strip(), payload_json.get("cameraId"))
+                if not self.insFaceMatchCoalescer.admit(coalesce_key):
+                    self.insLogger.log_debug(
+                        msg=f"[MQTToutQueue--service_out_queue] Coalesced FaceMatch objectId={payload_json.get('_iD')}, faceId={coalesce_key[0]}, cameraId={coalesce_key[1]}, suppressed: {self.insFaceMatchCoalescer.get_suppressed(coalesce_key)}"
+                    )
+                    return
+
+                # All checks passed, handle the FaceMatch message on the faceId's shard
+                shard_key = self.get_user_shard_key(faceId=coalesce_key[0]) if self.sharded_dispatch else None
+                self.dispatch(shard_key, self.handle_face_match, payload_json, dtt, topic_serial_number, dtts, message)
 
 
                 # if "routed_msg_type" not in payload_json:
@@ -388,8 +461,187 @@ class MQTToutQueue (object):
             finally:
                 self.q.task_done()
 
+#----------------------------------------------------------------------------------------------------------------
+    def route_to_owner_shard(self, message, payload_json, topic_serial_number):
+        # ROC / QR server traffic arrives on any shard (shared subscription) and pincodes on the reader's shard;
+        # both are forwarded (payload unchanged) to the shard owning the face / card, which then handles them
+        broker = self.insMQTTbroker
+        if broker.shard_count <= 1 or broker.is_shard_forward(message.topic):
+            return False
+
+        if payload_json.get("routed_msg_type") == self.ROUTED_TYPE_FACEMATCH:
+            shard_key = self.get_user_shard_key(faceId=str(payload_json.get("faceId", "")).strip())
+        elif "msg_sd_msg_pincode" in payload_json:
+            msg_data = payload_json["msg_sd_msg_pincode"]
+            shard_key = self.get_user_shard_key(
+                faceId = msg_data.get("faceId"),
+                cardNumber = msg_data.get("cardNumber"),
+                pinNumber = msg_data.get("pinNumber")
+            ) or topic_serial_number
+        else:
+            return False
+
+        owner = broker.get_shard_owner(shard_key)
+        if owner == broker.shard_index or not broker.forward_to_shard(owner, topic_serial_number, message.payload):
+            return False
+
+        self.insLogger.log_debug(
+            msg=f"[MQTToutQueue--route_to_owner_shard] Forwarded access event from {topic_serial_number} to shard {owner}, shard key: {shard_key}"
+        )
+        return True
+
+    def set_dispatcher(self, dispatch):
+        # an alternative sharded dispatcher (main_async.AsyncAccessDispatcher) replaces the per-shard worker threads
+        self.dispatch = dispatch
+        self.sharded_dispatch = True
+
+    def get_user_shard_key(self, faceId=None, cardNumber=None, pinNumber=None):
+        # the raw identifier the event carries (card, face or PIN, in that order): stable per person and
+        # computed without a lookup, so routing never waits on Mongo; None when the event carries none
+        for field, value in (("cardNumbers", cardNumber), ("faceId", faceId), ("pinNumber", pinNumber)):
+            if value:
+                return f"{field}:{str(value).strip()}"
+        return None
+
+    def dispatch(self, shard_key, handler, *args):
+        # Events for one card / face / PIN always land on the same worker, so their order (which
+        # anti-passback depends on) is kept while different people run concurrently.
+        if not self.access_workers:
+            handler(*args)
+            return
+
+        index = crc32(str(shard_key).encode("utf-8")) % self.access_workers
+        worker_queue = self.worker_queues[index]
+        try:
+            worker_queue.put_nowait((handler, args))
+            return
+        except Full:
+            self.worker_shed_count += 1
+
+        if self.worker_shed_policy == "drop_oldest":
+            try:
+                worker_queue.get_nowait()
+                worker_queue.task_done()
+            except Empty:
+                pass
+            try:
+                worker_queue.put_nowait((handler, args))
+            except Full:
+                pass
+
+        self.insLogger.log_warning(
+            msg=f"[MQTToutQueue--dispatch] Worker {index} queue full ({self.worker_queue_max}), {self.worker_shed_policy}: shed {self.worker_shed_count}"
+        )
+
+    def access_worker(self, index):
+        worker_queue = self.worker_queues[index]
+        while True:
+            handler, args = worker_queue.get()
+            try:
+                handler(*args)
+                self.worker_processed[index] += 1
+            except Exception as e:
+                self.insLogger.log_error(
+                    msg=f"[MQTToutQueue--access_worker ERROR] Worker {index}: {e}"
+                )
+            finally:
+                worker_queue.task_done()
+
+    def get_worker_metrics(self):
+        return {
+            "policy": self.worker_shed_policy,
+            "max": self.worker_queue_max,
+            "shed": self.worker_shed_count,
+            "workers": [
+                {"worker": index, "depth": worker_queue.qsize(), "processed": self.worker_processed[index]}
+                for index, worker_queue in enumerate(self.worker_queues)
+            ]
+        }
+
+#----------------------------------------------------------------------------------------------------------------
+    def get_event_age_ms(self, payload_json, message):
+        # Queueing age comes from paho's receive time (local monotonic). The ROC Watch timestamp
+        # (epoch ms, ROC's clock) adds the time before we received the event, but only while the two
+        # agree within facematch_max_clock_skew_ms; beyond that ROC's clock is off and is ignored.
+        received = getattr(message, "timestamp", 0)
+        queue_age_ms = (monotonic() - received) * 1000 if received else None
+
+        try:
+            payload_age_ms = time() * 1000 - float(payload_json.get("timestamp"))
+        except (TypeError, ValueError):
+            payload_age_ms = None
+
+        if queue_age_ms is None:
+            return max(0.0, payload_age_ms) if payload_age_ms is not None else 0.0
+        if payload_age_ms is None:
+            return queue_age_ms
+
+        transit_ms = payload_age_ms - queue_age_ms
+        if abs(transit_ms) <= self.facematch_max_clock_skew_ms:
+            return queue_age_ms + max(0.0, transit_ms)
+
+        self.clock_skew_count += 1
+        now = monotonic()
+        if now - self.clock_skew_logged >= 60:
+            self.clock_skew_logged = now
+            self.insLogger.log_warning(
+                msg=f"[MQTToutQueue--get_event_age_ms] ROC timestamp is {transit_ms:.0f}ms off our receive time (> {self.facematch_max_clock_skew_ms}ms), check the ROC server clock; using queueing age, skewed events: {self.clock_skew_count}"
+            )
+        return queue_age_ms
+
+    def shed_stale_face_match(self, payload_json, topic_serial_number, dtts, message, after_dispatch=False):
+        # after_dispatch: the worker's re-check, counted apart from (never on top of) the check at dequeue
+        age_ms = self.get_event_age_ms(payload_json, message)
+        if not after_dispatch:
+            self.insFaceMatchAgeHistogram.observe(age_ms)
+
+        if not self.facematch_max_age_ms or age_ms <= self.facematch_max_age_ms:
+            return False
+
+        objectId = payload_json.get("_iD")
+        faceId = str(payload_json.get("faceId", "")).strip()
+
+        if after_dispatch:
+            self.stale_after_dispatch_count += 1
+        elif self.facematch_stale_action == "mark":
+            self.stale_marked_count += 1
+        else:
+            self.stale_dropped_count += 1
+
+        if self.facematch_stale_action == "mark" and self.insCSVtransaction:
+            transaction_data = TransactionHeader(       # from a @dataclass
+                _iD             = objectId,
+                dateTime        = dtts,
+                transactionType = 'FACE_Stale',
+                idNumber        = faceId,
+                UniqueId        = payload_json.get("personId"),
+                fullName        = f"{payload_json.get('firstname', '')} {payload_json.get('lastname', '')}",
+                serialSource    = topic_serial_number
+            )
+            self.insCSVtransaction.write_transaction_to_csv_file(transaction_data)
+
+        self.insLogger.log_warning(
+            msg=f"[MQTToutQueue--shed_stale_face_match] Stale FaceMatch objectId={objectId}, faceId={faceId}, age_ms={age_ms:.0f} > {self.facematch_max_age_ms} ({self.facematch_stale_action})"
+        )
+        return True
+
+    def get_face_match_metrics(self):
+        return {
+            "age": self.insFaceMatchAgeHistogram.get_metrics(),
+            "stale_dropped": self.stale_dropped_count,
+            "stale_marked": self.stale_marked_count,
+            "stale_after_dispatch": self.stale_after_dispatch_count,
+            "uncorrelated_acks": self.uncorrelated_ack_count,
+            "clock_skewed": self.clock_skew_count,
+            "coalescing": self.insFaceMatchCoalescer.get_metrics()
+        }
+
 #----------------------------------------------------------------------------------------------------------------
     def handle_face_match(self, payload_json, dtt, topic_serial_number, dtts, message):
+        # the event may have waited on its worker behind slow lookups: check the budget again before acting on it
+        if self.shed_stale_face_match(payload_json, topic_serial_number, dtts, message, after_dispatch=True):
+            return
+
         try:
             parsed = {k: payload_json.get(k, "") for k in self.REQUIRED_KEYS}
             objectId = parsed["_iD"]
@@ -432,6 +684,7 @@ class MQTToutQueue (object):
 
             if objectId not in self.insMQTTbroker.objectId_dict:
                 self.insMQTTbroker.objectId_dict[objectId] = link_serial_number
+                self.insMQTTbroker.mqtt_publish_shard_correlation(objectId, link_serial_number)
             else:
                 self.insLogger.log_warning(
                     msg=f"[MQTTBroker] Duplicate objectId detected: {objectId}"
@@ -525,7 +778,8 @@ class MQTToutQueue (object):
                 fullName        = fullName,
                 serialSource    = link_serial_number
             )
-            self.insCSVtransaction.write_transaction_to_csv_file(transaction_data)
+            if self.insCSVtransaction:
+                self.insCSVtransaction.write_transaction_to_csv_file(transaction_data)
 
 
             self.insLogger.log_info(
@@ -665,9 +919,7 @@ class MQTToutQueue (object):
                 elif top_level_key == 'msg_sd_inputs_deb':
                     input_ports = msg_data.get('inputPorts')
                     actual_inputs = self.int_to_boolean_tuple(input_ports)
-                    current_time = dtt.time()
-                    input_schedule = None
-                    # input_schedule = self.insJSONconfig.check_input_schedules(topic_serial_number, current_time)
+                    input_schedule = self.insScheduleEngine.get_scheduled_inputs(topic_serial_number, dtt)
 
                     if any(actual_inputs) or any(input_schedule):
                         self.insLogger.log_info(
@@ -683,7 +935,7 @@ class MQTToutQueue (object):
                                 self.insLogger.log_info(
                                     msg=f"[MQTToutQueue--parse_json_data] {topic_serial_number} Input {i+1} triggered and scheduled — reporting"
                                 )
-                                self.insAlertReport.prepare_schedule_input_alert_send(dtt, topic_serial_number, i)
+                                self.report_scheduled_input(dtts, topic_serial_number, i)
                     else:
                         if any(actual_inputs) or any(input_schedule):
                             self.insLogger.log_info(
@@ -787,7 +1039,13 @@ class MQTToutQueue (object):
                     objectId = msg_data.get('_iD')
                     serial_number = self.insMQTTbroker.objectId_dict.pop(objectId, None)
                     if serial_number is None:
-                        return  # or handle the missing objectId if needed
+                        # expired or never ours: the reader's shard holds the correlation of every FaceMatch
+                        # answered to it (msg_sd_shard_correlation), so an ack without one is not a transaction
+                        self.uncorrelated_ack_count += 1
+                        self.insLogger.log_warning(
+                            msg = f"[MQTToutQueue--parse_json_data] Uncorrelated {top_level_key} rejected: objectId={objectId}, serialSource={serial_source}, partitioned={self.insMQTTbroker.partitioned}"
+                        )
+                        return
 
                     if serial_source == serial_number:
                         # Creating an instance of TransactionHeader
@@ -800,7 +1058,8 @@ class MQTToutQueue (object):
                             fullName        = msg_data.get('fullName'),
                             serialSource    = serial_source
                         )
-                        self.insCSVtransaction.write_transaction_to_csv_file(transaction_data)
+                        if self.insCSVtransaction:
+                            self.insCSVtransaction.write_transaction_to_csv_file(transaction_data)
 
                         self.insLogger.log_info(
                             msg = f"[MQTToutQueue--parse_json_data] Logged transaction to CSV: data={transaction_data}"
@@ -810,90 +1069,128 @@ class MQTToutQueue (object):
                             msg = f"[MQTToutQueue--parse_json_data ERROR] Transaction mismatch: serial_source={serial_source}, serial_number={serial_number}"
                         )
 
+                elif top_level_key == 'msg_sd_shard_correlation':
+                    # another shard of the group answered a FaceMatch for a reader this shard owns: its ack arrives here
+                    self.insMQTTbroker.objectId_dict[objectId] = topic_serial_number
+
                 elif top_level_key == 'msg_sd_msg_pincode':
-                    face_id = msg_data.get("faceId")
-                    pincode = msg_data.get("pinCode")
-                    pin_number = msg_data.get("pinNumber")
-                    card_number = msg_data.get("cardNumber")
-                    access_zone_inside = msg_data.get("accessZoneInside")
-                    access_zone_outside = msg_data.get("accessZoneOutside")
-                    userVerifIdent = False
+                    shard_key = None
+                    if self.sharded_dispatch:
+                        shard_key = self.get_user_shard_key(
+                            faceId = msg_data.get("faceId"),
+                            cardNumber = msg_data.get("cardNumber"),
+                            pinNumber = msg_data.get("pinNumber")
+                        ) or topic_serial_number
+                    self.dispatch(shard_key, self.handle_pincode, msg_data, objectId, topic_serial_number)
 
-                    self.insLogger.log_info(
-                        msg=f"[MQTToutQueue--parse_json_data] access_zone_inside={access_zone_inside}"
-                    )
-                    self.insLogger.log_info(
-                        msg=f"[MQTToutQueue--parse_json_data] access_zone_outside={access_zone_outside}"
+                else:
+                    self.insLogger.log_error(
+                        msg=f"[MQTToutQueue--parse_json_data] Invalid message received — unknown top-level key: '{top_level_key}'"
                     )
 
-                    found = False
-                    fullName = None
-
-                    if card_number:
-                        fullName = self.insMongoGeneral.query_user_by_card_number(cardNumber=card_number)
-                        found = bool(fullName)
-                        self.insLogger.log_info(
-                            msg=f"[MQTToutQueue--parse_json_data] card_number={card_number} -> fullName='{fullName}', found={found}"
-                        )
-                        userVerifIdent = self.insMongoGeneral.query_verifIdent_by_card_number(cardNumber=card_number)
-                        mode = "Verify" if userVerifIdent else "Ident"
-                        self.insLogger.log_info(
-                            msg=f"[MQTToutQueue--parse_json_data] userVerifIdent_by_card_number: {card_number} userVerifIdent: {userVerifIdent} ({mode} mode)"
-                        )
+            except Exception as e:
+                self.insLogger.log_error(
+                    msg=f"[MQTToutQueue--parse_json_data ERROR] Exception while processing payload: {str(e)}"
+                )
 
-                    elif face_id:
-                        self.insLogger.log_info(
-                            msg=f"[MQTToutQueue--parse_json_data] Received faceId={face_id} — no matching card or PIN logic executed"
-                        )
+#----------------------------------------------------------------------------------------------------------------
+    def report_scheduled_input(self, dtts, serial_number, input_index):
+        self.insLogger.log_warning(
+            msg=f"[MQTToutQueue--report_scheduled_input] {serial_number} Input {input_index + 1} active inside its scheduled window"
+        )
+        if self.insCSVtransaction:
+            transaction_data = TransactionHeader(       # from a @dataclass
+                _iD             = uuid4().hex[:24],
+                dateTime        = dtts,
+                transactionType = 'INPUT_Scheduled',
+                idNumber        = str(input_index + 1),
+                UniqueId        = f"{{{uuid4()}}}",
+                fullName        = f"Input {input_index + 1}",
+                serialSource    = serial_number
+            )
+            self.insCSVtransaction.write_transaction_to_csv_file(transaction_data)
 
-                    elif pincode:
-                        self.insLogger.log_info(
-                            msg=f"[MQTToutQueue--parse_json_data] Received pincode={pincode} — no matching card or PIN logic executed"
-                        )
+#----------------------------------------------------------------------------------------------------------------
+    def handle_pincode(self, msg_data, objectId, topic_serial_number):
+        try:
+            face_id = msg_data.get("faceId")
+            pincode = msg_data.get("pinCode")
+            pin_number = msg_data.get("pinNumber")
+            card_number = msg_data.get("cardNumber")
+            access_zone_inside = msg_data.get("accessZoneInside")
+            access_zone_outside = msg_data.get("accessZoneOutside")
+            userVerifIdent = False
 
-                    elif pin_number:
-                        fullName = self.insMongoGeneral.query_user_by_pinNumber(pinNumber=pin_number)
-                        found = bool(fullName)
-                        self.insLogger.log_info(
-                            msg=f"[MQTToutQueue--parse_json_data] pin_number={pin_number} -> fullName='{fullName}', found={found}"
-                        )
+            self.insLogger.log_info(
+                msg=f"[MQTToutQueue--handle_pincode] access_zone_inside={access_zone_inside}"
+            )
+            self.insLogger.log_info(
+                msg=f"[MQTToutQueue--handle_pincode] access_zone_outside={access_zone_outside}"
+            )
 
-                    else:
-                        self.insLogger.log_error(
-                            msg=f"[MQTToutQueue--parse_json_data] No identifying information provided — skipping"
-                        )
+            found = False
+            fullName = None
 
-                    payload = AccessPayload(        # from a @dataclass
-                        objectId      = objectId,
-                        serial_number = topic_serial_number,
-                        full_name     = fullName,
-                        found         = found,
-                        pincode       = pincode,
-                        pin_number    = pin_number,
-                        card_number   = card_number,
-                        face_id       = face_id,
-                        verif_ident   = userVerifIdent
-                    )
-                    self.insMQTTbroker.mqtt_publish_access_response(payload)
+            if card_number:
+                fullName = self.insMongoGeneral.query_user_by_card_number(cardNumber=card_number)
+                found = bool(fullName)
+                self.insLogger.log_info(
+                    msg=f"[MQTToutQueue--handle_pincode] card_number={card_number} -> fullName='{fullName}', found={found}"
+                )
+                userVerifIdent = self.insMongoGeneral.query_verifIdent_by_card_number(cardNumber=card_number)
+                mode = "Verify" if userVerifIdent else "Ident"
+                self.insLogger.log_info(
+                    msg=f"[MQTToutQueue--handle_pincode] userVerifIdent_by_card_number: {card_number} userVerifIdent: {userVerifIdent} ({mode} mode)"
+                )
 
-                    # verif_ident = userVerifIdent
-                    # access_tuple = (topic_serial_number, fullName, found, pincode, pin_number, card_number, face_id, verif_ident)
-                    # self.insMQTTbroker.mqtt_publish_access_response(access_tuple=access_tuple)
+            elif face_id:
+                self.insLogger.log_info(
+                    msg=f"[MQTToutQueue--handle_pincode] Received faceId={face_id} — no matching card or PIN logic executed"
+                )
 
-                    self.insLogger.log_info(
-                        msg=f"[MQTToutQueue--parse_json_data] MQTT Response published: fullName='{fullName}', card_number={card_number}, found={found}"
-                    )
+            elif pincode:
+                self.insLogger.log_info(
+                    msg=f"[MQTToutQueue--handle_pincode] Received pincode={pincode} — no matching card or PIN logic executed"
+                )
 
-                else:
-                    self.insLogger.log_error(
-                        msg=f"[MQTToutQueue--parse_json_data] Invalid message received — unknown top-level key: '{top_level_key}'"
-                    )
+            elif pin_number:
+                fullName = self.insMongoGeneral.query_user_by_pinNumber(pinNumber=pin_number)
+                found = bool(fullName)
+                self.insLogger.log_info(
+                    msg=f"[MQTToutQueue--handle_pincode] pin_number={pin_number} -> fullName='{fullName}', found={found}"
+                )
 
-            except Exception as e:
+            else:
                 self.insLogger.log_error(
-                    msg=f"[MQTToutQueue--parse_json_data ERROR] Exception while processing payload: {str(e)}"
+                    msg=f"[MQTToutQueue--handle_pincode] No identifying information provided — skipping"
                 )
 
+            payload = AccessPayload(        # from a @dataclass
+                objectId      = objectId,
+                serial_number = topic_serial_number,
+                full_name     = fullName,
+                found         = found,
+                pincode       = pincode,
+                pin_number    = pin_number,
+                card_number   = card_number,
+                face_id       = face_id,
+                verif_ident   = userVerifIdent
+            )
+            self.insMQTTbroker.mqtt_publish_access_response(payload)
+
+            # verif_ident = userVerifIdent
+            # access_tuple = (topic_serial_number, fullName, found, pincode, pin_number, card_number, face_id, verif_ident)
+            # self.insMQTTbroker.mqtt_publish_access_response(access_tuple=access_tuple)
+
+            self.insLogger.log_info(
+                msg=f"[MQTToutQueue--handle_pincode] MQTT Response published: fullName='{fullName}', card_number={card_number}, found={found}"
+            )
+
+        except Exception as e:
+            self.insLogger.log_error(
+                msg=f"[MQTToutQueue--handle_pincode ERROR] Exception occurred: {str(e)}"
+            )
+
 #----------------------------------------------------------------------------------------------------------------
 #   _iD, dateTime, transactionCode, idNumber, fullName, serialSource
 #   4388738612ee4fc4ba179f30, 2024/12/18  16:49:44, RFE_Access, 777, Push Button, 251096701259753
@@ -0,0 +1,224 @@
+# updated: 2026-10-19 12:24:49
+# created: 2026-10-19 12:19:35
+# filename: priority_lane_queue.py
+#--------------------------------------------------------------------------------------------------------------
+from queue import Empty
+from time import monotonic
+from threading import Condition
+from collections import deque
+from latency_histogram import LatencyHistogram
+#--------------------------------------------------------------------------------------------------------------
+class PriorityLaneQueue (object):
+    """
+    Drop-in replacement for queue.Queue holding paho messages in priority lanes.
+    Messages are classified once, on put(), by searching the raw payload for each lane's markers.
+    Lanes are served in order (access first); after fairness_budget consecutive higher-lane gets,
+    the oldest waiting message of the lowest non-empty lane is served so telemetry never starves.
+    Each lane is bounded by lane_max_dict and sheds load by its lane_policy_dict entry:
+    drop_oldest, reject_new, or coalesce (replace the queued message with the same topic and marker).
+    """
+    POLICIES = ("drop_oldest", "reject_new", "coalesce")
+
+    DEFAULT_LANE_DICT = {
+        "access": ['"FaceMatch"', '"msg_sd_msg_pincode"'],
+        "control": [],
+        "telemetry": ['"msg_sd_sysinfo"', '"msg_sd_sysconfig"', '"msg_sd_msg_sensors"', '"msg_sd_msg_cpu_sensor"']
+    }
+
+    def __init__ (
+            self,
+            lane_dict = None,
+            default_lane = "control",
+            fairness_budget = 10,
+            lane_max_dict = None,
+            lane_policy_dict = None,
+            high_water_ratio = 0.8
+        ) -> None:
+
+        lane_dict = lane_dict or self.DEFAULT_LANE_DICT
+        self.lane_names = list(lane_dict.keys())
+        self.markers = [
+            (lane, [m.encode("utf-8") for m in markers])
+            for lane, markers in lane_dict.items() if markers
+        ]
+        self.default_lane = default_lane if default_lane in lane_dict else self.lane_names[-1]
+        self.fairness_budget = int(fairness_budget)
+
+        lane_max_dict = lane_max_dict or {}
+        lane_policy_dict = lane_policy_dict or {}
+        self.lane_max_dict = {lane: int(lane_max_dict.get(lane, 0)) for lane in self.lane_names}     # 0 = unbounded
+        self.lane_policy_dict = {
+            lane: lane_policy_dict.get(lane) if lane_policy_dict.get(lane) in self.POLICIES else "drop_oldest"
+            for lane in self.lane_names
+        }
+        self.high_water_dict = {
+            lane: max(1, int(maxsize * float(high_water_ratio))) if maxsize else 0
+            for lane, maxsize in self.lane_max_dict.items()
+        }
+
+        self.mutex = Condition()
+        self.lanes = {lane: deque() for lane in self.lane_names}    # lane -> deque of [enqueued monotonic, message, coalesce key]
+        self.coalesce_index = {lane: {} for lane in self.lane_names}  # lane -> coalesce key -> entry
+        self.unfinished_tasks = 0
+        self.served_since_lowest = 0
+
+        self.wait_histogram_dict = {lane: LatencyHistogram() for lane in self.lane_names}
+        self.enqueued_dict = {lane: 0 for lane in self.lane_names}
+        self.dequeued_dict = {lane: 0 for lane in self.lane_names}
+        self.shed_dict = {lane: {"dropped": 0, "rejected": 0, "coalesced": 0} for lane in self.lane_names}
+        self.high_water_active = {lane: False for lane in self.lane_names}
+        self.alerts = []
+#--------------------------------------------------------------------------------------------------------------
+    def classify(self, message):
+        """Returns (lane, matched marker or None)."""
+        payload = getattr(message, "payload", b"") or b""
+        for lane, markers in self.markers:
+            for marker in markers:
+                if marker in payload:
+                    return lane, marker
+        return self.default_lane, None
+#--------------------------------------------------------------------------------------------------------------
+    def put(self, message, block=True, timeout=None):
+        """Never blocks the paho network thread; returns False when the message was shed."""
+        lane, marker = self.classify(message)
+        policy = self.lane_policy_dict[lane]
+        key = (getattr(message, "topic", None), marker) if policy == "coalesce" and marker else None
+
+        with self.mutex:
+            entries = self.lanes[lane]
+
+            if key is not None and key in self.coalesce_index[lane]:
+                # newer reading replaces the queued one, keeping its place in line
+                self.coalesce_index[lane][key][1] = message
+                self.shed_dict[lane]["coalesced"] += 1
+                return True
+
+            maxsize = self.lane_max_dict[lane]
+            if maxsize and len(entries) >= maxsize:
+                if policy == "reject_new":
+                    self.shed_dict[lane]["rejected"] += 1
+                    return False
+                self._remove_entry(lane, entries.popleft())
+                self.unfinished_tasks -= 1
+                self.shed_dict[lane]["dropped"] += 1
+
+            entry = [monotonic(), message, key]
+            entries.append(entry)
+            if key is not None:
+                self.coalesce_index[lane][key] = entry
+            self.enqueued_dict[lane] += 1
+            self.unfinished_tasks += 1
+            self._check_high_water(lane)
+            self.mutex.notify()
+            return True
+
+    def _remove_entry(self, lane, entry):
+        if entry[2] is not None:
+            self.coalesce_index[lane].pop(entry[2], None)
+
+    def _check_high_water(self, lane):
+        high_water = self.high_water_dict[lane]
+        if not high_water:
+            return
+
+        depth = len(self.lanes[lane])
+        if not self.high_water_active[lane] and depth >= high_water:
+            self.high_water_active[lane] = True
+            self.alerts.append(("overloaded", lane, depth, self.lane_max_dict[lane], dict(self.shed_dict[lane])))
+        elif self.high_water_active[lane] and depth <= high_water // 2:
+            self.high_water_active[lane] = False
+            self.alerts.append(("recovered", lane, depth, self.lane_max_dict[lane], dict(self.shed_dict[lane])))
+
+    def pop_alerts(self):
+        """High-water transitions since the last call: (state, lane, depth, maxsize, shed counters)."""
+        with self.mutex:
+            alerts, self.alerts = self.alerts, []
+            return alerts
+
+    def _next_lane(self):
+        waiting = [lane for lane in self.lane_names if self.lanes[lane]]
+        if not waiting:
+            return None
+
+        lowest = waiting[-1]
+        if len(waiting) > 1 and self.served_since_lowest >= self.fairness_budget:
+            return lowest
+        return waiting[0]
+
+    def get(self, block=True, timeout=None):
+        with self.mutex:
+            if not block:
+                if not self.qsize():
+                    raise Empty
+            elif timeout is None:
+                while not self.qsize():
+                    self.mutex.wait()
+            else:
+                end = monotonic() + timeout
+                while not self.qsize():
+                    remaining = end - monotonic()
+                    if remaining <= 0:
+                        raise Empty
+                    self.mutex.wait(remaining)
+
+            lane = self._next_lane()
+            entry = self.lanes[lane].popleft()
+            self._remove_entry(lane, entry)
+            enqueued, message = entry[0], entry[1]
+            self.dequeued_dict[lane] += 1
+            self._check_high_water(lane)
+
+            waiting = [name for name in self.lane_names if self.lanes[name] or name == lane]
+            if lane == waiting[-1]:
+                self.served_since_lowest = 0
+            else:
+                self.served_since_lowest += 1
+
+        self.wait_histogram_dict[lane].observe((monotonic() - enqueued) * 1000)
+        return message
+
+    def wait(self, timeout=None):
+        """Blocks until a message is queued or timeout expires; lets the main loop sleep between tasks."""
+        with self.mutex:
+            if not self.qsize():
+                self.mutex.wait(timeout)
+        return not self.empty()
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def task_done(self):
+        with self.mutex:
+            if self.unfinished_tasks <= 0:
+                raise ValueError("task_done() called too many times")
+            self.unfinished_tasks -= 1
+            if not self.unfinished_tasks:
+                self.mutex.notify_all()
+
+    def join(self):
+        with self.mutex:
+            while self.unfinished_tasks:
+                self.mutex.wait()
+#--------------------------------------------------------------------------------------------------------------
+    def qsize(self):
+        return sum(len(lane) for lane in self.lanes.values())
+
+    def empty(self):
+        return not self.qsize()
+
+    def get_metrics(self):
+        with self.mutex:
+            return {
+                lane: {
+                    "depth": len(self.lanes[lane]),
+                    "enqueued": self.enqueued_dict[lane],
+                    "dequeued": self.dequeued_dict[lane],
+                    "maxsize": self.lane_max_dict[lane],
+                    "policy": self.lane_policy_dict[lane],
+                    "shed": dict(self.shed_dict[lane]),
+                    "wait": self.wait_histogram_dict[lane].get_metrics()
+                }
+                for lane in self.lane_names
+            }
+
+#--------------------------------------------------------------------------------------------------------------
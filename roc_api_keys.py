@@ -1,4 +1,4 @@
-# updated: 2025-05-16 12:48:08
+# updated: 2026-10-19 12:32:19
 # created: 2025-05-11 13:19:24
 # filename: roc_api_keys.py
 #--------------------------------------------------------------------------------------------------------------
@@ -7,7 +7,7 @@ from pathlib import Path
 
 #--------------------------------------------------------------------------------------------------------------
 class ROC_Api:
-    def __init__(self, insLogger, rocServer="rocdemo1", file_path="config/.credentials.json"):
+    def __init__(self, insLogger, rocServer="rocdemo1", file_path="config/.credentials.json", entry=None):
         self.insLogger = insLogger
         self.file_path = file_path
         self.rocServer = rocServer
@@ -15,7 +15,33 @@ class ROC_Api:
         self.api_key = None
         self.api_secret = None
         self.user_access_id = None
-        self._load_keys()
+        if entry is not None:
+            self._apply_entry(entry)        # already loaded by load_enabled_entries
+        else:
+            self._load_keys()
+
+#--------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def load_enabled_entries(insLogger, file_path="config/.credentials.json"):
+        """All enabled roc_api_settings entries, read once for multi-server runs."""
+        try:
+            with Path(file_path).open("r") as f:
+                api_entries = load(f).get("roc_api_settings", [])
+        except Exception as e:
+            insLogger.log_error(msg=f"[ROC_Api--load_enabled_entries ERROR] Failed to read {file_path}: {str(e)}")
+            return []
+
+        if not isinstance(api_entries, list):
+            insLogger.log_error(msg="[ROC_Api--load_enabled_entries] 'roc_api_settings' is not a list")
+            return []
+        return [entry for entry in api_entries if entry.get("enabled", False)]
+
+    def _apply_entry(self, match):
+        self.rocServer = match.get("rocServer")
+        self.serverIp = match.get("serverIp")
+        self.api_key = match.get("idkey")
+        self.api_secret = match.get("secretkey")
+        self.user_access_id = match.get("_userAccessId")
 
 #--------------------------------------------------------------------------------------------------------------
     def _load_keys(self):
@@ -46,11 +72,7 @@ class ROC_Api:
                     )
                     return
 
-                self.rocServer = match.get("rocServer")
-                self.serverIp = match.get("serverIp")
-                self.api_key = match.get("idkey")
-                self.api_secret = match.get("secretkey")
-                self.user_access_id = match.get("_userAccessId")
+                self._apply_entry(match)
 
                 self.insLogger.log_info(
                     msg=(f"[ROC_Api--_load_keys] Loaded credentials for {self.rocServer} | "
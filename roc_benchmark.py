@@ -0,0 +1,113 @@
+# updated: 2026-10-19 13:10:44
+# created: 2026-10-19 12:33:19
+# filename: roc_benchmark.py
+
+#--------------------------------------------------------------------------------------------------------------
+import argparse
+from time import perf_counter
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from logger import CustomLogger
+from roc_rest_api import ROCRestAPI
+from roc_mock_server import ROCMockServer
+
+#--------------------------------------------------------------------------------------------------------------
+def run_scenario(insLogger, insServer, name, fn, max_concurrency, repeat):
+    """Runs fn(insClient) repeat times on a fresh client; returns the best run."""
+    runs = []
+    for _ in range(repeat):
+        insClient = ROCRestAPI(
+            insLogger=insLogger,
+            rocServer="mock",
+            credentials_entry=insServer.credentials_entry(),
+            base_url=insServer.base_url,
+            max_concurrency=max_concurrency,
+            backoff_factor=0
+        )
+        requests_before = insServer.request_count
+        start = perf_counter()
+        faces = fn(insClient)
+        elapsed = perf_counter() - start
+        insClient.close()
+        runs.append((elapsed, faces, insServer.request_count - requests_before))
+
+    elapsed, faces, requests = min(runs)
+    return {
+        "scenario": name,
+        "concurrency": max_concurrency,
+        "faces": faces,
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "faces_per_sec": round(faces / elapsed, 1) if elapsed else 0.0
+    }
+
+def sync_faces(insClient):
+    return sum(len(faces or []) for faces in insClient.sync_all_watchlisted_faces(delay_between_pages=0).values())
+
+def export_faces(insClient):
+    with TemporaryDirectory() as export_dir:
+        rows = insClient.map_watchlists(
+            lambda name, watchlist_id: insClient.export_watchlist_to_csv(name, watchlist_id, Path(export_dir), 0, resume=False),
+            insClient.get_watchlists()
+        )
+    return sum(rows.values())
+
+def delta_faces(insClient):
+    delta, manifest = insClient.compute_watchlist_delta(delay_between_pages=0)
+    return len(manifest)
+
+#--------------------------------------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Sync/export throughput of ROCRestAPI against roc_mock_server.py")
+    parser.add_argument("--watchlists", type=int, default=3, help="Number of watchlists (default: 3)")
+    parser.add_argument("--faces", type=int, default=10000, help="Faces across all watchlists (default: 10000)")
+    parser.add_argument("--page_size", type=int, default=100, help="Faces per page (default: 100)")
+    parser.add_argument("--latency_ms", type=float, default=10, help="Mock latency per request (default: 10)")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of injected 503s, retried by the client (default: 0)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8], help="max_concurrency values to compare (default: 1 4 8)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario, best is reported (default: 3)")
+    args = parser.parse_args()
+
+    custom_logger = CustomLogger(
+        backup_count=5,
+        max_bytes=10485760,
+        logfile="logs/roc_benchmark.log",
+        logger_level="WARNING",        # per-page INFO lines would dominate the timings
+        util_prt=False,
+        util_prt0=False
+    )
+
+    insServer = ROCMockServer(
+        watchlists=args.watchlists,
+        faces=args.faces,
+        page_size=args.page_size,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate
+    ).start()
+
+    scenarios = [("sync", sync_faces), ("export", export_faces), ("delta", delta_faces)]
+    try:
+        print(f"{'scenario':<10}{'conc':>6}{'faces':>10}{'requests':>10}{'seconds':>10}{'faces/s':>12}")
+        for name, fn in scenarios:
+            for max_concurrency in args.concurrency:
+                result = run_scenario(custom_logger, insServer, name, fn, max_concurrency, args.repeat)
+                print(
+                    f"{result['scenario']:<10}{result['concurrency']:>6}{result['faces']:>10}"
+                    f"{result['requests']:>10}{result['seconds']:>10}{result['faces_per_sec']:>12}"
+                )
+    finally:
+        insServer.stop()
+
+#--------------------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    main()
+
+#--------------------------------------------------------------------------------------------------------------
+"""
+Example Usage:
+python3 roc_benchmark.py
+python3 roc_benchmark.py --faces 100000 --page_size 500 --latency_ms 20 --concurrency 1 8 16
+python3 roc_benchmark.py --error_rate 0.05
+"""
+
+#--------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,229 @@
+# updated: 2026-10-19 12:33:19
+# created: 2026-10-19 12:33:19
+# filename: roc_mock_server.py
+
+#--------------------------------------------------------------------------------------------------------------
+import re
+from time import sleep
+from random import Random
+from hashlib import sha1
+from threading import Thread, Lock
+from json import dumps
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+#--------------------------------------------------------------------------------------------------------------
+class ROCMockServer:
+    """
+    Local stand-in for the ROC REST API (plain HTTP on localhost) serving the endpoints ROCRestAPI uses,
+    with a generated dataset, per-request latency and error injection. Point a client at base_url.
+    """
+    def __init__(
+            self,
+            host="127.0.0.1",
+            port=0,
+            watchlists=3,
+            faces=1000,
+            page_size=100,
+            cameras=4,
+            latency_ms=0,
+            error_rate=0.0,
+            error_status=503,
+            seed=1
+        ):
+        self.watchlist_count = watchlists
+        self.face_count = faces
+        self.page_size = page_size
+        self.camera_count = cameras
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = Random(seed)
+        self.lock = Lock()
+
+        self.watchlists = [
+            {"_id": f"{w + 1:024x}", "name": f"Watchlist {w + 1}", "enabled": True}
+            for w in range(watchlists)
+        ]
+        self.case = {"_id": f"{0xcafe:024x}", "name": "Live-01"}
+        self.cameras = [
+            {"GUID": f"{{{c + 1:08x}-0000-4000-8000-{c + 1:012x}}}", "url": f"rtsp://10.0.0.{c + 1}/stream1", "name": f"Camera {c + 1}"}
+            for c in range(cameras)
+        ]
+
+        self.request_count = 0
+        self.error_count = 0
+
+        self.httpd = ThreadingHTTPServer((host, port), self.make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+#--------------------------------------------------------------------------------------------------------------
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/rest/v1"
+
+    def credentials_entry(self):
+        """roc_api_settings-style entry for ROCRestAPI(credentials_entry=...)."""
+        host, port = self.httpd.server_address[:2]
+        return {"rocServer": "mock", "serverIp": f"{host}:{port}", "idkey": "mock-key", "secretkey": "mock-secret", "_userAccessId": "mock-user", "enabled": True}
+
+    def start(self):
+        self.thread = Thread(target=self.httpd.serve_forever, name="roc-mock-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+#--------------------------------------------------------------------------------------------------------------
+    def faces_in_watchlist(self, watchlist_index):
+        # faces are spread evenly; the first watchlists take the remainder
+        base, extra = divmod(self.face_count, self.watchlist_count)
+        return base + (1 if watchlist_index < extra else 0)
+
+    def make_face(self, watchlist_index, i):
+        return {
+            "_id": f"{watchlist_index + 1:04x}{i:020x}",
+            "firstname": f"First{i}",
+            "lastname": f"Last{watchlist_index + 1}",
+            "internalId": f"face-{watchlist_index + 1}-{i}",
+            "enabled": True,
+            "mediaId": f"media-{watchlist_index + 1}-{i}",
+            "identityData": {"customerId": f"C{i:06d}"},
+            "idNumbers": [
+                {"type": "Employee ID", "value": f"E{i:06d}"},
+                {"type": "Badge ID", "value": str(100000 + i)},
+                {"type": "PIN Number", "value": f"{i % 10000:04d}"},
+                {"type": "Access Zones", "value": "7,8,9,10"}
+            ]
+        }
+
+    def watchlist_page(self, watchlist_id, page):
+        index = next((w for w, wl in enumerate(self.watchlists) if wl["_id"] == watchlist_id), None)
+        if index is None:
+            return None
+        total = self.faces_in_watchlist(index)
+        total_pages = max(1, -(-total // self.page_size))
+        first = (page - 1) * self.page_size
+        return {
+            "page": page,
+            "totalPages": total_pages,
+            "elements": [self.make_face(index, i) for i in range(first, min(first + self.page_size, total))]
+        }
+
+    def route(self, method, path):
+        """Returns (status, body) for a request path under /rest/v1."""
+        if method == "GET":
+            if path == "/watchlists":
+                return 200, {"result": self.watchlists}
+            if path == "/watchlists/summary":
+                return 200, {"result": [{"_id": wl["_id"], "name": wl["name"], "count": self.faces_in_watchlist(w)} for w, wl in enumerate(self.watchlists)]}
+            if path == "/cases":
+                return 200, {"result": [self.case]}
+            match = re.fullmatch(r"/case/([^/]+)/cameras", path)
+            if match:
+                return (200, {"result": self.cameras}) if match.group(1) == self.case["_id"] else (404, {"error": "case not found"})
+            match = re.fullmatch(r"/camera/([^/]+)", path)
+            if match:
+                camera = next((c for c in self.cameras if c["GUID"] == match.group(1)), None)
+                return (200, camera) if camera else (404, {"error": "camera not found"})
+
+        if method == "POST":
+            match = re.fullmatch(r"/watchlistedFace/([^/]+)/(\d+)", path)
+            if match:
+                result = self.watchlist_page(match.group(1), int(match.group(2)))
+                return (200, result) if result else (404, {"error": "watchlist not found"})
+
+        return 404, {"error": f"no route for {method} {path}"}
+
+#--------------------------------------------------------------------------------------------------------------
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"       # keep-alive, so pooled clients reuse connections
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle_request(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+
+                with server.lock:
+                    server.request_count += 1
+                    fail = server.error_rate and server.random.random() < server.error_rate
+                    if fail:
+                        server.error_count += 1
+
+                if server.latency:
+                    sleep(server.latency)
+
+                if fail:
+                    status, body = server.error_status, {"error": "injected failure"}
+                elif not self.headers.get("x-api-key"):
+                    status, body = 401, {"error": "missing x-api-key"}
+                else:
+                    status, body = server.route(method, self.path.split("?")[0].removeprefix("/rest/v1"))
+
+                payload = dumps(body).encode("utf-8")
+                etag = f'"{sha1(payload).hexdigest()}"'
+                if status == 200 and method == "GET" and self.headers.get("If-None-Match") == etag:
+                    status, payload = 304, b""
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if status in (200, 304) and method == "GET":
+                    self.send_header("ETag", etag)
+                if status in (429, 503):
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self.handle_request("GET")
+
+            def do_POST(self):
+                self.handle_request("POST")
+
+        return Handler
+
+#--------------------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local ROC REST stand-in for functional and performance tests")
+    parser.add_argument("--port", type=int, default=8765, help="Listen port on 127.0.0.1 (default: 8765)")
+    parser.add_argument("--watchlists", type=int, default=3, help="Number of watchlists (default: 3)")
+    parser.add_argument("--faces", type=int, default=1000, help="Faces across all watchlists (default: 1000)")
+    parser.add_argument("--page_size", type=int, default=100, help="Faces per watchlistedFace page (default: 100)")
+    parser.add_argument("--latency_ms", type=float, default=0, help="Added latency per request (default: 0)")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of requests answered with --error_status (default: 0)")
+    parser.add_argument("--error_status", type=int, default=503, help="Status code for injected failures (default: 503)")
+    args = parser.parse_args()
+
+    insServer = ROCMockServer(
+        port=args.port,
+        watchlists=args.watchlists,
+        faces=args.faces,
+        page_size=args.page_size,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status
+    )
+    print(f"ROC mock server on {insServer.base_url} (Ctrl-C to stop)")
+    try:
+        insServer.httpd.serve_forever()
+    except KeyboardInterrupt:
+        insServer.httpd.server_close()
+
+#--------------------------------------------------------------------------------------------------------------
+"""
+python3 roc_mock_server.py --faces 100000 --page_size 500 --latency_ms 20
+python3 roc_mock_server.py --error_rate 0.05 --error_status 429
+python3 roc_rest_api.py --server rocdemo1 --base_url http://127.0.0.1:8765/rest/v1 --action sync_watchlisted_faces
+"""
+#--------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,137 @@
+# updated: 2026-10-19 12:35:50
+# created: 2026-10-19 12:31:13
+# filename: roc_response_cache.py
+#--------------------------------------------------------------------------------------------------------------
+from time import time
+from pathlib import Path
+from threading import Lock
+from json import load, dump
+#--------------------------------------------------------------------------------------------------------------
+class CachedResponse:
+    """Stands in for a requests.Response when the data comes from the cache."""
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+        self.text = ""
+
+    def json(self):
+        return self.data
+#--------------------------------------------------------------------------------------------------------------
+class ROCResponseCache:
+    """
+    Per-endpoint TTL cache for slow-changing ROC responses. A fresh entry is served without a request;
+    a stale one keeps its ETag / Last-Modified so the next request can be conditional (304 → reuse).
+    With cache_path the entries survive between CLI runs (wall-clock expiry for that reason).
+    """
+    DEFAULT_TTL_DICT = {
+        "watchlists": 300,
+        "watchlist_summary": 60,
+        "cases": 600,
+        "cameras": 600
+    }
+
+    def __init__(self, insLogger, ttl_dict=None, cache_path=None):
+        self.insLogger = insLogger
+        self.ttl_dict = {**self.DEFAULT_TTL_DICT, **(ttl_dict or {})}
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.lock = Lock()
+        self.entries = {}       # url -> {"endpoint", "data", "expires", "etag", "last_modified"}
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._load()
+
+#--------------------------------------------------------------------------------------------------------------
+    def _load(self):
+        if self.cache_path is None or not self.cache_path.exists():
+            return
+        try:
+            with self.cache_path.open("r") as f:
+                self.entries = load(f)
+            self.insLogger.log_info(msg=f"[ROCResponseCache--_load] {len(self.entries)} cached response(s) loaded from {self.cache_path}")
+        except Exception as e:
+            self.insLogger.log_warning(msg=f"[ROCResponseCache--_load] Ignoring unreadable {self.cache_path}: {e}")
+            self.entries = {}
+
+    def _save(self):
+        if self.cache_path is None:
+            return
+        try:
+            temp_path = self.cache_path.with_suffix(".tmp")
+            with temp_path.open("w") as f:
+                dump(self.entries, f)
+            temp_path.replace(self.cache_path)
+        except Exception as e:
+            self.insLogger.log_warning(msg=f"[ROCResponseCache--_save] Failed to write {self.cache_path}: {e}")
+
+#--------------------------------------------------------------------------------------------------------------
+    def get_fresh(self, url):
+        """Cached data when the entry is within its TTL, else None."""
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is not None and entry["expires"] > time():
+                self.hits += 1
+                return entry["data"]
+            return None
+
+    def get_stale(self, url):
+        """Cached data regardless of its TTL, for when the server cannot be asked."""
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None:
+                return None
+            self.hits += 1
+            return entry["data"]
+
+    def get_validators(self, url):
+        """Conditional request headers for a stale entry."""
+        with self.lock:
+            entry = self.entries.get(url) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, endpoint, url, data, etag=None, last_modified=None):
+        with self.lock:
+            self.entries[url] = {
+                "endpoint": endpoint,
+                "data": data,
+                "expires": time() + self.ttl_dict.get(endpoint, 0),
+                "etag": etag,
+                "last_modified": last_modified
+            }
+            self.misses += 1
+            self._save()
+
+    def renew(self, url):
+        """304 Not Modified: keep the data, restart its TTL."""
+        with self.lock:
+            entry = self.entries[url]
+            entry["expires"] = time() + self.ttl_dict.get(entry["endpoint"], 0)
+            self.revalidated += 1
+            self._save()
+            return entry["data"]
+
+    def invalidate(self, endpoint=None):
+        """Drops one endpoint's entries, or everything when endpoint is None."""
+        with self.lock:
+            self.entries = {
+                url: entry for url, entry in self.entries.items()
+                if endpoint is not None and entry["endpoint"] != endpoint
+            }
+            self._save()
+
+    def get_metrics(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses
+            }
+
+#--------------------------------------------------------------------------------------------------------------
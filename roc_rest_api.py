@@ -1,17 +1,26 @@
-# updated: 2025-05-15 19:05:14
+# updated: 2026-10-19 13:10:44
 # created: 2025-05-11 16:53:52
 # filename: roc_rest_api.py
 #--------------------------------------------------------------------------------------------------------------
 import re
+import os
 import csv
-from time import sleep
+from time import sleep, perf_counter
+from hashlib import sha1
 from pathlib import Path
-from requests import get, post, exceptions
+from threading import BoundedSemaphore
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests import Session, exceptions
+from requests.adapters import HTTPAdapter
 from urllib3 import disable_warnings
+from urllib3.util.retry import Retry
 from urllib3.exceptions import InsecureRequestWarning
 from roc_api_keys import ROC_Api  # Assumes roc_api_keys.py exists in the same directory or Python path
+from roc_response_cache import ROCResponseCache, CachedResponse
+from circuit_breaker import insBreakerRegistry
 from logger import CustomLogger
-from json import load, dump  # ✅ as requested
+from json import load, dump, dumps  # ✅ as requested
 from dataclasses import dataclass, asdict
 # Disable SSL warnings for self-signed certs (optional, dev-only)
 disable_warnings(InsecureRequestWarning)
@@ -28,12 +37,75 @@ class WatchlistedFaceCSV:
     customer_id: str
     media_id: str
 #--------------------------------------------------------------------------------------------------------------
+def read_cameras_json(insLogger, cameras_json_path):
+    json_path = Path(cameras_json_path)
+    if not json_path.exists():
+        insLogger.log_error(msg=f"[read_cameras_json] File not found: {cameras_json_path}")
+        return None
+    try:
+        with json_path.open("r") as f:
+            return load(f)
+    except Exception as e:
+        insLogger.log_error(msg=f"[read_cameras_json] Failed to parse {cameras_json_path}: {e}")
+        return None
+
+def write_json_atomic(insLogger, json_path, data):
+    """Writes a sibling temp file and renames it over json_path, so readers never see a partial file."""
+    json_path = Path(json_path)
+    temp_path = json_path.with_suffix(json_path.suffix + ".tmp")
+    try:
+        with temp_path.open("w") as f:
+            dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        temp_path.replace(json_path)
+        return True
+    except Exception as e:
+        insLogger.log_error(msg=f"[write_json_atomic] Failed to write {json_path}: {e}")
+        return False
+#--------------------------------------------------------------------------------------------------------------
+class ROCCircuitOpen(exceptions.RequestException):
+    """The server's breaker is open; a RequestException so every caller's existing fallback applies."""
+#--------------------------------------------------------------------------------------------------------------
 class ROCRestAPI:
-    def __init__(self, insLogger, rocServer):
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+    BREAKER_SETTINGS = {
+        "window": 20,
+        "min_calls": 5,
+        "failure_ratio": 0.5,
+        "slow_call_ms": 15000,      # a call includes its urllib3 retries
+        "open_seconds": 30,
+        "half_open_probes": 1
+    }
+
+    def __init__(
+            self,
+            insLogger,
+            rocServer,
+            pool_size=10,
+            connect_timeout=5,
+            read_timeout=30,
+            max_retries=3,
+            backoff_factor=0.5,
+            max_concurrency=4,
+            cache_ttl_dict=None,
+            cache_path=None,
+            force_refresh=False,
+            credentials_entry=None,
+            base_url=None,
+            breaker_settings=None
+        ):
         self.insLogger = insLogger
-
-        # Load API credentials using rocServer (e.g., "rocdemo1")
-        self.api = ROC_Api(insLogger=insLogger, rocServer=rocServer)
+        self.force_refresh = force_refresh     # skip fresh cache entries, still revalidate and refill
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.request_slots = BoundedSemaphore(self.max_concurrency)    # in-flight page requests across all watchlists
+        self.pool_size = max(pool_size, self.max_concurrency)
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+
+        # Load API credentials using rocServer (e.g., "rocdemo1"), or from an entry already loaded for a multi-server run
+        self.api = ROC_Api(insLogger=insLogger, rocServer=rocServer, entry=credentials_entry)
         (
             self.rocServer,
             self.serverIp,
@@ -44,25 +116,92 @@ class ROCRestAPI:
 
         # print (f"server:{self.rocServer}, ip:{self.serverIp}, key:{self.api_key}, secret:{self.api_secret}, user:{self.user_access_id}")
 
-        self.base_url = f"https://{self.serverIp}/rest/v1"
+        self.base_url = base_url or f"https://{self.serverIp}/rest/v1"     # base_url: e.g. roc_mock_server.py
         self.session = None
         self._prepare_session()
+        self.cache = ROCResponseCache(insLogger, ttl_dict=cache_ttl_dict, cache_path=cache_path)
+
+        # one breaker per ROC server, shared by every client of that server in this process
+        self.insBreaker = insBreakerRegistry.get(f"roc:{self.rocServer}", **{**self.BREAKER_SETTINGS, **(breaker_settings or {})})
 
 #--------------------------------------------------------------------------------------------------------------
     def _prepare_session(self):
-        self.session = {
-            "headers": {
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-                "x-api-key": self.api_key,
-                "x-api-secret": self.api_secret
-            },
-            "verify": False  # for self-signed certs
-        }
+        """One keep-alive session per server: pooled connections, retry with backoff on 429/5xx."""
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.RETRY_STATUS,
+            allowed_methods=frozenset(["GET", "POST"]),     # watchlistedFace POSTs are read-only queries
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+
+        self.session = Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.verify = False  # for self-signed certs
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "x-api-key": self.api_key,
+            "x-api-secret": self.api_secret
+        })
         self.insLogger.log_info(
-            msg=f"[ROCRestAPI--_prepare_session] Custom header auth session prepared for {self.rocServer} ({self.rocServer})"
+            msg=(f"[ROCRestAPI--_prepare_session] Pooled session prepared for {self.rocServer} | "
+                f"pool: {self.pool_size}, timeout: {self.timeout}, retries: {self.max_retries}")
         )
 
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+    def _request(self, method, url, **kwargs):
+        """Session request through the server's breaker: fails fast with ROCCircuitOpen while it is open; 429/5xx count as failures."""
+        if not self.insBreaker.allow():
+            raise ROCCircuitOpen(f"{self.insBreaker.name} circuit open, {method} {url} not sent")
+
+        start = perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except exceptions.RequestException:
+            self.insBreaker.record((perf_counter() - start) * 1000, failed=True)
+            raise
+        self.insBreaker.record((perf_counter() - start) * 1000, failed=response.status_code in self.RETRY_STATUS)
+        return response
+
+    def _cached_get(self, endpoint, url):
+        """GET through the response cache: fresh entries skip the request, stale ones are revalidated."""
+        if not self.force_refresh:
+            data = self.cache.get_fresh(url)
+            if data is not None:
+                self.insLogger.log_debug(msg=f"[ROCRestAPI--_cached_get] Cache hit: {url}")
+                return CachedResponse(data)
+
+        try:
+            response = self._request("GET", url, headers=self.cache.get_validators(url))
+        except exceptions.RequestException as e:
+            # server unreachable or breaker open: an expired entry beats no answer
+            data = self.cache.get_stale(url)
+            if data is None:
+                raise
+            self.insLogger.log_warning(msg=f"[ROCRestAPI--_cached_get] {e}; serving stale cache for {url}")
+            return CachedResponse(data)
+
+        if response.status_code == 304:
+            self.insLogger.log_debug(msg=f"[ROCRestAPI--_cached_get] Not modified: {url}")
+            return CachedResponse(self.cache.renew(url))
+
+        if response.status_code == 200:
+            self.cache.store(
+                endpoint,
+                url,
+                response.json(),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            )
+        return response
+
 #--------------------------------------------------------------------------------------------------------------
     def get_camera_info(self, camera_uuid):
         """Call: GET /camera/{uuid}"""
@@ -70,11 +209,7 @@ class ROCRestAPI:
         self.insLogger.log_info(msg=f"[ROCRestAPI--get_camera_info] Calling: {url}")
 
         try:
-            response = get(
-                url,
-                headers=self.session["headers"],
-                verify=self.session["verify"]
-            )
+            response = self._request("GET", url)
 
 
             if response.status_code == 200:
@@ -101,11 +236,7 @@ class ROCRestAPI:
         self.insLogger.log_info(msg=f"[ROCRestAPI--get_cases] Calling: {url}")
 
         try:
-            response = get(
-                url,
-                headers=self.session["headers"],
-                verify=self.session["verify"]
-            )
+            response = self._cached_get("cases", url)
 
             if response.status_code == 200:
                 data = response.json()
@@ -147,11 +278,7 @@ class ROCRestAPI:
         self.insLogger.log_info(msg=f"[ROCRestAPI--get_cameras_by_case_id] Calling: {url}")
 
         try:
-            response = get(
-                url,
-                headers=self.session["headers"],
-                verify=self.session["verify"]
-            )
+            response = self._cached_get("cameras", url)
 
             if response.status_code == 200:
                 data = response.json()
@@ -182,36 +309,17 @@ class ROCRestAPI:
             return None
 
 #--------------------------------------------------------------------------------------------------------------
-    def update_camera_ids_from_api(self, case_name, cameras_json_path="config/cameras.json"):
-        """
-        Match and update cameraId fields in cameras.json using GUIDs from API response.
-        Only updates entries matching both camera IP and rocServer.
-        """
-        self.insLogger.log_info(msg=f"[ROCRestAPI--update_camera_ids_from_api] Starting update for case: {case_name}")
-
+    def get_camera_guid_map(self, case_name):
+        """Camera IP → GUID for the cameras of a case, or None when the case or its cameras are missing."""
         case_id = self.get_cases(filter_name=case_name)
         if not case_id:
-            self.insLogger.log_error(msg=f"[ROCRestAPI--update_camera_ids_from_api] Case '{case_name}' not found")
-            return False
+            self.insLogger.log_error(msg=f"[ROCRestAPI--get_camera_guid_map] Case '{case_name}' not found")
+            return None
 
         camera_list = self.get_cameras_by_case_id(case_id, extract_only=True)
         if not camera_list:
-            self.insLogger.log_error(msg="[ROCRestAPI--update_camera_ids_from_api] No cameras found for case")
-            return False
-
-        json_path = Path(cameras_json_path)
-        if not json_path.exists():
-            self.insLogger.log_error(msg=f"[ROCRestAPI--update_camera_ids_from_api] File not found: {cameras_json_path}")
-            return False
-
-        try:
-            with json_path.open("r") as f:
-                local_cameras = load(f)
-        except Exception as e:
-            self.insLogger.log_error(msg=f"[ROCRestAPI--update_camera_ids_from_api] Failed to parse cameras.json: {e}")
-            return False
-
-        updated = False
+            self.insLogger.log_error(msg="[ROCRestAPI--get_camera_guid_map] No cameras found for case")
+            return None
 
         def extract_ip(rtsp_url):
             match = re.search(r"rtsp://([\d.]+)", rtsp_url)
@@ -224,7 +332,12 @@ class ROCRestAPI:
             if ip and guid:
                 ip_to_guid[ip] = guid
 
-        self.insLogger.log_info(msg=f"[ROCRestAPI--update_camera_ids_from_api] IP → GUID map: {ip_to_guid}")
+        self.insLogger.log_info(msg=f"[ROCRestAPI--get_camera_guid_map] IP → GUID map: {ip_to_guid}")
+        return ip_to_guid
+
+    def apply_camera_ids(self, local_cameras, ip_to_guid):
+        """Updates cameraId in place for this server's entries; returns True when anything changed."""
+        updated = False
 
         for entry in local_cameras:
             camera_ip = entry.get("cameraIp")
@@ -234,60 +347,63 @@ class ROCRestAPI:
 
             self.insLogger.log_info(
                 msg=(
-                    f"[ROCRestAPI--update_camera_ids_from_api] ENTRY: cameraIp={camera_ip} | "
+                    f"[ROCRestAPI--apply_camera_ids] ENTRY: cameraIp={camera_ip} | "
                     f"rocServer={roc_server} | file.cameraId={existing_guid} | api.GUID={new_guid}"
                 )
             )
 
             if not camera_ip or not roc_server:
                 self.insLogger.log_warning(
-                    msg="[ROCRestAPI--update_camera_ids_from_api] Skipping entry with missing cameraIp or rocServer"
+                    msg="[ROCRestAPI--apply_camera_ids] Skipping entry with missing cameraIp or rocServer"
                 )
                 continue
 
             if roc_server != self.rocServer:
                 self.insLogger.log_info(
-                    msg=f"[ROCRestAPI--update_camera_ids_from_api] Skipping entry: rocServer mismatch ({roc_server} != {self.rocServer})"
+                    msg=f"[ROCRestAPI--apply_camera_ids] Skipping entry: rocServer mismatch ({roc_server} != {self.rocServer})"
                 )
                 continue
 
             if new_guid is None:
                 self.insLogger.log_warning(
-                    msg=f"[ROCRestAPI--update_camera_ids_from_api] No matching API GUID found for cameraIp {camera_ip} (entry will not be updated)"
+                    msg=f"[ROCRestAPI--apply_camera_ids] No matching API GUID found for cameraIp {camera_ip} (entry will not be updated)"
                 )
                 continue
 
             if existing_guid != new_guid:
                 self.insLogger.log_info(
-                    msg=f"[ROCRestAPI--update_camera_ids_from_api] → Updating cameraId for cameraIp {camera_ip}: {existing_guid} → {new_guid}"
+                    msg=f"[ROCRestAPI--apply_camera_ids] → Updating cameraId for cameraIp {camera_ip}: {existing_guid} → {new_guid}"
                 )
                 entry["cameraId"] = new_guid
                 updated = True
             else:
                 self.insLogger.log_info(
-                    msg=f"[ROCRestAPI--update_camera_ids_from_api] → cameraId already correct for {camera_ip}"
+                    msg=f"[ROCRestAPI--apply_camera_ids] → cameraId already correct for {camera_ip}"
                 )
 
+        return updated
 
-            if existing_guid != new_guid:
-                self.insLogger.log_info(
-                    msg=f"[ROCRestAPI--update_camera_ids_from_api] → Updating cameraId for cameraIp {camera_ip}: {existing_guid} → {new_guid}"
-                )
-                entry["cameraId"] = new_guid
-                updated = True
-            else:
-                self.insLogger.log_info(
-                    msg=f"[ROCRestAPI--update_camera_ids_from_api] → cameraId already correct for {camera_ip}"
-                )
+    def update_camera_ids_from_api(self, case_name, cameras_json_path="config/cameras.json"):
+        """
+        Match and update cameraId fields in cameras.json using GUIDs from API response.
+        Only updates entries matching both camera IP and rocServer.
+        """
+        self.insLogger.log_info(msg=f"[ROCRestAPI--update_camera_ids_from_api] Starting update for case: {case_name}")
+
+        ip_to_guid = self.get_camera_guid_map(case_name)
+        if not ip_to_guid:
+            return False
+
+        local_cameras = read_cameras_json(self.insLogger, cameras_json_path)
+        if local_cameras is None:
+            return False
+
+        updated = self.apply_camera_ids(local_cameras, ip_to_guid)
 
         if updated:
-            try:
-                with json_path.open("w") as f:
-                    dump(local_cameras, f, indent=4)
-                self.insLogger.log_info(msg="[ROCRestAPI--update_camera_ids_from_api] cameras.json updated successfully")
-            except Exception as e:
-                self.insLogger.log_error(msg=f"[ROCRestAPI--update_camera_ids_from_api] Failed to write cameras.json: {e}")
+            if not write_json_atomic(self.insLogger, cameras_json_path, local_cameras):
                 return False
+            self.insLogger.log_info(msg="[ROCRestAPI--update_camera_ids_from_api] cameras.json updated successfully")
         else:
             self.insLogger.log_info(msg="[ROCRestAPI--update_camera_ids_from_api] No updates required")
 
@@ -300,11 +416,7 @@ class ROCRestAPI:
         self.insLogger.log_info(msg=f"[ROCRestAPI--get_watchlists] Calling: {url}")
 
         try:
-            response = get(
-                url,
-                headers=self.session["headers"],
-                verify=self.session["verify"]
-            )
+            response = self._cached_get("watchlists", url)
 
             if response.status_code == 200:
                 self.insLogger.log_info(
@@ -338,40 +450,8 @@ class ROCRestAPI:
             return {}
 
 #--------------------------------------------------------------------------------------------------------------
-    def sync_watchlists_to_cameras(self, cameras_json_path="config/cameras.json"):
-        """
-        Sync watchlists from API into cameras.json.
-        - Only updates entries where camera['rocServer'] == self.rocServer
-        - Adds new watchlistIds that are missing
-        - Removes any watchlistIds not found in current API result
-        """
-        self.insLogger.log_info(
-            msg=f"[ROCRestAPI--sync_watchlists_to_cameras] Starting sync for server: {self.rocServer}"
-        )
-
-        watchlist_map = self.get_watchlists()
-        if not watchlist_map:
-            self.insLogger.log_warning(
-                msg="[ROCRestAPI--sync_watchlists_to_cameras] No enabled watchlists found from API"
-            )
-            return False
-
-        json_path = Path(cameras_json_path)
-        if not json_path.exists():
-            self.insLogger.log_error(
-                msg=f"[ROCRestAPI--sync_watchlists_to_cameras] File not found: {cameras_json_path}"
-            )
-            return False
-
-        try:
-            with json_path.open("r") as f:
-                local_cameras = load(f)
-        except Exception as e:
-            self.insLogger.log_error(
-                msg=f"[ROCRestAPI--sync_watchlists_to_cameras] Failed to read JSON: {e}"
-            )
-            return False
-
+    def apply_watchlists_to_cameras(self, local_cameras, watchlist_map):
+        """Replaces watchlistIds in place for this server's cameras; returns True when anything changed."""
         updated = False
 
         for camera in local_cameras:
@@ -391,7 +471,7 @@ class ROCRestAPI:
                     action = "Adding" if existing_id is None else "Updating"
                     self.insLogger.log_info(
                         msg=(
-                            f"[ROCRestAPI--sync_watchlists_to_cameras] {action} watchlist '{name}' "
+                            f"[ROCRestAPI--apply_watchlists_to_cameras] {action} watchlist '{name}' "
                             f"on camera {camera.get('cameraIp')} | old={existing_id} → new={wid}"
                         )
                     )
@@ -402,25 +482,45 @@ class ROCRestAPI:
             removed_keys = [k for k in current_ids if k not in watchlist_map]
             for k in removed_keys:
                 self.insLogger.log_info(
-                    msg=f"[ROCRestAPI--sync_watchlists_to_cameras] Removing outdated watchlist '{k}' from camera {camera.get('cameraIp')}"
+                    msg=f"[ROCRestAPI--apply_watchlists_to_cameras] Removing outdated watchlist '{k}' from camera {camera.get('cameraIp')}"
                 )
                 updated = True
 
             camera["watchlistIds"] = new_ids
 
+        return updated
+
+    def sync_watchlists_to_cameras(self, cameras_json_path="config/cameras.json"):
+        """
+        Sync watchlists from API into cameras.json.
+        - Only updates entries where camera['rocServer'] == self.rocServer
+        - Adds new watchlistIds that are missing
+        - Removes any watchlistIds not found in current API result
+        """
+        self.insLogger.log_info(
+            msg=f"[ROCRestAPI--sync_watchlists_to_cameras] Starting sync for server: {self.rocServer}"
+        )
+
+        watchlist_map = self.get_watchlists()
+        if not watchlist_map:
+            self.insLogger.log_warning(
+                msg="[ROCRestAPI--sync_watchlists_to_cameras] No enabled watchlists found from API"
+            )
+            return False
+
+        local_cameras = read_cameras_json(self.insLogger, cameras_json_path)
+        if local_cameras is None:
+            return False
+
+        updated = self.apply_watchlists_to_cameras(local_cameras, watchlist_map)
+
         # Write back if any changes made
         if updated:
-            try:
-                with json_path.open("w") as f:
-                    dump(local_cameras, f, indent=4)
-                self.insLogger.log_info(
-                    msg="[ROCRestAPI--sync_watchlists_to_cameras] cameras.json updated successfully"
-                )
-            except Exception as e:
-                self.insLogger.log_error(
-                    msg=f"[ROCRestAPI--sync_watchlists_to_cameras] Failed to write cameras.json: {e}"
-                )
+            if not write_json_atomic(self.insLogger, cameras_json_path, local_cameras):
                 return False
+            self.insLogger.log_info(
+                msg="[ROCRestAPI--sync_watchlists_to_cameras] cameras.json updated successfully"
+            )
         else:
             self.insLogger.log_info(
                 msg="[ROCRestAPI--sync_watchlists_to_cameras] No changes were necessary"
@@ -435,11 +535,7 @@ class ROCRestAPI:
         self.insLogger.log_info(msg=f"[ROCRestAPI--get_watchlist_summary] Calling: {url}")
 
         try:
-            response = get(
-                url,
-                headers=self.session["headers"],
-                verify=self.session["verify"]
-            )
+            response = self._cached_get("watchlist_summary", url)
 
             if response.status_code == 200:
                 self.insLogger.log_info(
@@ -466,11 +562,8 @@ class ROCRestAPI:
         )
 
         try:
-            response = post(
-                url,
-                headers=self.session["headers"],
-                verify=self.session["verify"]
-            )
+            with self.request_slots:
+                response = self._request("POST", url, json={})
             if response.status_code == 200:
                 data = response.json()
                 self.insLogger.log_info(
@@ -499,152 +592,421 @@ class ROCRestAPI:
             return [] if extract_only else None
 
 #---------------------------------------------------------------------------------------------------------------
-    def sync_all_watchlisted_faces(self, delay_between_pages=0.001):
+    def iter_watchlist_pages(self, watchlist_id, name, start_page=1, delay_between_pages=0.001):
+        """
+        Yields (page, total_pages, elements) in page order. start_page gives totalPages; later pages are
+        fetched concurrently in a window of max_concurrency, so at most that many pages are held at once.
+        elements is None for a page that could not be fetched.
+        """
+        first = self.get_watchlisted_faces_by_watchlist_id(watchlist_id, page=start_page, extract_only=False)
+        if not first:
+            yield start_page, None, None
+            return
+
+        total_pages = int(first.get("totalPages", 1))
+        yield start_page, total_pages, first.get("elements", [])
+
+        def fetch_page(page):
+            sleep(delay_between_pages)
+            return self.get_watchlisted_faces_by_watchlist_id(watchlist_id, page=page, extract_only=False)
+
+        remaining = iter(range(start_page + 1, total_pages + 1))
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            window = deque(
+                (page, executor.submit(fetch_page, page))
+                for _, page in zip(range(self.max_concurrency), remaining)
+            )
+            while window:
+                page, future = window.popleft()
+                result = future.result()
+
+                next_page = next(remaining, None)
+                if next_page is not None:
+                    window.append((next_page, executor.submit(fetch_page, next_page)))
+
+                yield page, total_pages, result.get("elements", []) if result else None
+
+    def fetch_watchlist_pages(self, watchlist_id, name, delay_between_pages=0.001, strict=True):
+        """
+        All faces of a watchlist in page order, or None when a page failed. Only with strict=False is a
+        failed page logged and skipped, which returns a partial list.
+        """
+        faces = []
+        for page, total_pages, elements in self.iter_watchlist_pages(watchlist_id, name, delay_between_pages=delay_between_pages):
+            if elements is None:
+                self.insLogger.log_warning(
+                    msg=f"[ROCRestAPI--fetch_watchlist_pages] Watchlist '{name}' page {page}/{total_pages or '?'} missing from result"
+                )
+                if strict:
+                    return None
+                continue
+            faces.extend(elements)
+        return faces
+
+    def map_watchlists(self, fn, watchlists):
+        """Runs fn(name, watchlist_id) for every watchlist in parallel; returns {name: result} in watchlist order."""
+        if not watchlists:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(watchlists))) as executor:
+            futures = {name: executor.submit(fn, name, watchlist_id) for name, watchlist_id in watchlists.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+#---------------------------------------------------------------------------------------------------------------
+    def sync_all_watchlisted_faces(self, delay_between_pages=0.001, strict=True):
         """
         Fetch all watchlisted faces for all enabled watchlists.
+        A watchlist with a failed page maps to None; strict=False returns its partial list instead.
         """
         self.insLogger.log_info(msg="[ROCRestAPI--sync_all_watchlisted_faces] Starting full sync...")
 
-        all_faces = {}
         watchlists = self.get_watchlists()  # returns dict {name: _id}
 
-        for name, watchlist_id in watchlists.items():
+        def sync_watchlist(name, watchlist_id):
             self.insLogger.log_info(
                 msg=f"[ROCRestAPI--sync_all_watchlisted_faces] Syncing faces for watchlist '{name}' (ID={watchlist_id})"
             )
+            faces = self.fetch_watchlist_pages(watchlist_id, name, delay_between_pages, strict)
+            self.insLogger.log_info(
+                msg=f"[ROCRestAPI--sync_all_watchlisted_faces] Completed: '{name}' → {len(faces) if faces is not None else 'incomplete'} face(s)"
+            )
+            return faces
 
-            page = 1
-            total_pages = 1
-            faces = []
+        all_faces = self.map_watchlists(sync_watchlist, watchlists)
 
-            while page <= total_pages:
-                url = f"{self.base_url}/watchlistedFace/{watchlist_id}/{page}"
-                self.insLogger.log_info(
-                    msg=f"[ROCRestAPI--sync_all_watchlisted_faces] POSTing: {url}"
-                )
+        self.insLogger.log_info(msg="[ROCRestAPI--sync_all_watchlisted_faces] Sync complete for all watchlists.")
+        return all_faces
 
-                try:
-                    response = post(
-                        url,
-                        headers={
-                            "Accept": "application/json",
-                            "Content-Type": "application/json",
-                            "x-api-key": self.api_key,
-                            "x-api-secret": self.api_secret
-                        },
-                        json={},
-                        verify=self.session["verify"]
-                    )
+#---------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def extract_id_value(id_numbers, target_type):
+        for item in id_numbers:
+            if item.get("type") == target_type:
+                return item.get("value")
+        return None
+
+    def iter_watchlisted_face_rows(self, elements):
+        """Filters one page of watchlisted faces and maps them to CSV rows."""
+        for entry in elements:
+            if not entry.get("enabled", False):
+                continue
+            if entry.get("firstname") == "0001" or entry.get("lastname") == "001":
+                continue
 
-                    if response.status_code != 200:
-                        self.insLogger.log_warning(
-                            msg=f"[ROCRestAPI--sync_all_watchlisted_faces] Failed (page {page}): {response.status_code} | {response.text}"
-                        )
-                        break
+            yield self.to_csv_row(entry)
 
-                    result = response.json()
-                    if page == 1:
-                        total_pages = int(result.get("totalPages", 1))
+    def to_csv_row(self, entry):
+        id_numbers = entry.get("idNumbers", [])
 
-                    elements = result.get("elements", [])
-                    self.insLogger.log_info(
-                        msg=f"[ROCRestAPI--sync_all_watchlisted_faces] Page {page}/{total_pages} → {len(elements)} face(s)"
-                    )
-                    faces.extend(elements)
-                    page += 1
-                    if page <= total_pages:
-                        sleep(delay_between_pages)
-
-                except exceptions.RequestException as e:
-                    self.insLogger.log_error(
-                        msg=f"[ROCRestAPI--sync_all_watchlisted_faces ERROR] Watchlist {watchlist_id} page {page} failed: {e}"
-                    )
-                    break
+        return asdict(WatchlistedFaceCSV(
+            firstname=entry.get("firstname"),
+            lastname=entry.get("lastname"),
+            internal_id=entry.get("internalId"),
+            employee_id=self.extract_id_value(id_numbers, "Employee ID"),
+            badge_id=self.extract_id_value(id_numbers, "Badge ID"),
+            pin_number=self.extract_id_value(id_numbers, "PIN Number"),
+            access_zones=self.extract_id_value(id_numbers, "Access Zones"),
+            customer_id=entry.get("identityData", {}).get("customerId"),
+            media_id=entry.get("mediaId")
+        ))
 
+#---------------------------------------------------------------------------------------------------------------
+    def load_export_checkpoint(self, checkpoint_file, watchlist_id, output_file):
+        if not checkpoint_file.exists() or not output_file.exists():
+            return None
+        try:
+            with checkpoint_file.open("r") as f:
+                checkpoint = load(f)
+        except Exception as e:
+            self.insLogger.log_warning(msg=f"[ROCRestAPI--load_export_checkpoint] Ignoring unreadable {checkpoint_file}: {e}")
+            return None
+        if checkpoint.get("watchlist_id") != watchlist_id:
+            return None
+        return checkpoint
+
+    def save_export_checkpoint(self, checkpoint_file, checkpoint):
+        temp_file = checkpoint_file.with_suffix(".tmp")
+        with temp_file.open("w") as f:
+            dump(checkpoint, f)
+        temp_file.replace(checkpoint_file)
+
+    def export_watchlist_to_csv(self, name, watchlist_id, export_dir, delay_between_pages=0.001, resume=True):
+        """
+        Streams one watchlist to CSV: each page is filtered, mapped and written as soon as it arrives.
+        After every page the checkpoint records the last completed page and the CSV size, so an
+        interrupted export truncates any partial page and continues from the next one.
+        """
+        filename_safe = re.sub(r"[^\w\-]", "_", name.lower())
+        output_file = export_dir / f"watchlist_export_{filename_safe}.csv"
+        checkpoint_file = export_dir / f"watchlist_export_{filename_safe}.checkpoint"
+
+        checkpoint = self.load_export_checkpoint(checkpoint_file, watchlist_id, output_file) if resume else None
+        if checkpoint:
+            os.truncate(output_file, checkpoint["offset"])
+            start_page = checkpoint["last_page"] + 1
             self.insLogger.log_info(
-                msg=f"[ROCRestAPI--sync_all_watchlisted_faces] Completed: '{name}' → {len(faces)} face(s)"
+                msg=f"[ROCRestAPI--export_watchlist_to_csv] Resuming '{name}' at page {start_page} ({checkpoint['rows']} row(s) already exported)"
             )
-            all_faces[name] = faces
+        else:
+            checkpoint = {"watchlist_id": watchlist_id, "last_page": 0, "rows": 0, "offset": 0}
+            start_page = 1
 
-        self.insLogger.log_info(msg="[ROCRestAPI--sync_all_watchlisted_faces] Sync complete for all watchlists.")
-        return all_faces
+        fieldnames = WatchlistedFaceCSV.__annotations__.keys()
+        with output_file.open("a" if start_page > 1 else "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            if start_page == 1:
+                writer.writeheader()
 
-#---------------------------------------------------------------------------------------------------------------
-    def export_all_watchlisted_faces_to_csv(self, delay_between_pages=0.001):
-        self.insLogger.log_info(msg="[ROCRestAPI--export_all_watchlisted_faces_to_csv] Starting export...")
+            for page, total_pages, elements in self.iter_watchlist_pages(watchlist_id, name, start_page, delay_between_pages):
+                if elements is None:
+                    self.insLogger.log_warning(
+                        msg=f"[ROCRestAPI--export_watchlist_to_csv] '{name}' stopped at page {page}; run the export again to resume"
+                    )
+                    return checkpoint["rows"]
 
-        # Define the helper here
-        def extract_id_value(id_numbers, target_type):
-            for item in id_numbers:
-                if item.get("type") == target_type:
-                    return item.get("value")
-            return None
+                rows_before = checkpoint["rows"]
+                for row in self.iter_watchlisted_face_rows(elements):
+                    writer.writerow(row)
+                    checkpoint["rows"] += 1
+                csvfile.flush()
+
+                checkpoint.update(last_page=page, total_pages=total_pages, offset=csvfile.tell())
+                self.save_export_checkpoint(checkpoint_file, checkpoint)
+                self.insLogger.log_info(
+                    msg=f"[ROCRestAPI--export_watchlist_to_csv] '{name}' page {page}/{total_pages} → {checkpoint['rows'] - rows_before} row(s)"
+                )
+
+        checkpoint_file.unlink(missing_ok=True)
+        if checkpoint["rows"]:
+            self.insLogger.log_info(
+                msg=f"[ROCRestAPI--export_watchlist_to_csv] Exported {checkpoint['rows']} faces to {output_file}"
+            )
+        else:
+            output_file.unlink(missing_ok=True)
+            self.insLogger.log_info(
+                msg=f"[ROCRestAPI--export_watchlist_to_csv] No valid faces found for watchlist '{name}'"
+            )
+        return checkpoint["rows"]
+
+    def export_all_watchlisted_faces_to_csv(self, delay_between_pages=0.001, resume=True):
+        self.insLogger.log_info(msg="[ROCRestAPI--export_all_watchlisted_faces_to_csv] Starting export...")
 
         watchlists = self.get_watchlists()  # {name: _id}
         export_dir = Path("exports")
         export_dir.mkdir(exist_ok=True)
 
-        for name, watchlist_id in watchlists.items():
-            faces = []
-            page = 1
-            total_pages = 1
+        self.map_watchlists(
+            lambda name, watchlist_id: self.export_watchlist_to_csv(name, watchlist_id, export_dir, delay_between_pages, resume),
+            watchlists
+        )
 
-            while page <= total_pages:
-                self.insLogger.log_info(
-                    msg=f"[ROCRestAPI--export_all_watchlisted_faces_to_csv] Fetching page {page} of watchlist '{name}'"
-                )
-                result_full = self.get_watchlisted_faces_by_watchlist_id(
-                    watchlist_id, page=page, extract_only=False
-                )
-                if not result_full:
-                    break
-
-                if page == 1:
-                    total_pages = int(result_full.get("totalPages", 1))
-
-                for entry in result_full.get("elements", []):
-                    if not entry.get("enabled", False):
-                        continue
-                    if entry.get("firstname") == "0001" or entry.get("lastname") == "001":
-                        continue
-
-                    id_numbers = entry.get("idNumbers", [])  # ✅ Define this first
-
-                    row = WatchlistedFaceCSV(
-                        firstname=entry.get("firstname"),
-                        lastname=entry.get("lastname"),
-                        internal_id=entry.get("internalId"),
-                        employee_id=extract_id_value(id_numbers, "Employee ID"),
-                        badge_id=extract_id_value(id_numbers, "Badge ID"),
-                        pin_number=extract_id_value(id_numbers, "PIN Number"),
-                        access_zones=extract_id_value(id_numbers, "Access Zones"),
-                        customer_id=entry.get("identityData", {}).get("customerId"),
-                        media_id=entry.get("mediaId")
-                    )
-                    faces.append(row)
-
-                page += 1
-                if page <= total_pages:
-                    sleep(delay_between_pages)
-
-            if faces:
-                filename_safe = re.sub(r"[^\w\-]", "_", name.lower())
-                output_file = export_dir / f"watchlist_export_{filename_safe}.csv"
-                with output_file.open("w", newline="") as csvfile:
-                    writer = csv.DictWriter(csvfile, fieldnames=WatchlistedFaceCSV.__annotations__.keys())
-                    writer.writeheader()
-                    for row in faces:
-                        writer.writerow(asdict(row))
-                self.insLogger.log_info(
-                    msg=f"[ROCRestAPI--export_all_watchlisted_faces_to_csv] Exported {len(faces)} faces to {output_file}"
-                )
+        self.insLogger.log_info(msg="[ROCRestAPI--export_all_watchlisted_faces_to_csv] Export complete.")
+
+#---------------------------------------------------------------------------------------------------------------
+    # every field transform_document / to_csv_row read (faceId comes from internalId, customerId from identityData)
+    HASHED_FIELDS = ("firstname", "lastname", "idNumbers", "enabled", "mediaId", "internalId", "identityData.customerId")
+
+    @classmethod
+    def face_hash(cls, face):
+        """Content hash over the fields consumers use (dotted names reach into sub-documents); anything else changing is not a delta."""
+        content = {}
+        for field in cls.HASHED_FIELDS:
+            value = face
+            for part in field.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            content[field] = value
+        return sha1(dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def get_manifest_path(self, consumer="csv"):
+        # one manifest per consumer: each one's delta is relative to what it last applied
+        return Path(f"config/watchlist_manifest_{self.rocServer}_{consumer}.json")
+
+    def load_manifest(self, consumer="csv"):
+        manifest_path = self.get_manifest_path(consumer)
+        if not manifest_path.exists():
+            return {}
+        try:
+            with manifest_path.open("r") as f:
+                return load(f).get("faces", {})
+        except Exception as e:
+            self.insLogger.log_warning(msg=f"[ROCRestAPI--load_manifest] Ignoring unreadable {manifest_path}, full sync follows: {e}")
+            return {}
+
+    def save_manifest(self, manifest, consumer="csv"):
+        """Call after the consumer applied the delta, so a failed apply is retried on the next run."""
+        manifest_path = self.get_manifest_path(consumer)
+        temp_path = manifest_path.with_suffix(".tmp")
+        with temp_path.open("w") as f:
+            dump({"rocServer": self.rocServer, "consumer": consumer, "faces": manifest}, f)
+        temp_path.replace(manifest_path)
+        self.insLogger.log_info(msg=f"[ROCRestAPI--save_manifest] {len(manifest)} face hash(es) saved to {manifest_path}")
+
+    def compute_watchlist_delta(self, delay_between_pages=0.001, consumer="csv"):
+        """
+        Compares every face of the enabled watchlists against consumer's manifest of face _id → content hash
+        ("csv": sync_watchlist_delta, "users": mongo_user_sync.py --option delta).
+        Returns (delta, manifest): delta holds added/updated faces by _id and deleted _ids; pass the
+        manifest to save_manifest with the same consumer once the delta has been applied. A face listed
+        in several watchlists counts once, so moving it between watchlists is not a delete.
+        """
+        old_manifest = self.load_manifest(consumer)
+        all_faces = self.sync_all_watchlisted_faces(delay_between_pages)
+
+        manifest = {}
+        delta = {"added": {}, "updated": {}, "deleted": [], "unchanged": 0}
+        for faces in all_faces.values():
+            for face in faces or []:
+                face_id = str(face.get("_id"))
+                if face_id in manifest:
+                    continue
+                manifest[face_id] = self.face_hash(face)
+
+                old_hash = old_manifest.get(face_id)
+                if old_hash is None:
+                    delta["added"][face_id] = face
+                elif old_hash != manifest[face_id]:
+                    delta["updated"][face_id] = face
+                else:
+                    delta["unchanged"] += 1
+
+        if not all_faces or any(faces is None for faces in all_faces.values()):
+            # an incomplete pull must not turn missing faces into deletes; keep their hashes for the next run
+            for face_id, old_hash in old_manifest.items():
+                manifest.setdefault(face_id, old_hash)
+            self.insLogger.log_warning(msg="[ROCRestAPI--compute_watchlist_delta] Incomplete watchlist pull, deletes skipped")
+        else:
+            delta["deleted"] = [face_id for face_id in old_manifest if face_id not in manifest]
+
+        self.insLogger.log_info(
+            msg=(f"[ROCRestAPI--compute_watchlist_delta] added: {len(delta['added'])}, updated: {len(delta['updated'])}, "
+                f"deleted: {len(delta['deleted'])}, unchanged: {delta['unchanged']}")
+        )
+        return delta, manifest
+
+    def export_watchlist_delta_to_csv(self, delta, export_dir=Path("exports")):
+        """Writes only the delta: one row per added/updated face, deleted faces carry just their _id."""
+        export_dir.mkdir(exist_ok=True)
+        output_file = export_dir / f"watchlist_delta_{self.rocServer}.csv"
+        fieldnames = ["action", "face_id", *WatchlistedFaceCSV.__annotations__.keys()]
+
+        with output_file.open("w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            for action in ("added", "updated"):
+                for face_id, face in delta[action].items():
+                    writer.writerow({"action": action, "face_id": face_id, **self.to_csv_row(face)})
+            for face_id in delta["deleted"]:
+                writer.writerow({"action": "deleted", "face_id": face_id})
+
+        self.insLogger.log_info(msg=f"[ROCRestAPI--export_watchlist_delta_to_csv] Delta written to {output_file}")
+        return output_file
+
+#---------------------------------------------------------------------------------------------------------------
+    def benchmark_sync(self, repeat=3):
+        """
+        Times sync_all_watchlisted_faces with a new connection per request (Connection: close, as the
+        old module-level requests.get/post did) and then over the keep-alive pool.
+        """
+        results = {}
+        for mode in ("new_connection", "keep_alive"):
+            if mode == "new_connection":
+                self.session.headers["Connection"] = "close"
             else:
-                self.insLogger.log_info(
-                    msg=f"[ROCRestAPI--export_all_watchlisted_faces_to_csv] No valid faces found for watchlist '{name}'"
-                )
+                self.session.headers.pop("Connection", None)
 
-        self.insLogger.log_info(msg="[ROCRestAPI--export_all_watchlisted_faces_to_csv] Export complete.")
+            timings = []
+            faces = 0
+            for _ in range(repeat):
+                start = perf_counter()
+                all_faces = self.sync_all_watchlisted_faces()
+                timings.append(perf_counter() - start)
+                faces = sum(len(f or []) for f in all_faces.values())
+
+            results[mode] = {
+                "faces": faces,
+                "min_s": round(min(timings), 3),
+                "avg_s": round(sum(timings) / len(timings), 3)
+            }
+            self.insLogger.log_info(msg=f"[ROCRestAPI--benchmark_sync] {mode}: {results[mode]}")
+
+        return results
+
+
+#---------------------------------------------------------------------------------------------------------------
+class ROCMultiServerSync:
+    """
+    Syncs watchlists (and camera GUIDs for case_name) from every enabled roc_api_settings entry at once.
+    Credentials and cameras.json are read once; servers are queried concurrently and their results
+    merged into the one in-memory cameras list, written back with a single atomic replace.
+    """
+    def __init__(self, insLogger, cameras_json_path="config/cameras.json", case_name=None, client_kwargs=None):
+        self.insLogger = insLogger
+        self.cameras_json_path = cameras_json_path
+        self.case_name = case_name
+        self.client_kwargs = client_kwargs or {}
+
+    def fetch_server(self, entry):
+        start = perf_counter()
+        insClient = ROCRestAPI(
+            insLogger=self.insLogger,
+            rocServer=entry.get("rocServer"),
+            credentials_entry=entry,
+            **self.client_kwargs
+        )
+        try:
+            watchlist_map = insClient.get_watchlists()
+            ip_to_guid = insClient.get_camera_guid_map(self.case_name) if self.case_name else None
+        finally:
+            insClient.close()
+        return insClient, watchlist_map, ip_to_guid, perf_counter() - start
+
+    def run(self):
+        entries = ROC_Api.load_enabled_entries(self.insLogger)
+        if not entries:
+            self.insLogger.log_warning(msg="[ROCMultiServerSync--run] No enabled roc_api_settings entries")
+            return {}
+
+        local_cameras = read_cameras_json(self.insLogger, self.cameras_json_path)
+        if local_cameras is None:
+            return {}
 
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=len(entries)) as executor:
+            futures = {entry.get("rocServer"): executor.submit(self.fetch_server, entry) for entry in entries}
+
+        results = {}
+        updated = False
+        for roc_server, future in futures.items():
+            try:
+                insClient, watchlist_map, ip_to_guid, elapsed = future.result()
+            except Exception as e:
+                self.insLogger.log_error(msg=f"[ROCMultiServerSync--run ERROR] {roc_server}: {e}")
+                results[roc_server] = {"ok": False, "error": str(e)}
+                continue
+
+            # each client only touches cameras whose rocServer is its own, so merging in sequence is safe
+            changed = False
+            if watchlist_map:
+                changed |= insClient.apply_watchlists_to_cameras(local_cameras, watchlist_map)
+            if ip_to_guid:
+                changed |= insClient.apply_camera_ids(local_cameras, ip_to_guid)
+            updated |= changed
+
+            results[roc_server] = {
+                "ok": bool(watchlist_map),
+                "watchlists": len(watchlist_map),
+                "cameras": len(ip_to_guid) if ip_to_guid is not None else None,
+                "changed": changed,
+                "seconds": round(elapsed, 3)
+            }
+            self.insLogger.log_info(msg=f"[ROCMultiServerSync--run] {roc_server}: {results[roc_server]}")
+
+        if updated and write_json_atomic(self.insLogger, self.cameras_json_path, local_cameras):
+            self.insLogger.log_info(msg=f"[ROCMultiServerSync--run] {self.cameras_json_path} updated for {len(entries)} server(s)")
+        elif not updated:
+            self.insLogger.log_info(msg="[ROCMultiServerSync--run] No changes were necessary")
+
+        self.insLogger.log_info(msg=f"[ROCMultiServerSync--run] Completed in {perf_counter() - start:.3f}s")
+        return results
 
 #---------------------------------------------------------------------------------------------------------------
 # Example usage
@@ -652,13 +1014,23 @@ if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Test ROC REST API endpoints")
-    parser.add_argument("--server", required=True, help="Server name from .roc_api_keys.json (e.g., server_121)")
+    parser.add_argument("--server", help="Server name from .roc_api_keys.json (e.g., server_121)")
     parser.add_argument("--uuid", help="Camera UUID (required for get_camera_info)")
     parser.add_argument("--case_id", help="Case ID for retrieving associated cameras")
     parser.add_argument("--case_name", help="Case name for update_camera_ids or get_cameras_by_case_name")
     parser.add_argument("--watchlist_id", help="Watchlist ID to fetch faces from (for post_watchlist_faces_page)")
     parser.add_argument("--page", type=int, default=1, help="Page number to fetch (default: 1)")
     parser.add_argument("--dump", action="store_true", help="If set, dump the retrieved watchlisted faces to a local JSON file")
+    parser.add_argument("--pool_size", type=int, default=10, help="Keep-alive connections kept per server (default: 10)")
+    parser.add_argument("--connect_timeout", type=float, default=5, help="Connect timeout in seconds (default: 5)")
+    parser.add_argument("--read_timeout", type=float, default=30, help="Read timeout in seconds (default: 30)")
+    parser.add_argument("--retries", type=int, default=3, help="Retries on 429/5xx and connection errors (default: 3)")
+    parser.add_argument("--max_concurrency", type=int, default=4, help="Page requests and watchlists in flight at once (default: 4)")
+    parser.add_argument("--restart", action="store_true", help="Ignore export checkpoints and export every watchlist from page 1")
+    parser.add_argument("--base_url", help="Override https://<serverIp>/rest/v1, e.g. http://127.0.0.1:8765/rest/v1 for roc_mock_server.py")
+    parser.add_argument("--refresh", action="store_true", help="Bypass fresh cache entries for watchlists, cases and cameras")
+    parser.add_argument("--disk_cache", action="store_true", help="Keep cached responses in config/roc_cache_<server>.json between runs")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode for benchmark_sync (default: 3)")
 
     parser.add_argument(
         "--action",
@@ -674,12 +1046,17 @@ if __name__ == "__main__":
             "sync_watchlists",
             "sync_watchlisted_faces",
             "post_watchlist_faces_page",
-            "export_watchlisted_faces_to_csv"
+            "export_watchlisted_faces_to_csv",
+            "sync_watchlist_delta",
+            "benchmark_sync",
+            "sync_all_servers"
         ],
         help="API action to perform"
     )
 
     args = parser.parse_args()
+    if not args.server and args.action != "sync_all_servers":
+        parser.error(f"--server is required for {args.action}")
 
 
     # Logger setup
@@ -692,10 +1069,30 @@ if __name__ == "__main__":
         util_prt0=False
     )
     custom_logger.exclude_debug_entries(r".*Lock \d+ acquired on queue\.lock")
-    custom_logger.log_info(msg=f"[ROCRestAPI--example usage] REST Client starting for {args.server}...")
+    custom_logger.log_info(msg=f"[ROCRestAPI--example usage] REST Client starting for {args.server or 'all enabled servers'}...")
+
+    client_kwargs = dict(
+        pool_size=args.pool_size,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        max_retries=args.retries,
+        max_concurrency=args.max_concurrency,
+        force_refresh=args.refresh
+    )
+
+    if args.action == "sync_all_servers":
+        result = ROCMultiServerSync(custom_logger, case_name=args.case_name, client_kwargs=client_kwargs).run()
+        print(result)
+        raise SystemExit(0)
 
     # Create insClient
-    insClient = ROCRestAPI(insLogger=custom_logger, rocServer=args.server)
+    insClient = ROCRestAPI(
+        insLogger=custom_logger,
+        rocServer=args.server,
+        cache_path=f"config/roc_cache_{args.server}.json" if args.disk_cache else None,
+        base_url=args.base_url,
+        **client_kwargs
+    )
 
     # Route to action
     if args.action == "get_camera_info":
@@ -786,10 +1183,22 @@ if __name__ == "__main__":
                     )
 
     elif args.action == "export_watchlisted_faces_to_csv":
-        result = insClient.export_all_watchlisted_faces_to_csv()
+        result = insClient.export_all_watchlisted_faces_to_csv(resume=not args.restart)
+
+    elif args.action == "sync_watchlist_delta":
+        delta, manifest = insClient.compute_watchlist_delta(consumer="csv")
+        insClient.export_watchlist_delta_to_csv(delta)
+        insClient.save_manifest(manifest, consumer="csv")
+
+    elif args.action == "benchmark_sync":
+        result = insClient.benchmark_sync(repeat=args.repeat)
+        print(result)
 
     else:
         print(f"Invalid Selection! {args.action}")
+
+    custom_logger.log_info(msg=f"[ROCRestAPI--example usage] Response cache: {insClient.cache.get_metrics()}")
+    custom_logger.log_info(msg=f"[ROCRestAPI--example usage] Breaker: {insClient.insBreaker.get_metrics()}")
 #--------------------------------------------------------------------------------------------------------------
 """
 python3 roc_rest_api.py --server rocdemo1 --action get_camera_info --uuid "{059643c9-f5c1-43f1-9067-c6f73c12582d}"
@@ -801,6 +1210,10 @@ python3 roc_rest_api.py --server rocdemo1 --action update_camera_ids --case_name
 python3 roc_rest_api.py --server rocdemo1 --action get_watchlist_summary
 python3 roc_rest_api.py --server rocdemo1 --action get_watchlists
 python3 roc_rest_api.py --server rocdemo2 --action sync_watchlists
+python3 roc_rest_api.py --action sync_all_servers
+python3 roc_rest_api.py --action sync_all_servers --case_name "Live-01"
+python3 roc_rest_api.py --server rocdemo2 --action sync_watchlists --disk_cache
+python3 roc_rest_api.py --server rocdemo2 --action sync_watchlists --disk_cache --refresh
 
 python3 roc_rest_api.py --server rocdemo1 --action post_watchlist_faces_page --watchlist_id 682235fd7152c60014d7caad --page 1
 python3 roc_rest_api.py --server rocdemo1 --action post_watchlist_faces_page --watchlist_id 682235fd7152c60014d7caad --page 1 --dump
@@ -810,6 +1223,12 @@ python3 roc_rest_api.py --server rocdemo2 --action sync_watchlisted_faces
 python3 roc_rest_api.py --server rocdemo2 --action get_cameras_by_case_id --case_id 680558e3d3b56f001413fcf4
 
 python3 roc_rest_api.py --server rocdemo1 --action export_watchlisted_faces_to_csv
+python3 roc_rest_api.py --server rocdemo1 --action export_watchlisted_faces_to_csv --max_concurrency 8
+python3 roc_rest_api.py --server rocdemo1 --action export_watchlisted_faces_to_csv --restart
+
+python3 roc_rest_api.py --server rocdemo1 --action sync_watchlist_delta
+python3 roc_rest_api.py --server rocdemo1 --action benchmark_sync --repeat 5
+python3 roc_rest_api.py --server rocdemo1 --action sync_watchlisted_faces --pool_size 20 --read_timeout 60
 
 """
 #--------------------------------------------------------------------------------------------------------------
\ No newline at end of file
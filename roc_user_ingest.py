@@ -0,0 +1,154 @@
+# updated: 2026-10-19 12:54:43
+# created: 2026-10-19 12:30:32
+# filename: roc_user_ingest.py
+
+#--------------------------------------------------------------------------------------------------------------
+import argparse
+from time import perf_counter
+from pymongo.errors import BulkWriteError
+from logger import CustomLogger
+from roc_rest_api import ROCRestAPI
+from mongo_user_sync import MongoUserSync, CardNumberAllocator, PLACEHOLDER_BADGE, fill_placeholder_badges, transform_document, to_object_id, to_upsert
+
+#--------------------------------------------------------------------------------------------------------------
+class RocUserIngest:
+    """
+    ROC watchlists straight into accessDB2.users: faces are paged from ROCRestAPI, transformed like
+    MongoUserSync.transform_document and upserted in unordered bulk_write batches while the next pages
+    are already being fetched. current_access_zone / free_movement of existing users are left alone,
+    a face listed in several watchlists is written once, and "x" badges keep the stored cardNumbers.
+    """
+    def __init__(self, insLogger, insClient, target_col, batch_size=1000, delay_between_pages=0.001):
+        self.insLogger = insLogger
+        self.insClient = insClient
+        self.target_col = target_col
+        self.batch_size = batch_size
+        self.delay_between_pages = delay_between_pages
+        self.insAllocator = CardNumberAllocator(target_col)
+        self.seen_ids = set()
+
+        self.faces = 0
+        self.duplicates = 0
+        self.upserted = 0
+        self.modified = 0
+        self.write_errors = 0
+        self.failed_pages = 0
+
+#--------------------------------------------------------------------------------------------------------------
+    def flush(self, tgt_docs):
+        if not tgt_docs:
+            return
+
+        placeholder_ids = [tgt_doc["_id"] for tgt_doc in tgt_docs if tgt_doc["cardNumbers"] == [PLACEHOLDER_BADGE]]
+        stored = {}
+        if placeholder_ids:
+            stored = {doc["_id"]: doc for doc in self.target_col.find({"_id": {"$in": placeholder_ids}}, {"cardNumbers": 1})}
+        fill_placeholder_badges(tgt_docs, stored, self.insAllocator)
+
+        operations = [to_upsert(tgt_doc) for tgt_doc in tgt_docs]
+        try:
+            result = self.target_col.bulk_write(operations, ordered=False)
+            self.upserted += result.upserted_count
+            self.modified += result.modified_count
+        except BulkWriteError as e:
+            # unordered: everything but the failed operations was applied
+            details = e.details
+            self.upserted += details.get("nUpserted", 0)
+            self.modified += details.get("nModified", 0)
+            self.write_errors += len(details.get("writeErrors", []))
+            self.insLogger.log_error(
+                msg=f"[RocUserIngest--flush ERROR] {len(details.get('writeErrors', []))} write error(s), first: {details.get('writeErrors', [{}])[0].get('errmsg')}"
+            )
+        tgt_docs.clear()
+
+    def ingest_watchlist(self, name, watchlist_id):
+        tgt_docs = []
+        for page, total_pages, elements in self.insClient.iter_watchlist_pages(
+                watchlist_id, name, delay_between_pages=self.delay_between_pages):
+            if elements is None:
+                self.failed_pages += 1
+                self.insLogger.log_warning(msg=f"[RocUserIngest--ingest_watchlist] '{name}' page {page} failed, skipped")
+                continue
+
+            for face in elements:
+                # like compute_watchlist_delta: a face in several watchlists is one user
+                face_id = str(face["_id"])
+                if face_id in self.seen_ids:
+                    self.duplicates += 1
+                    continue
+                self.seen_ids.add(face_id)
+
+                tgt_docs.append(transform_document({**face, "_id": to_object_id(face_id)}))
+                self.faces += 1
+                if len(tgt_docs) >= self.batch_size:
+                    self.flush(tgt_docs)
+
+        self.flush(tgt_docs)
+
+    def run(self):
+        start = perf_counter()
+        watchlists = self.insClient.get_watchlists()
+
+        for name, watchlist_id in watchlists.items():
+            self.insLogger.log_info(msg=f"[RocUserIngest--run] Ingesting watchlist '{name}' (ID={watchlist_id})")
+            self.ingest_watchlist(name, watchlist_id)
+
+        elapsed = perf_counter() - start
+        metrics = {
+            "watchlists": len(watchlists),
+            "faces": self.faces,
+            "duplicates": self.duplicates,
+            "upserted": self.upserted,
+            "modified": self.modified,
+            "write_errors": self.write_errors,
+            "failed_pages": self.failed_pages,
+            "seconds": round(elapsed, 2),
+            "faces_per_sec": round(self.faces / elapsed, 1) if elapsed else 0.0
+        }
+        self.insLogger.log_info(msg=f"[RocUserIngest--run] Ingest complete: {metrics}")
+        return metrics
+
+#--------------------------------------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Ingest ROC watchlisted faces directly into the users collection")
+    parser.add_argument("--server", required=True, help="ROC server from config/.credentials.json (e.g., rocdemo1)")
+    parser.add_argument("--host", default="localhost", help="MongoDB host (default: localhost)")
+    parser.add_argument("--port", type=int, default=27017, help="MongoDB port (default: 27017)")
+    parser.add_argument("--batch_size", type=int, default=1000, help="Upserts per bulk_write (default: 1000)")
+    parser.add_argument("--max_concurrency", type=int, default=4, help="Page requests in flight at once (default: 4)")
+    args = parser.parse_args()
+
+    custom_logger = CustomLogger(
+        backup_count=5,
+        max_bytes=10485760,
+        logfile="logs/roc_user_ingest.log",
+        logger_level="INFO",
+        util_prt=False,
+        util_prt0=False
+    )
+    custom_logger.log_info(msg=f"[ROC USER INGEST] Starting ingest from {args.server}")
+
+    insClient = ROCRestAPI(insLogger=custom_logger, rocServer=args.server, max_concurrency=args.max_concurrency)
+    syncer = MongoUserSync(insLogger=custom_logger, host=args.host, port=args.port)
+
+    metrics = RocUserIngest(
+        insLogger=custom_logger,
+        insClient=insClient,
+        target_col=syncer.target_col,
+        batch_size=args.batch_size
+    ).run()
+    print(metrics)
+
+#--------------------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    main()
+
+#--------------------------------------------------------------------------------------------------------------
+"""
+Example Usage:
+source ./venv/bin/activate
+python3 roc_user_ingest.py --server rocdemo1
+python3 roc_user_ingest.py --server rocdemo1 --batch_size 5000 --max_concurrency 8
+"""
+
+#--------------------------------------------------------------------------------------------------------------
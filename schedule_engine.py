@@ -0,0 +1,161 @@
+# updated: 2026-10-19 13:10:28
+# created: 2026-10-19 12:25:39
+# filename: schedule_engine.py
+#--------------------------------------------------------------------------------------------------------------
+from bisect import bisect_right
+from threading import Lock
+from json import dumps
+from datetime import datetime
+#--------------------------------------------------------------------------------------------------------------
+class ScheduleEngine (object):
+    """
+    Compiles input_schedules once into sorted minute-of-day intervals per controller, weekday and input,
+    so "which inputs are scheduled now" is one bisect per input instead of strptime/strftime per check.
+
+    input_schedules: {
+        "enable": true,
+        "input_count": 4,
+        "controllers": {
+            "<serial or default>": {
+                "<input 1..n>": {"days": ["Mon", ...], "windows": {"zone_1": "18:00, 23:59", ...}}
+            }
+        }
+    }
+    A window whose end is before its start runs past midnight into the next weekday.
+    An input schedule with an unknown day, a malformed window or an invalid input number is logged
+    and skipped; the rest of the controller's schedules still compile.
+    """
+    WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+    def __init__ (
+            self,
+            insLogger,
+            insMongoConfig = None
+        ) -> None:
+
+        self.insLogger = insLogger
+        self.insMongoConfig = insMongoConfig
+        self.lock = Lock()
+        self.input_count = 4
+        self.compiled = {}          # serial -> weekday -> input index -> (starts, ends)
+        self.signature = None
+        self.compile_count = 0
+#--------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def to_minute(time_str):
+        hours, minutes = time_str.strip().split(":")[:2]
+        minute = int(hours) * 60 + int(minutes)
+        if not (0 <= int(minutes) < 60 and 0 <= minute <= 1440):
+            raise ValueError(f"invalid time {time_str.strip()!r}")
+        return minute
+
+    def parse_windows(self, windows):
+        values = windows.values() if isinstance(windows, dict) else windows
+        parsed = []
+        for value in values:
+            parts = str(value).split(",")
+            if len(parts) != 2:
+                raise ValueError(f"invalid window {value!r}, expected \"HH:MM, HH:MM\"")
+            parsed.append((self.to_minute(parts[0]), self.to_minute(parts[1])))
+        return parsed
+
+    def parse_days(self, days):
+        if isinstance(days, str):
+            days = [days]
+        parsed = []
+        for day in days:
+            name = str(day)[:3].title()
+            if name not in self.WEEKDAYS:
+                raise ValueError(f"unknown day {day!r}")
+            parsed.append(self.WEEKDAYS.index(name))
+        return parsed
+
+    @staticmethod
+    def merge(intervals):
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return [s for s, _ in merged], [e for _, e in merged]
+
+    def compile(self, schedules_dict):
+        compiled = {}
+        input_count = int(schedules_dict.get("input_count", 4))
+
+        for serial, inputs_dict in (schedules_dict.get("controllers") or {}).items():
+            intervals = {day: {i: [] for i in range(input_count)} for day in range(7)}
+
+            if not isinstance(inputs_dict, dict):
+                self.insLogger.log_warning(msg=f"[ScheduleEngine--compile] {serial}: schedule is not an object, skipped")
+                continue
+
+            for input_key, input_schedule in inputs_dict.items():
+                try:
+                    index = int(input_key) - 1
+                    if not 0 <= index < input_count:
+                        raise ValueError(f"input out of range 1..{input_count}")
+                    days = self.parse_days(input_schedule.get("days", self.WEEKDAYS))
+                    windows = self.parse_windows(input_schedule.get("windows", {}))
+                except (ValueError, TypeError, AttributeError) as e:
+                    self.insLogger.log_warning(msg=f"[ScheduleEngine--compile] {serial}: input {input_key} schedule skipped: {e}")
+                    continue
+
+                for start, end in windows:
+                    for day in days:
+                        if start < end:
+                            intervals[day][index].append((start, end))
+                        elif start > end:
+                            intervals[day][index].append((start, 1440))
+                            intervals[(day + 1) % 7][index].append((0, end))
+
+            compiled[str(serial)] = {
+                day: {index: self.merge(windows) for index, windows in day_inputs.items()}
+                for day, day_inputs in intervals.items()
+            }
+
+        with self.lock:
+            self.compiled = compiled
+            self.input_count = input_count
+            self.compile_count += 1
+
+        self.insLogger.log_info(msg=f"[ScheduleEngine--compile] Compiled input schedules for {len(compiled)} controller(s)")
+#--------------------------------------------------------------------------------------------------------------
+    def refresh(self):
+        """Recompiles when the input_schedules block in Mongo has changed since the last compile."""
+        if self.insMongoConfig is None:
+            return False
+
+        schedules_dict = self.insMongoConfig.query_config_input_schedules() or {}
+        signature = dumps(schedules_dict, sort_keys=True, default=str)
+        if signature == self.signature:
+            return False
+
+        self.signature = signature
+        if not schedules_dict.get("enable", True):
+            schedules_dict = {}
+        try:
+            self.compile(schedules_dict)
+        except Exception as e:
+            self.insLogger.log_error(msg=f"[ScheduleEngine--refresh ERROR] Keeping the previous schedules, compile failed: {e}")
+            return False
+        return True
+#--------------------------------------------------------------------------------------------------------------
+    def get_scheduled_inputs(self, serial_number, dtt: datetime = None):
+        """Tuple of booleans, one per input, True when the input is inside a scheduled window."""
+        dtt = dtt if dtt is not None else datetime.now()
+        minute = dtt.hour * 60 + dtt.minute
+
+        with self.lock:
+            controller = self.compiled.get(str(serial_number)) or self.compiled.get("default")
+            if controller is None:
+                return (False,) * self.input_count
+
+            scheduled = []
+            for starts, ends in controller[dtt.weekday()].values():
+                i = bisect_right(starts, minute) - 1
+                scheduled.append(i >= 0 and minute < ends[i])
+            return tuple(scheduled)
+
+#--------------------------------------------------------------------------------------------------------------
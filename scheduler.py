@@ -0,0 +1,135 @@
+# updated: 2026-10-19 12:24:49
+# created: 2026-10-19 12:24:49
+# filename: scheduler.py
+#--------------------------------------------------------------------------------------------------------------
+from heapq import heappush, heappop
+from itertools import count
+from time import monotonic, time
+from datetime import datetime, timedelta
+#--------------------------------------------------------------------------------------------------------------
+class ScheduledTask (object):
+    def __init__ (
+            self,
+            name,
+            fn,
+            interval = None,
+            time_of_day = None
+        ) -> None:
+
+        self.name = name
+        self.fn = fn
+        self.interval = interval            # every(): seconds between runs
+        self.time_of_day = time_of_day      # at(): datetime.time of the daily run
+        self.deadline = 0.0                 # monotonic
+
+        self.run_count = 0
+        self.missed_count = 0
+        self.error_count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.cancelled = False
+#--------------------------------------------------------------------------------------------------------------
+class Scheduler (object):
+    """
+    Min-heap of task deadlines. run_pending() runs what is due and next_delay() tells the caller how
+    long it may sleep. Interval tasks keep their phase: when the loop falls behind, the skipped runs
+    are counted as missed instead of being replayed back to back.
+    """
+    def __init__ (
+            self,
+            insLogger
+        ) -> None:
+
+        self.insLogger = insLogger
+        self.heap = []
+        self.sequence = count()
+        self.tasks = {}
+#--------------------------------------------------------------------------------------------------------------
+    def every(self, interval, fn, name=None, align=False):
+        """Runs fn every interval seconds; align=True starts on a wall-clock multiple of interval."""
+        task = ScheduledTask(name or fn.__name__, fn, interval=float(interval))
+        delay = task.interval
+        if align:
+            delay = task.interval - (time() % task.interval)
+        task.deadline = monotonic() + delay
+        return self._add(task)
+
+    def at(self, time_of_day, fn, name=None):
+        """Runs fn daily at time_of_day ("HH:MM" or "HH:MM:SS", local time)."""
+        fmt = "%H:%M:%S" if time_of_day.count(":") == 2 else "%H:%M"
+        task = ScheduledTask(name or fn.__name__, fn, time_of_day=datetime.strptime(time_of_day, fmt).time())
+        task.deadline = monotonic() + self._seconds_until(task.time_of_day)
+        return self._add(task)
+
+    def cancel(self, name):
+        task = self.tasks.pop(name, None)
+        if task is not None:
+            task.cancelled = True
+
+    def _add(self, task):
+        self.cancel(task.name)
+        self.tasks[task.name] = task
+        heappush(self.heap, (task.deadline, next(self.sequence), task))
+        return task
+
+    def _seconds_until(self, time_of_day):
+        now = datetime.now()
+        target = datetime.combine(now.date(), time_of_day)
+        if target <= now:
+            target += timedelta(days=1)
+        return (target - now).total_seconds()
+#--------------------------------------------------------------------------------------------------------------
+    def next_delay(self, maximum=1.0):
+        while self.heap and self.heap[0][2].cancelled:
+            heappop(self.heap)
+        if not self.heap:
+            return maximum
+        return min(maximum, max(0.0, self.heap[0][0] - monotonic()))
+
+    def run_pending(self):
+        now = monotonic()
+        while self.heap and self.heap[0][0] <= now:
+            deadline, _, task = heappop(self.heap)
+            if task.cancelled:
+                continue
+
+            start = monotonic()
+            try:
+                task.fn()
+            except Exception as e:
+                task.error_count += 1
+                self.insLogger.log_error(msg=f"[Scheduler--run_pending ERROR] Task {task.name}: {e}")
+            elapsed_ms = (monotonic() - start) * 1000
+
+            task.run_count += 1
+            task.total_ms += elapsed_ms
+            task.max_ms = max(task.max_ms, elapsed_ms)
+
+            if task.interval:
+                missed = int((monotonic() - deadline) // task.interval)
+                if missed > 0:
+                    task.missed_count += missed
+                    self.insLogger.log_debug(
+                        msg=f"[Scheduler--run_pending] Task {task.name} fell behind, missed {missed} run(s)"
+                    )
+                task.deadline = deadline + (missed + 1) * task.interval
+            else:
+                task.deadline = monotonic() + self._seconds_until(task.time_of_day)
+
+            heappush(self.heap, (task.deadline, next(self.sequence), task))
+#--------------------------------------------------------------------------------------------------------------
+    def get_metrics(self):
+        now = monotonic()
+        return {
+            name: {
+                "runs": task.run_count,
+                "missed": task.missed_count,
+                "errors": task.error_count,
+                "avg_ms": round(task.total_ms / task.run_count, 2) if task.run_count else 0.0,
+                "max_ms": round(task.max_ms, 2),
+                "next_in": round(max(0.0, task.deadline - now), 3)
+            }
+            for name, task in self.tasks.items()
+        }
+
+#--------------------------------------------------------------------------------------------------------------
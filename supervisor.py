@@ -0,0 +1,201 @@
+# updated: 2026-10-19 13:09:13
+# created: 2026-10-19 12:23:47
+# filename: supervisor.py
+
+#--------------------------------------------------------------------------------------------------------------
+import os
+from queue import Empty
+from time import monotonic
+from datetime import datetime
+from argparse import ArgumentParser
+from multiprocessing import Process, Queue
+from logger import CustomLogger
+from config_parser import Config_Init
+#--------------------------------------------------------------------------------------------------------------
+def run_shard(shard_index, shard_count, metrics_queue):
+    # each shard is a full access server owning crc32(reader serial) % shard_count == shard_index and the
+    # access events of faces / cards with crc32(identifier) % shard_count == shard_index (all shards share the
+    # ROC / QR server traffic and forward); config and lookup caches are loaded per process from Mongo
+    from main import Main
+    Main (
+        dtt = datetime.now (),
+        shard_index = shard_index,
+        shard_count = shard_count,
+        metrics_queue = metrics_queue
+    )
+#--------------------------------------------------------------------------------------------------------------
+class Supervisor (object):
+    """Starts one access-server process per shard, restarts crashed shards and aggregates their metrics."""
+    def __init__ (
+            self,
+            insLogger,
+            shard_count,
+            metrics_interval = 60,
+            restart_min_delay = 1,
+            restart_max_delay = 60,
+            restart_reset_seconds = 600
+        ) -> None:
+
+        self.insLogger = insLogger
+        self.shard_count = int(shard_count)
+        self.metrics_interval = metrics_interval
+        self.restart_min_delay = restart_min_delay
+        self.restart_max_delay = restart_max_delay
+        self.restart_reset_seconds = restart_reset_seconds     # uptime after which a shard's backoff starts over
+
+        self.metrics_queue = Queue()
+        self.processes = [None] * self.shard_count
+        self.restart_counts = [0] * self.shard_count     # consecutive restarts, reset after a healthy uptime
+        self.restart_total = 0
+        self.restart_due = [0.0] * self.shard_count
+        self.started = [0.0] * self.shard_count
+        self.shard_metrics = {}
+        self.last_metrics_log = monotonic()
+#--------------------------------------------------------------------------------------------------------------
+    def start_shard(self, shard_index):
+        process = Process(
+            target = run_shard,
+            args = (shard_index, self.shard_count, self.metrics_queue),
+            name = f"roc-access-shard-{shard_index}"
+        )
+        process.start()
+        self.processes[shard_index] = process
+        self.started[shard_index] = monotonic()
+        self.insLogger.log_info(msg=f"[Supervisor--start_shard] Shard {shard_index}/{self.shard_count} started, pid: {process.pid}")
+
+    def check_shards(self):
+        now = monotonic()
+        for shard_index, process in enumerate(self.processes):
+            if process is not None and process.is_alive():
+                if self.restart_counts[shard_index] and now - self.started[shard_index] >= self.restart_reset_seconds:
+                    self.insLogger.log_info(
+                        msg=f"[Supervisor--check_shards] Shard {shard_index} up {self.restart_reset_seconds}s, restart backoff reset after {self.restart_counts[shard_index]} restart(s)"
+                    )
+                    self.restart_counts[shard_index] = 0
+                continue
+
+            if process is not None:
+                # crashed: schedule a restart with capped exponential backoff
+                self.restart_counts[shard_index] += 1
+                self.restart_total += 1
+                delay = min(self.restart_max_delay, self.restart_min_delay * (2 ** (self.restart_counts[shard_index] - 1)))
+                self.restart_due[shard_index] = now + delay
+                self.processes[shard_index] = None
+                self.shard_metrics.pop(shard_index, None)
+                self.insLogger.log_error(
+                    msg=f"[Supervisor--check_shards] Shard {shard_index} exited with code {process.exitcode}, restart {self.restart_counts[shard_index]} in {delay}s"
+                )
+                continue
+
+            if now >= self.restart_due[shard_index]:
+                self.start_shard(shard_index)
+#--------------------------------------------------------------------------------------------------------------
+    def collect_metrics(self, timeout=1):
+        try:
+            metrics = self.metrics_queue.get(timeout=timeout)
+            self.shard_metrics[metrics["shard"]] = metrics
+        except Empty:
+            pass
+
+    def get_metrics(self):
+        totals = {
+            "shards": self.shard_count,
+            "reporting": len(self.shard_metrics),
+            "connected": 0,
+            "delivered": 0,
+            "undelivered": 0,
+            "inflight": 0,
+            "stale_dropped": 0,
+            "stale_marked": 0,
+            "stale_after_dispatch": 0,
+            "coalesced": 0,
+            "uncorrelated_acks": 0,
+            "worker_shed": 0,
+            "offline_buffered": 0,
+            "offline_drained": 0,
+            "offline_expired": 0,
+            "restarts": sum(self.restart_counts),
+            "restarts_total": self.restart_total,
+            "lanes": {}
+        }
+        for metrics in self.shard_metrics.values():
+            totals["connected"] += metrics["connection"].get("state") == "connected"
+            for key in ("delivered", "undelivered", "inflight"):
+                totals[key] += metrics["delivery"].get(key, 0)
+            totals["stale_dropped"] += metrics["face_match"].get("stale_dropped", 0)
+            totals["stale_marked"] += metrics["face_match"].get("stale_marked", 0)
+            totals["stale_after_dispatch"] += metrics["face_match"].get("stale_after_dispatch", 0)
+            totals["coalesced"] += metrics["face_match"].get("coalescing", {}).get("suppressed", 0)
+            totals["uncorrelated_acks"] += metrics["face_match"].get("uncorrelated_acks", 0)
+            totals["worker_shed"] += metrics.get("access_workers", {}).get("shed", 0)
+            totals["offline_buffered"] += metrics.get("offline_buffer", {}).get("depth", 0)
+            totals["offline_drained"] += metrics.get("offline_buffer", {}).get("drained", 0)
+            totals["offline_expired"] += metrics.get("offline_buffer", {}).get("expired", 0)
+
+            for lane, lane_metrics in metrics["queue"].items():
+                lane_totals = totals["lanes"].setdefault(lane, {"depth": 0, "enqueued": 0, "dequeued": 0, "shed": 0})
+                lane_totals["depth"] += lane_metrics["depth"]
+                lane_totals["enqueued"] += lane_metrics["enqueued"]
+                lane_totals["dequeued"] += lane_metrics["dequeued"]
+                lane_totals["shed"] += sum(lane_metrics["shed"].values())
+
+        return totals
+#--------------------------------------------------------------------------------------------------------------
+    def run(self):
+        self.insLogger.log_info(msg=f"[Supervisor--run] Starting {self.shard_count} shard(s), supervisor pid: {os.getpid()}")
+        try:
+            while True:
+                self.check_shards()
+                self.collect_metrics()
+
+                if monotonic() - self.last_metrics_log >= self.metrics_interval:
+                    self.last_metrics_log = monotonic()
+                    self.insLogger.log_info(msg=f"[Supervisor--run] Aggregated metrics: {self.get_metrics()}")
+
+        except KeyboardInterrupt:
+            self.insLogger.log_info(msg="[Supervisor--run] Keyboard Ctrl-C detected. Stopping shards...")
+
+        for process in self.processes:
+            if process is not None:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+
+#--------------------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+
+    parser = ArgumentParser(description="ROC Access Server supervisor: one process per shard of reader serial numbers")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--metrics_interval", type=int, default=60, help="Seconds between aggregated metric log entries")
+    parser.add_argument("--restart_reset", type=int, default=600, help="Seconds of uptime after which a shard's restart backoff resets")
+    args = parser.parse_args()
+
+    insConfigInit = Config_Init()
+    ini_general_variables_dict = insConfigInit.get_variables_dict (category="general")  # from config.ini file
+    ini_config_variables_dict = insConfigInit.get_variables_dict (category="config")    # from config.ini file
+
+    custom_logger = CustomLogger(
+        backup_count = 5,
+        max_bytes = 10485760,
+        logfile = ini_config_variables_dict["systemlog_file"].replace(".log", "-supervisor.log"),
+        logger_level = ini_config_variables_dict["logger_level"],
+        util_prt = ini_general_variables_dict["util_prt"],
+        util_prt0 = ini_general_variables_dict["util_prt0"]
+    )
+
+    Supervisor (
+        custom_logger,
+        shard_count = args.shards,
+        metrics_interval = args.metrics_interval,
+        restart_reset_seconds = args.restart_reset
+    ).run()
+
+#--------------------------------------------------------------------------------------------------------------
+"""
+# Run one shard per CPU core
+python3 supervisor.py
+
+# Run 4 shards
+python3 supervisor.py --shards 4
+"""
+#--------------------------------------------------------------------------------------------------------------